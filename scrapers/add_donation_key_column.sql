@@ -0,0 +1,17 @@
+-- Stable per-donation content key so donation uploads are idempotent
+-- step3_concurrent.py sets donation_key = sha256(pdf_id|DONOR NAME|date|amount|page|occurrence)
+-- and upserts on it (on_conflict=donation_key), so retries and re-runs of a PDF
+-- update its rows instead of inserting duplicates. Rows loaded before this
+-- keep a NULL key (NULLs never conflict); fix_duplicates.py is only needed for those.
+
+ALTER TABLE cf_donations 
+ADD COLUMN IF NOT EXISTS donation_key TEXT;
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_donations_donation_key ON cf_donations(donation_key);
+
+-- View how many donations have a key
+SELECT 
+    COUNT(*) FILTER (WHERE donation_key IS NOT NULL) as keyed_donations,
+    COUNT(*) FILTER (WHERE donation_key IS NULL) as legacy_donations,
+    COUNT(*) as total_donations
+FROM cf_donations;
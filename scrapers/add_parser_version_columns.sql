@@ -0,0 +1,22 @@
+-- Track which extractor (and parsing rules version) produced each PDF's rows
+-- step3_concurrent.py stamps these when it marks a PDF converted, and
+-- `--reprocess-older` selects converted PDFs whose version is behind the current one
+
+ALTER TABLE cf_report_pdfs 
+ADD COLUMN IF NOT EXISTS parser_name TEXT,
+ADD COLUMN IF NOT EXISTS parser_version INTEGER,
+ADD COLUMN IF NOT EXISTS page_types TEXT[];
+
+CREATE INDEX IF NOT EXISTS idx_report_pdfs_parser_version ON cf_report_pdfs(parser_version)
+WHERE csv_converted = true;
+CREATE INDEX IF NOT EXISTS idx_report_pdfs_page_types ON cf_report_pdfs USING GIN (page_types);
+
+-- View converted PDFs by parser version (NULL = converted before versions were tracked)
+SELECT 
+    parser_name,
+    parser_version,
+    COUNT(*) as pdfs
+FROM cf_report_pdfs
+WHERE csv_converted = true AND error_message IS NULL
+GROUP BY parser_name, parser_version
+ORDER BY parser_name, parser_version;
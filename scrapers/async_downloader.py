@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+"""
+asyncio download stage for step 3's pipeline (--async-downloads)
+One event loop thread keeps many PDF downloads in flight over a pooled httpx
+AsyncClient, where the threaded download stage needs a thread per download.
+httpx is optional: without it AsyncDownloader can't run and step 3 falls back
+to download threads.
+"""
+
+import asyncio
+import hashlib
+import os
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from queue import Queue
+from typing import TYPE_CHECKING, Callable, Dict, Optional, Union
+from urllib.parse import urlsplit
+
+try:
+    import httpx
+    HTTPX_AVAILABLE = True
+except ImportError:
+    HTTPX_AVAILABLE = False
+
+from pdf_cache import PDFCache
+from pdf_download import DOWNLOAD_CHUNK_SIZE, IncompleteDownloadError, check_content_length
+from rate_limiter import bucket_for
+
+if TYPE_CHECKING:
+    from step3_concurrent import PDFDonationProcessor
+
+
+class AsyncDownloader:
+    """Pipeline download stage on one asyncio thread (httpx)
+
+    Keeps up to `concurrency` downloads in flight over one pooled AsyncClient,
+    at most per_host at a time to any one host, each drawing from the shared
+    rate limiter. Mirrors PDFDonationProcessor.download_pdf: PDF cache and
+    revalidation, .part files (in temp_dir) checked against Content-Length,
+    skipped unfiled reports and retries with backoff. With in_memory, PDFs are
+    returned as bytes instead.
+
+    Finished items go to route(item, block=False), retried every ROUTE_RETRY_SECONDS
+    while the parse queues are full, so backpressure parks coroutines instead of
+    threads. Blocking work (file writes, pdfinfo, journal and cache writes) gets
+    its own executor with a thread per download slot, not the loop's small
+    default one. Executor threads call their own processor from processor_factory,
+    so no requests session is shared between threads.
+    """
+
+    ROUTE_RETRY_SECONDS = 0.05
+
+    def __init__(self, concurrency: int, per_host: int, temp_dir: Path, pdf_cache: Optional[PDFCache] = None,
+                 revalidate: bool = False, in_memory: bool = False):
+        self.concurrency = concurrency
+        self.per_host = per_host
+        self.temp_dir = temp_dir
+        self.pdf_cache = pdf_cache
+        self.revalidate = revalidate
+        self.in_memory = in_memory
+        self.route = None
+        self.processor_factory = None
+        self.host_slots: Dict[str, asyncio.Semaphore] = {}
+        self.executor: Optional[ThreadPoolExecutor] = None
+
+    def run(self, records: Queue, processor_factory: Callable[[], 'PDFDonationProcessor'],
+            route: Callable[..., bool]):
+        """Download records from the queue until its None sentinel, then wait for what's in flight
+
+        processor_factory returns the calling thread's processor (as for StagedPipeline).
+        route(item, block=False) passes a finished work item on, returning False while it can't take it.
+        """
+        self.route = route
+        self.processor_factory = processor_factory
+        # One extra thread waits on the records queue
+        with ThreadPoolExecutor(max_workers=self.concurrency + 1, thread_name_prefix="async-download") as executor:
+            self.executor = executor
+            asyncio.run(self._run(records, processor_factory()))
+
+    def _in_executor(self, method: str, *args):
+        """Run a blocking processor method on an executor thread, with that thread's own processor"""
+        return asyncio.get_running_loop().run_in_executor(
+            self.executor, lambda: getattr(self.processor_factory(), method)(*args))
+
+    async def _run(self, records: Queue, processor: 'PDFDonationProcessor'):
+        loop = asyncio.get_running_loop()
+        slots = asyncio.Semaphore(self.concurrency)
+        tasks = set()
+        limits = httpx.Limits(max_connections=self.concurrency, max_keepalive_connections=self.concurrency)
+        async with httpx.AsyncClient(limits=limits, follow_redirects=True,
+                                     headers={'User-Agent': processor.session.headers['User-Agent']}) as client:
+            while True:
+                pdf_record = await loop.run_in_executor(self.executor, records.get)
+                if pdf_record is None:
+                    break
+                await slots.acquire()
+                task = asyncio.create_task(self._download(client, processor, pdf_record))
+                tasks.add(task)
+                task.add_done_callback(lambda done: (tasks.discard(done), slots.release()))
+            if tasks:
+                await asyncio.wait(tasks)
+
+    async def _download(self, client, processor: 'PDFDonationProcessor', pdf_record: Dict):
+        try:
+            item = processor.new_item(pdf_record)
+            if item['csv_path'] is None:
+                pdf_path = item['pdf_path'] or await self.fetch_pdf(client, processor, pdf_record)
+                # pdfinfo and the journal write are blocking - keep them off the event loop
+                await self._in_executor('finish_download', item, pdf_path)
+        except Exception as e:
+            item = {'result': {**processor.new_result(pdf_record), 'error': str(e)}, 'pdf_path': None}
+        while not self.route(item, block=False):
+            await asyncio.sleep(self.ROUTE_RETRY_SECONDS)
+
+    async def fetch_pdf(self, client, processor: 'PDFDonationProcessor', pdf_record: Dict) -> Union[Path, bytes, None]:
+        """Async download_pdf: the PDF's temp path (its bytes in memory), or None when it could not be downloaded"""
+        loop = asyncio.get_running_loop()
+        pdf_url = pdf_record.get('pdf_url')
+        pdf_id = pdf_record.get('pdf_id')
+        is_unfiled_report = '/ReportFile/' in pdf_url
+        pdf_path = self.temp_dir / f"entity_{pdf_record.get('entity_id')}_pdf_{pdf_id}_async.pdf"
+
+        cached = self.pdf_cache.lookup(pdf_url) if self.pdf_cache is not None else None
+        if cached and not self.revalidate:
+            pdf = processor.from_cache(cached['path'], pdf_path, self.in_memory)
+            if pdf is not None:
+                return pdf
+            cached = None  # Evicted since the lookup - download it
+
+        request_headers = {}
+        if cached:
+            if cached['etag']:
+                request_headers['If-None-Match'] = cached['etag']
+            if cached['last_modified']:
+                request_headers['If-Modified-Since'] = cached['last_modified']
+
+        host = urlsplit(pdf_url).hostname or ''
+        host_slot = self.host_slots.setdefault(host, asyncio.Semaphore(self.per_host))
+        bucket = bucket_for(pdf_url)
+        max_retries = 1 if is_unfiled_report else 3
+
+        for attempt in range(max_retries):
+            try:
+                evicted = False
+                async with host_slot:
+                    await asyncio.sleep(bucket.reserve())
+                    async with client.stream('GET', pdf_url, headers=request_headers, timeout=45) as response:
+                        status_code = response.status_code
+                        bucket.record_response(status_code, response.headers.get('Retry-After'))
+                        if status_code == 304 and cached:
+                            pdf = processor.from_cache(cached['path'], pdf_path, self.in_memory)
+                            if pdf is not None:
+                                self.pdf_cache.mark_validated(pdf_url)
+                                return pdf
+                            evicted = True
+                        if status_code == 200:
+                            if self.in_memory:
+                                pdf = await response.aread()
+                                check_content_length(response.headers, len(pdf))
+                                sha256 = hashlib.sha256(pdf).hexdigest()
+                            else:
+                                pdf = pdf_path
+                                sha256 = await self.stream_to_file(response, pdf_path)
+                            if self.pdf_cache is not None:
+                                await loop.run_in_executor(self.executor, lambda: self.pdf_cache.store(
+                                    pdf_url, pdf,
+                                    sha256=sha256,
+                                    etag=response.headers.get('ETag'),
+                                    last_modified=response.headers.get('Last-Modified')
+                                ))
+                            return pdf
+
+                if evicted:
+                    # Fetched again outside host_slot, which is not reentrant
+                    return await self.fetch_pdf(client, processor, pdf_record)
+                if status_code == 404 and is_unfiled_report:
+                    # Expected for unfiled reports - mark as skipped
+                    await self._in_executor('mark_pdf_as_skipped', pdf_id, "Report not filed - unfiled report URL")
+                    return None
+                if attempt == max_retries - 1 and status_code == 404:
+                    print(f"\n⚠️ Failed to download PDF after {max_retries} attempts: {pdf_url}")
+            except (httpx.TimeoutException, httpx.TransportError, IncompleteDownloadError):
+                if attempt == max_retries - 1:
+                    print(f"\n⚠️ Network error downloading PDF: {pdf_url}")
+            except Exception:
+                return None
+
+            if attempt < max_retries - 1:
+                await asyncio.sleep(2 ** attempt)
+
+        return None
+
+    async def stream_to_file(self, response, dest: Path) -> str:
+        """Async PDFDonationProcessor.stream_to_file: write via .part, check Content-Length, return the SHA-256
+
+        File writes run on the executor, so a slow disk doesn't stall the other downloads.
+        """
+        loop = asyncio.get_running_loop()
+        part_path = dest.with_suffix('.part')
+        digest = hashlib.sha256()
+        written = 0
+
+        try:
+            f = await loop.run_in_executor(self.executor, open, part_path, 'wb')
+            try:
+                async for chunk in response.aiter_bytes(DOWNLOAD_CHUNK_SIZE):
+                    await loop.run_in_executor(self.executor, f.write, chunk)
+                    digest.update(chunk)
+                    written += len(chunk)
+            finally:
+                await loop.run_in_executor(self.executor, f.close)
+
+            check_content_length(response.headers, written)
+            await loop.run_in_executor(self.executor, os.replace, part_path, dest)
+        finally:
+            part_path.unlink(missing_ok=True)
+
+        return digest.hexdigest()
@@ -0,0 +1,530 @@
+#!/usr/bin/env python3
+"""
+Native Python Schedule C2 extractor
+Port of TEMP_FUNC from r_scraper_fixed.R that runs on `pdftotext -layout`
+output, so step 3 can parse PDFs without starting an R process.
+
+Produces the same columns as the R scraper's CSV output.
+
+Every function that reads a PDF takes its path or its bytes; bytes go to
+poppler on stdin (fd://0), so a PDF held in memory never touches disk.
+
+Run directly to re-parse every PDF in the extracted-text cache:
+    python c2_extractor.py campaign_finance_data/text_cache --output rows.csv
+"""
+
+import argparse
+import csv
+import hashlib
+import re
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple, Union
+
+from pdf_cache import TextCache, sha256_file
+
+# Column order written by the R scraper
+METADATA_COLUMNS = [
+    'Rpt_Title', 'Rpt_Name', 'Rpt_Cycle', 'Rpt_FileDate', 'Rpt_Period',
+    'OrgNm', 'OrgEml', 'OrgTel', 'OrgAdr', 'OrgTreasurer', 'Jurisdiction'
+]
+DONATION_COLUMNS = [
+    'PageNum', 'PageType', 'Donor_Name', 'Donor_Addr', 'Donor_Occupation',
+    'Donation_Date', 'Donation_Amt', 'Donation_Type', 'CycleToDate_Amt'
+]
+META_COLUMNS = ['META_SegmentName', 'META_FileName']
+ALL_COLUMNS = METADATA_COLUMNS + DONATION_COLUMNS + META_COLUMNS
+
+JURISDICTION = "Arizona Secretary of State"
+
+# Text cache key for `pdftotext -layout` output; bump when the extraction command changes
+TEXT_VERSION = "pdftotext-layout-1"
+# Appended to a text cache version when only the pages find_relevant_pages picked were extracted
+PREFILTER_SUFFIX = "-prefilter"
+
+# Text that makes a page worth extracting: TEMP_FUNC keeps only C2 and cover pages
+# (and checks every page for the no-activity notice)
+RELEVANT_PAGE_MARKERS = ('Schedule C2', 'Campaign Finance Report', 'NO ACTIVITY THIS PERIOD')
+
+# Lines dropped from Schedule C2 records (same patterns as the R filter)
+C2_SKIP_PATTERNS = [
+    re.compile(p) for p in [
+        "Filed",
+        "Total of Individual Contributions",
+        "Total of Refunds Given",
+        "Net Total of Individual Contributions",
+        "Trans. Type:",
+        "Original Date:",
+        "Original Amount:",
+        "Memo:",
+    ]
+]
+
+SPLIT_RE = re.compile(r"\s{2,}")
+NAME_RE = re.compile(r"^Name:")
+COMMITTEE_HEADER_RE = re.compile(r"^(Committee|Treasurer|Phone|Email|Candidate|Office)")
+
+
+# A PDF on disk or its bytes in memory
+PDFSource = Union[Path, bytes]
+
+
+class ExtractionError(Exception):
+    """Raised where TEMP_FUNC would stop with an R error"""
+
+
+def _poppler_input(pdf: PDFSource) -> Tuple[str, Optional[bytes]]:
+    """(file argument, stdin bytes) for a poppler tool: fd://0 with the bytes for an in-memory PDF"""
+    if isinstance(pdf, bytes):
+        return 'fd://0', pdf
+    return str(pdf), None
+
+
+def pdf_sha256(pdf: PDFSource) -> str:
+    """SHA-256 of a PDF's content (the text cache key)"""
+    if isinstance(pdf, bytes):
+        return hashlib.sha256(pdf).hexdigest()
+    return sha256_file(pdf)
+
+
+def pdf_to_pages(pdf: PDFSource, timeout: int = 120, first: Optional[int] = None,
+                 last: Optional[int] = None, mode: str = '-layout') -> List[str]:
+    """Extract per-page text with `pdftotext -layout` (pages are separated by form feeds)
+
+    first/last limit extraction to a 1-based page range.
+    """
+    command = ['pdftotext', mode]
+    if first is not None:
+        command += ['-f', str(first)]
+    if last is not None:
+        command += ['-l', str(last)]
+    source, stdin = _poppler_input(pdf)
+    result = subprocess.run(
+        command + [source, '-'],
+        input=stdin,
+        capture_output=True,
+        timeout=timeout
+    )
+    if result.returncode != 0:
+        raise ExtractionError(f"pdftotext failed: {result.stderr.decode(errors='ignore').strip()}")
+
+    pages = result.stdout.decode('utf-8', errors='ignore').split('\f')
+    # pdftotext ends every page with a form feed, leaving an empty piece at the end
+    if pages and pages[-1] == '':
+        pages.pop()
+    return pages
+
+
+def find_page_types(pdf: PDFSource, timeout: int = 120) -> Tuple[int, Dict[int, str]]:
+    """Cheap pre-pass: (page count, {1-based page: type} for pages holding any RELEVANT_PAGE_MARKERS)
+
+    Types follow classify_page, plus 'No Activity' for pages that only carry the
+    notice. Uses `pdftotext -raw`, which skips layout analysis and is much faster
+    than -layout.
+    """
+    pages = pdf_to_pages(pdf, timeout=timeout, mode='-raw')
+    page_types = {}
+    for page_num, text in enumerate(pages, start=1):
+        if not any(marker in text for marker in RELEVANT_PAGE_MARKERS):
+            continue
+        page_type = classify_page([text])
+        page_types[page_num] = 'No Activity' if page_type == 'NONE' else page_type
+    return len(pages), page_types
+
+
+def find_relevant_pages(pdf: PDFSource, timeout: int = 120) -> Tuple[int, List[int]]:
+    """Cheap pre-pass: (page count, 1-based pages holding any RELEVANT_PAGE_MARKERS)"""
+    page_count, page_types = find_page_types(pdf, timeout)
+    return page_count, sorted(page_types)
+
+
+def page_ranges(page_nums: List[int]) -> List[Tuple[int, int]]:
+    """Collapse sorted page numbers into (first, last) runs"""
+    ranges = []
+    for page_num in page_nums:
+        if ranges and page_num == ranges[-1][1] + 1:
+            ranges[-1] = (ranges[-1][0], page_num)
+        else:
+            ranges.append((page_num, page_num))
+    return ranges
+
+
+def pdf_to_pages_in_ranges(pdf: PDFSource, ranges: List[Tuple[int, int]], page_count: int,
+                           timeout: int = 120, workers: int = 1, chunk_pages: int = 50) -> List[str]:
+    """Layout text for the given page ranges, page_count pages long with '' for pages outside them
+
+    With workers > 1, ranges are cut into chunk_pages-page pieces extracted by
+    concurrent pdftotext processes; pages land at their own index, so the result
+    is the same as one sequential run.
+    """
+    pieces = []
+    for first, last in ranges:
+        size = chunk_pages if workers > 1 else last - first + 1
+        pieces.extend((start, min(start + size - 1, last)) for start in range(first, last + 1, size))
+
+    def extract(piece: Tuple[int, int]) -> List[str]:
+        return pdf_to_pages(pdf, timeout, first=piece[0], last=piece[1])
+
+    if workers > 1 and len(pieces) > 1:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            texts = list(executor.map(extract, pieces))
+    else:
+        texts = [extract(piece) for piece in pieces]
+
+    pages = [''] * page_count
+    for (first, _), piece_pages in zip(pieces, texts):
+        for offset, text in enumerate(piece_pages):
+            pages[first - 1 + offset] = text
+    return pages
+
+
+def pdf_to_pages_prefiltered(pdf: PDFSource, timeout: int = 120, workers: int = 1) -> Tuple[List[str], bool]:
+    """Layout text for relevant pages only; other pages are left empty so page numbers don't move
+
+    Returns (pages, prefiltered). Falls back to every page when the pre-pass finds
+    nothing (or everything) to skip.
+    """
+    page_count, relevant = find_relevant_pages(pdf, timeout)
+    if not relevant or len(relevant) == page_count:
+        return pdf_to_pages_in_ranges(pdf, [(1, page_count)], page_count, timeout, workers), False
+    return pdf_to_pages_in_ranges(pdf, page_ranges(relevant), page_count, timeout, workers), True
+
+
+def pdf_page_count(pdf: PDFSource, timeout: int = 30) -> Optional[int]:
+    """Page count from `pdfinfo`; None if it can't be read"""
+    source, stdin = _poppler_input(pdf)
+    try:
+        result = subprocess.run(['pdfinfo', source], input=stdin, capture_output=True, timeout=timeout)
+    except (subprocess.TimeoutExpired, OSError):
+        return None
+    for line in result.stdout.decode('utf-8', errors='ignore').splitlines():
+        if line.startswith('Pages:'):
+            value = line.split(':', 1)[1].strip()
+            return int(value) if value.isdigit() else None
+    return None
+
+
+def _r_range(start: int, end: int) -> range:
+    """R's start:end, which counts down when start > end"""
+    return range(start, end + 1) if start <= end else range(start, end - 1, -1)
+
+
+def _remove(pattern: str, value: str) -> str:
+    """stringr::str_remove - drop the first match"""
+    return re.sub(pattern, '', value, count=1)
+
+
+def _split_parts(line: str) -> List[str]:
+    """Split a layout line on runs of 2+ spaces, dropping empty pieces"""
+    return [part for part in SPLIT_RE.split(line) if part != '']
+
+
+def classify_page(lines: List[str]) -> str:
+    """Page type the same way TEMP_FUNC does"""
+    if any('Schedule C2' in line for line in lines):
+        return 'Schedule C2'
+    if any('Campaign Finance Report' in line for line in lines):
+        return 'Cover Page'
+    return 'NONE'
+
+
+def _safe_extract(lines: List[str], pattern: str, default: str = '') -> str:
+    """First line matching pattern, with the match removed and whitespace trimmed"""
+    for line in lines:
+        if re.search(pattern, line):
+            return _remove(pattern, line).strip()
+    return default
+
+
+def _safe_get_line(lines: List[str], line_num: int, default: str = '') -> str:
+    """1-based line lookup with bounds checking"""
+    if 0 < line_num <= len(lines):
+        return lines[line_num - 1].strip()
+    return default
+
+
+def _no_activity_metadata(cover: List[str]) -> Dict[str, Optional[str]]:
+    """Cover page metadata for "NO ACTIVITY THIS PERIOD" reports"""
+    report_lines = [line for line in cover if re.search(r"Report$", line)]
+    if len(report_lines) > 1:
+        names = [line for line in report_lines if 'Campaign Finance Report' not in line]
+        report_name = names[0].strip() if names else None  # NA in R
+    else:
+        report_name = _safe_extract(cover, "Report ID:.*")
+
+    # Committee name: first of lines 2-10 that isn't a labelled field
+    org_name = ''
+    for i in range(1, 10):
+        if i >= len(cover):
+            break  # NA in R, which becomes ""
+        if not COMMITTEE_HEADER_RE.search(cover[i]):
+            org_name = cover[i].strip()
+            break
+
+    # Address is usually the line after treasurer name
+    org_addr = ''
+    treasurer_idx = [i for i, line in enumerate(cover) if re.search(r"^Treasurer:", line)]
+    if treasurer_idx and treasurer_idx[0] + 1 < len(cover):
+        org_addr = cover[treasurer_idx[0] + 1].strip()
+
+    return {
+        'Rpt_Title': 'Campaign Finance Report',
+        'Rpt_Name': report_name,
+        'Rpt_Cycle': _safe_extract(cover, r"Election Cycle:\s*"),
+        'Rpt_FileDate': _safe_extract(cover, r"Date Filed:\s*"),
+        'Rpt_Period': _safe_extract(cover, r"Reporting Period:\s*"),
+        'OrgNm': org_name,
+        'OrgEml': _safe_extract(cover, r"Email:\s*"),
+        'OrgTel': _safe_extract(cover, r"Phone:\s*"),
+        'OrgAdr': org_addr,
+        'OrgTreasurer': _safe_extract(cover, r"Treasurer:\s*"),
+        'Jurisdiction': JURISDICTION,
+    }
+
+
+def _cover_metadata(cover: List[str]) -> Dict[str, Optional[str]]:
+    """Cover page metadata for regular reports"""
+    empty_lines = [i + 1 for i, line in enumerate(cover) if line == '']
+    offset = min(empty_lines) if empty_lines else 7
+
+    report_title = _safe_get_line(cover, 1, 'Campaign Finance Report')
+
+    report_name = _safe_get_line(cover, offset + 4)
+    if report_name == '' or re.search(r"^(Phone|Email|Treasurer)", report_name):
+        for i in _r_range(offset + 2, offset + 6):
+            test_line = _safe_get_line(cover, i)
+            if re.search(r"Report$", test_line) and 'Campaign Finance Report' not in test_line:
+                report_name = test_line
+                break
+
+    cycle = file_date = period = ''
+    for i in _r_range(max(1, offset), min(len(cover), offset + 10)):
+        if not 0 < i <= len(cover):
+            raise ExtractionError("Cover page shorter than the metadata block")
+        line = cover[i - 1]
+        if 'Election Cycle:' in line:
+            cycle = _remove(r"Election Cycle:\s*", line).strip()
+        elif 'Date Filed:' in line:
+            file_date = _remove(r"Date Filed:\s*", line).strip()
+        elif 'Reporting Period:' in line:
+            period = _remove(r"Reporting Period:\s*", line).strip()
+
+    return {
+        'Rpt_Title': report_title,
+        'Rpt_Name': report_name,
+        'Rpt_Cycle': cycle,
+        'Rpt_FileDate': file_date,
+        'Rpt_Period': period,
+        'OrgNm': _safe_get_line(cover, 2),
+        'OrgEml': _remove(r"Email:\s*", _safe_get_line(cover, 7)),
+        'OrgTel': _remove(r"Phone:\s*", _safe_get_line(cover, 6)),
+        'OrgAdr': _safe_get_line(cover, 5),
+        'OrgTreasurer': _remove(r"Treasurer:\s*", _safe_get_line(cover, 4)),
+        'Jurisdiction': JURISDICTION,
+    }
+
+
+def parse_c2_page(lines: List[str], page_num: int) -> List[Dict[str, object]]:
+    """Parse the donation records on one Schedule C2 page"""
+    records = []
+    current = None
+    for line in lines:
+        if NAME_RE.search(line):
+            current = []
+            records.append(current)
+        if current is None or line == '':
+            continue
+        if any(p.search(line) for p in C2_SKIP_PATTERNS):
+            continue
+        current.append(line)
+
+    donations = []
+    for record in records:
+        if len(record) < 2:
+            continue
+
+        name_parts = _split_parts(record[0])
+        addr_parts = _split_parts(record[1])
+        if len(record) >= 3:
+            occ_parts = _split_parts(record[2])
+            occupation = _remove(r"^Occupation:\s*", occ_parts[1]) if len(occ_parts) >= 2 else 'NO INFO'
+        else:
+            occupation = 'NO INFO'
+
+        donations.append({
+            'PageNum': page_num,
+            'PageType': 'Schedule C2',
+            'Donor_Name': _remove(r"^Name:\s*", name_parts[1]) if len(name_parts) >= 2 else '',
+            'Donor_Addr': _remove(r"^Address:\s*", addr_parts[1]) if len(addr_parts) >= 2 else '',
+            'Donor_Occupation': occupation,
+            'Donation_Date': name_parts[2] if len(name_parts) >= 3 else '',
+            'Donation_Amt': name_parts[3] if len(name_parts) >= 4 else '',
+            'Donation_Type': addr_parts[-1] if len(addr_parts) >= 3 else '',
+            'CycleToDate_Amt': name_parts[4] if len(name_parts) >= 5 else '',
+        })
+    return donations
+
+
+def extract_from_pages(pages: List[str]) -> List[Dict[str, object]]:
+    """TEMP_FUNC on already-extracted page text; one dict per output row"""
+    is_no_activity = any('NO ACTIVITY THIS PERIOD' in page for page in pages)
+
+    typed_pages = []
+    for page_num, text in enumerate(pages, start=1):
+        lines = text.split('\n')
+        page_type = classify_page(lines)
+        if page_type != 'NONE':
+            typed_pages.append((page_num, page_type, lines))
+
+    if not typed_pages:
+        return []
+
+    covers = [lines for _, page_type, lines in typed_pages if page_type == 'Cover Page']
+    if not covers:
+        raise ExtractionError("No cover page found")
+    cover = covers[0]
+
+    if is_no_activity:
+        return [_no_activity_metadata(cover)]
+
+    metadata = _cover_metadata(cover)
+    donations = []
+    for page_num, page_type, lines in typed_pages:
+        if page_type == 'Schedule C2':
+            donations.extend(parse_c2_page(lines, page_num))
+
+    if not donations:
+        return [metadata]
+    return [{**metadata, **donation} for donation in donations]
+
+
+def no_activity_rows(pdf: PDFSource, head_pages: int = 2, timeout: int = 30) -> Optional[List[Dict[str, object]]]:
+    """Rows for a "NO ACTIVITY THIS PERIOD" report, read from its first pages only
+
+    None when the notice (or the cover page) isn't in the first head_pages pages;
+    the PDF then needs a full extraction. When it is, the result equals a full
+    run: TEMP_FUNC returns just the cover metadata for these reports.
+    """
+    try:
+        head = pdf_to_pages(pdf, timeout, first=1, last=head_pages)
+    except (ExtractionError, subprocess.TimeoutExpired, OSError):
+        return None
+    if not any('NO ACTIVITY THIS PERIOD' in page for page in head):
+        return None
+
+    try:
+        return extract_from_pages(head)
+    except ExtractionError:
+        return None
+
+
+def _extract_pages(pdf: PDFSource, prefilter: bool, page_count: Optional[int], workers: int) -> Tuple[List[str], bool]:
+    """(pages, prefiltered) for a cache miss; big PDFs are split across workers when page_count is known"""
+    if prefilter:
+        return pdf_to_pages_prefiltered(pdf, workers=workers)
+    if workers > 1 and page_count:
+        return pdf_to_pages_in_ranges(pdf, [(1, page_count)], page_count, workers=workers), False
+    return pdf_to_pages(pdf), False
+
+
+def load_pages(pdf: PDFSource, text_cache: Optional[TextCache] = None, prefilter: bool = False,
+               page_count: Optional[int] = None, workers: int = 1) -> List[str]:
+    """Page text for a PDF, served from the text cache when it has this PDF's hash
+
+    With prefilter, a miss extracts only relevant pages (pdf_to_pages_prefiltered);
+    full text already in the cache is used either way. workers > 1 extracts page
+    chunks in parallel (pdf_to_pages_in_ranges).
+    """
+    if text_cache is None:
+        return _extract_pages(pdf, prefilter, page_count, workers)[0]
+
+    sha256 = pdf_sha256(pdf)
+    pages = text_cache.load(sha256, TEXT_VERSION)
+    if pages is None and prefilter:
+        pages = text_cache.load(sha256, TEXT_VERSION + PREFILTER_SUFFIX)
+    if pages is None:
+        pages, prefiltered = _extract_pages(pdf, prefilter, page_count, workers)
+        text_cache.store(sha256, TEXT_VERSION + PREFILTER_SUFFIX if prefiltered else TEXT_VERSION, pages)
+    return pages
+
+
+def extract_pdf(pdf: PDFSource, text_cache: Optional[TextCache] = None, prefilter: bool = False,
+                page_count: Optional[int] = None, workers: int = 1) -> List[Dict[str, object]]:
+    """TEMP_FUNC on a PDF file (or its bytes)"""
+    return extract_from_pages(load_pages(pdf, text_cache, prefilter, page_count, workers))
+
+
+def csv_rows(rows: List[Dict[str, object]], pdf_path: Path) -> Tuple[List[str], List[Dict[str, str]]]:
+    """(columns, rows) as write_csv writes them and csv.DictReader reads them back
+
+    Values are strings ('NA' for None, '' for columns a row lacks) and the META_
+    columns name pdf_path, which only labels the rows and need not exist.
+    """
+    if rows:
+        columns = [c for c in METADATA_COLUMNS + DONATION_COLUMNS if c in rows[0]] + META_COLUMNS
+    else:
+        columns = ALL_COLUMNS
+
+    return columns, [
+        {
+            **dict.fromkeys(columns, ''),
+            **{k: ('NA' if v is None else str(v)) for k, v in row.items()},
+            'META_SegmentName': pdf_path.parent.name,
+            'META_FileName': pdf_path.name,
+        }
+        for row in rows
+    ]
+
+
+def write_csv(rows: List[Dict[str, object]], pdf_path: Path, output_path: Path) -> int:
+    """Write rows the way the R wrapper does, including the META_ columns"""
+    columns, text_rows = csv_rows(rows, pdf_path)
+
+    with open(output_path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=columns)
+        writer.writeheader()
+        writer.writerows(text_rows)
+    return len(rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Re-run C2 parsing over every cached PDF text')
+    parser.add_argument('text_cache', type=Path,
+                       help='Text cache folder (campaign_finance_data/text_cache)')
+    parser.add_argument('--version', default=TEXT_VERSION,
+                       help=f'Extractor version to read (default: {TEXT_VERSION})')
+    parser.add_argument('--output', type=Path, default=None,
+                       help='Write all rows to this CSV, with a pdf_sha256 column')
+    args = parser.parse_args()
+
+    stats = {'pdfs': 0, 'failed': 0, 'donations': 0}
+    writer = None
+    out = open(args.output, 'w', newline='', encoding='utf-8') if args.output else None
+
+    try:
+        for sha256, pages in TextCache(args.text_cache).iter_cached(args.version):
+            stats['pdfs'] += 1
+            try:
+                rows = extract_from_pages(pages)
+            except ExtractionError:
+                stats['failed'] += 1
+                continue
+
+            stats['donations'] += sum(1 for row in rows if row.get('Donor_Name'))
+            if out:
+                if writer is None:
+                    writer = csv.DictWriter(out, fieldnames=['pdf_sha256'] + METADATA_COLUMNS + DONATION_COLUMNS,
+                                            restval='')
+                    writer.writeheader()
+                for row in rows:
+                    writer.writerow({'pdf_sha256': sha256, **{k: ('NA' if v is None else v) for k, v in row.items()}})
+    finally:
+        if out:
+            out.close()
+
+    print(f"Parsed {stats['pdfs']} cached PDFs: {stats['donations']} donations, {stats['failed']} failed")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+-- Lease-based work claiming for step3_concurrent.py --claim
+-- Several step 3 nodes can run at once: each claims batches of unconverted PDFs
+-- with FOR UPDATE SKIP LOCKED, so no two nodes get the same PDF. A claim is a
+-- lease - nodes renew it while they work (heartbeat), and PDFs whose lease ran
+-- out (node crashed or was killed) can be claimed again by anyone.
+
+ALTER TABLE cf_report_pdfs
+ADD COLUMN IF NOT EXISTS claimed_by TEXT,
+ADD COLUMN IF NOT EXISTS lease_expires_at TIMESTAMPTZ;
+
+CREATE INDEX IF NOT EXISTS idx_report_pdfs_claimable ON cf_report_pdfs(pdf_id)
+WHERE csv_converted = false;
+CREATE INDEX IF NOT EXISTS idx_report_pdfs_claimed_by ON cf_report_pdfs(claimed_by)
+WHERE claimed_by IS NOT NULL;
+
+-- Claim up to p_limit unconverted PDFs that nobody holds a live lease on,
+-- leaving out p_skip_pdf_ids (PDFs that already failed on the claiming node),
+-- or only from p_pdf_ids (the node's scheduled retries)
+DROP FUNCTION IF EXISTS public.claim_report_pdfs(text, integer, integer, integer);
+DROP FUNCTION IF EXISTS public.claim_report_pdfs(text, integer, integer, integer, integer[]);
+DROP FUNCTION IF EXISTS public.claim_report_pdfs(text, integer, integer, integer, integer[], integer[]);
+
+CREATE OR REPLACE FUNCTION public.claim_report_pdfs(
+    p_worker_id text,
+    p_limit integer,
+    p_lease_seconds integer DEFAULT 900,
+    p_entity_id integer DEFAULT NULL,
+    p_skip_pdf_ids integer[] DEFAULT NULL,
+    p_pdf_ids integer[] DEFAULT NULL
+)
+RETURNS SETOF cf_report_pdfs
+LANGUAGE sql
+SECURITY DEFINER
+AS $$
+    WITH picked AS (
+        SELECT pdf_id
+        FROM cf_report_pdfs
+        WHERE csv_converted = false
+          AND pdf_url IS NOT NULL
+          AND (lease_expires_at IS NULL OR lease_expires_at < now())
+          AND (p_entity_id IS NULL OR entity_id = p_entity_id)
+          AND (p_skip_pdf_ids IS NULL OR pdf_id <> ALL(p_skip_pdf_ids))
+          AND (p_pdf_ids IS NULL OR pdf_id = ANY(p_pdf_ids))
+        ORDER BY pdf_id
+        LIMIT p_limit
+        FOR UPDATE SKIP LOCKED
+    )
+    UPDATE cf_report_pdfs p
+    SET claimed_by = p_worker_id,
+        lease_expires_at = now() + make_interval(secs => p_lease_seconds)
+    FROM picked
+    WHERE p.pdf_id = picked.pdf_id
+    RETURNING p.*;
+$$;
+
+-- Heartbeat: extend every lease a worker still holds on unconverted PDFs
+DROP FUNCTION IF EXISTS public.renew_report_pdf_leases(text, integer);
+
+CREATE OR REPLACE FUNCTION public.renew_report_pdf_leases(
+    p_worker_id text,
+    p_lease_seconds integer DEFAULT 900
+)
+RETURNS integer
+LANGUAGE plpgsql
+SECURITY DEFINER
+AS $$
+DECLARE
+    v_renewed integer;
+BEGIN
+    UPDATE cf_report_pdfs
+    SET lease_expires_at = now() + make_interval(secs => p_lease_seconds)
+    WHERE claimed_by = p_worker_id
+      AND csv_converted = false
+      AND lease_expires_at > now();
+    GET DIAGNOSTICS v_renewed = ROW_COUNT;
+    RETURN v_renewed;
+END;
+$$;
+
+-- Give back a worker's claims (all of them, or just p_pdf_ids) so other nodes can take them
+DROP FUNCTION IF EXISTS public.release_report_pdfs(text, integer[]);
+
+CREATE OR REPLACE FUNCTION public.release_report_pdfs(
+    p_worker_id text,
+    p_pdf_ids integer[] DEFAULT NULL
+)
+RETURNS integer
+LANGUAGE plpgsql
+SECURITY DEFINER
+AS $$
+DECLARE
+    v_released integer;
+BEGIN
+    UPDATE cf_report_pdfs
+    SET claimed_by = NULL,
+        lease_expires_at = NULL
+    WHERE claimed_by = p_worker_id
+      AND (p_pdf_ids IS NULL OR pdf_id = ANY(p_pdf_ids));
+    GET DIAGNOSTICS v_released = ROW_COUNT;
+    RETURN v_released;
+END;
+$$;
+
+GRANT EXECUTE ON FUNCTION public.claim_report_pdfs(text, integer, integer, integer, integer[], integer[]) TO service_role;
+GRANT EXECUTE ON FUNCTION public.renew_report_pdf_leases(text, integer) TO service_role;
+GRANT EXECUTE ON FUNCTION public.release_report_pdfs(text, integer[]) TO service_role;
+
+-- See who holds what
+SELECT
+    claimed_by,
+    COUNT(*) FILTER (WHERE lease_expires_at > now()) as live_leases,
+    COUNT(*) FILTER (WHERE lease_expires_at <= now()) as expired_leases,
+    MAX(lease_expires_at) as latest_expiry
+FROM cf_report_pdfs
+WHERE claimed_by IS NOT NULL AND csv_converted = false
+GROUP BY claimed_by;
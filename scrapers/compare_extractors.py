@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+R vs Python extractor parity harness
+Runs r_scraper_fixed.R and c2_extractor.py over a local folder of PDFs and
+diffs the rows they produce, so step 3 can switch extractors without regressions.
+"""
+
+import argparse
+import csv
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import c2_extractor
+
+R_SCRAPER_PATH = Path(__file__).parent / "r_scraper_fixed.R"
+
+# Columns compared between the two extractors (META_ columns depend on file location)
+COMPARED_COLUMNS = c2_extractor.METADATA_COLUMNS + c2_extractor.DONATION_COLUMNS
+
+
+def read_rows(csv_path: Path) -> List[Dict[str, str]]:
+    """Read extractor output, keeping only the compared columns"""
+    with open(csv_path, 'r', encoding='utf-8', errors='ignore') as f:
+        reader = csv.DictReader(f)
+        return [
+            {col: row[col] for col in COMPARED_COLUMNS if col in row}
+            for row in reader
+        ]
+
+
+def run_r_extractor(pdf_path: Path, work_dir: Path, timeout: int) -> Optional[List[Dict[str, str]]]:
+    """Run the R scraper's command line mode; None if R failed"""
+    output_csv = work_dir / f"{pdf_path.stem}_r.csv"
+    try:
+        result = subprocess.run(
+            ['Rscript', str(R_SCRAPER_PATH), str(pdf_path), str(output_csv)],
+            capture_output=True,
+            text=True,
+            timeout=timeout
+        )
+    except subprocess.TimeoutExpired:
+        return None
+    if result.returncode != 0 or not output_csv.exists():
+        return None
+    return read_rows(output_csv)
+
+
+def run_python_extractor(pdf_path: Path, work_dir: Path) -> Optional[List[Dict[str, str]]]:
+    """Run the Python extractor through the same CSV round trip; None if it failed"""
+    output_csv = work_dir / f"{pdf_path.stem}_py.csv"
+    try:
+        rows = c2_extractor.extract_pdf(pdf_path)
+    except (c2_extractor.ExtractionError, subprocess.TimeoutExpired, OSError):
+        return None
+    c2_extractor.write_csv(rows, pdf_path, output_csv)
+    return read_rows(output_csv)
+
+
+def diff_rows(r_rows: List[Dict[str, str]], py_rows: List[Dict[str, str]]) -> List[str]:
+    """Describe every difference between the two row lists"""
+    diffs = []
+    if len(r_rows) != len(py_rows):
+        diffs.append(f"row count: R={len(r_rows)} Python={len(py_rows)}")
+
+    for i, (r_row, py_row) in enumerate(zip(r_rows, py_rows), start=1):
+        for col in COMPARED_COLUMNS:
+            r_val = r_row.get(col)
+            py_val = py_row.get(col)
+            if r_val != py_val:
+                diffs.append(f"row {i} {col}: R={r_val!r} Python={py_val!r}")
+    return diffs
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Diff R and Python extractor output over a PDF corpus')
+    parser.add_argument('corpus', type=Path,
+                       help='Folder of PDFs (searched recursively)')
+    parser.add_argument('--limit', type=int, default=None,
+                       help='Only compare the first N PDFs')
+    parser.add_argument('--timeout', type=int, default=120,
+                       help='Seconds allowed per R run (default: 120)')
+    parser.add_argument('--show', type=int, default=5,
+                       help='Differences to print per PDF (default: 5)')
+    args = parser.parse_args()
+
+    pdfs = sorted(args.corpus.rglob('*.pdf'))
+    if args.limit:
+        pdfs = pdfs[:args.limit]
+    if not pdfs:
+        print(f"No PDFs found under {args.corpus}")
+        return 1
+
+    print(f"🔍 Comparing extractors on {len(pdfs)} PDFs")
+
+    stats = {'match': 0, 'mismatch': 0, 'r_failed': 0, 'py_failed': 0, 'both_failed': 0}
+    r_seconds = py_seconds = 0.0
+
+    with tempfile.TemporaryDirectory() as tmp:
+        work_dir = Path(tmp)
+        for pdf_path in pdfs:
+            start = time.time()
+            r_rows = run_r_extractor(pdf_path, work_dir, args.timeout)
+            r_seconds += time.time() - start
+
+            start = time.time()
+            py_rows = run_python_extractor(pdf_path, work_dir)
+            py_seconds += time.time() - start
+
+            if r_rows is None and py_rows is None:
+                stats['both_failed'] += 1
+                continue
+            if r_rows is None:
+                stats['r_failed'] += 1
+                print(f"⚠️  {pdf_path.name}: R failed, Python produced {len(py_rows)} rows")
+                continue
+            if py_rows is None:
+                stats['py_failed'] += 1
+                print(f"❌ {pdf_path.name}: Python failed, R produced {len(r_rows)} rows")
+                continue
+
+            diffs = diff_rows(r_rows, py_rows)
+            if diffs:
+                stats['mismatch'] += 1
+                print(f"❌ {pdf_path.name}: {len(diffs)} differences")
+                for diff in diffs[:args.show]:
+                    print(f"     {diff}")
+            else:
+                stats['match'] += 1
+
+    print("\n" + "=" * 70)
+    print("📈 PARITY SUMMARY")
+    print("=" * 70)
+    print(f"  Identical: {stats['match']}")
+    print(f"  Different: {stats['mismatch']}")
+    print(f"  Python failed only: {stats['py_failed']}")
+    print(f"  R failed only: {stats['r_failed']}")
+    print(f"  Both failed: {stats['both_failed']}")
+    print(f"  R time: {r_seconds:.1f}s ({r_seconds / len(pdfs):.2f}s/PDF)")
+    print(f"  Python time: {py_seconds:.1f}s ({py_seconds / len(pdfs):.2f}s/PDF)")
+
+    return 0 if stats['mismatch'] == 0 and stats['py_failed'] == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
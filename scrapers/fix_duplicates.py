@@ -1,6 +1,8 @@
 #!/usr/bin/env python3
 """
 Remove duplicate donations from the database
+Only needed for donations loaded before cf_donations.donation_key (add_donation_key_column.sql);
+step 3 now upserts on that key, so re-runs no longer create duplicates
 """
 
 import os
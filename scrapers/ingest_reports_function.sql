@@ -0,0 +1,151 @@
+-- Atomic report ingest for step3_concurrent.py
+-- One call per PDF (or per group of PDFs) replaces the POST cf_reports /
+-- POST cf_donations batches / PATCH cf_report_pdfs round trips. The whole call
+-- runs in a single transaction, so a failure leaves no orphan reports behind.
+--
+-- p_reports is a JSON array of:
+--   {
+--     "pdf_id": 123,
+--     "report": { cf_reports columns (without report_id) },
+--     "donations": [ { cf_donations columns (without donation_id / report_id) }, ... ],
+--     "pdf_status": { "parser_name": "r", "parser_version": 1, "page_types": ["Schedule C2"] }
+--   }
+--
+-- Reports (and their donations) from an earlier parse of the same PDF are
+-- replaced, and donations upsert on donation_key. Requires
+-- add_parser_version_columns.sql and add_donation_key_column.sql.
+
+DROP FUNCTION IF EXISTS public.ingest_reports(jsonb);
+
+CREATE OR REPLACE FUNCTION public.ingest_reports(p_reports jsonb)
+RETURNS TABLE (
+    pdf_id int,
+    report_id int
+)
+LANGUAGE plpgsql
+SECURITY DEFINER
+AS $$
+#variable_conflict use_column
+DECLARE
+    v_item jsonb;
+    v_pdf_id int;
+    v_report_id int;
+BEGIN
+    FOR v_item IN SELECT * FROM jsonb_array_elements(p_reports)
+    LOOP
+        v_pdf_id := (v_item->>'pdf_id')::int;
+
+        -- Replace anything left by an earlier (or half-finished) parse of this PDF
+        DELETE FROM cf_donations d
+        USING cf_reports r
+        WHERE d.report_id = r.report_id AND r.pdf_id = v_pdf_id;
+        DELETE FROM cf_reports r WHERE r.pdf_id = v_pdf_id;
+
+        INSERT INTO cf_reports (
+            pdf_id, entity_id, rpt_title, rpt_name, rpt_cycle, rpt_file_date, rpt_period,
+            org_name, org_email, org_phone, org_address, org_treasurer, org_jurisdiction,
+            total_donations, donation_count, processed_date
+        )
+        SELECT
+            v_pdf_id, r.entity_id, r.rpt_title, r.rpt_name, r.rpt_cycle, r.rpt_file_date, r.rpt_period,
+            r.org_name, r.org_email, r.org_phone, r.org_address, r.org_treasurer, r.org_jurisdiction,
+            COALESCE(r.total_donations, 0), COALESCE(r.donation_count, 0),
+            COALESCE(r.processed_date, CURRENT_TIMESTAMP)
+        FROM jsonb_to_record(v_item->'report') AS r (
+            entity_id int,
+            rpt_title varchar,
+            rpt_name varchar,
+            rpt_cycle int,
+            rpt_file_date date,
+            rpt_period varchar,
+            org_name varchar,
+            org_email varchar,
+            org_phone varchar,
+            org_address text,
+            org_treasurer varchar,
+            org_jurisdiction varchar,
+            total_donations numeric,
+            donation_count int,
+            processed_date timestamp
+        )
+        RETURNING cf_reports.report_id INTO v_report_id;
+
+        INSERT INTO cf_donations (
+            report_id, entity_id, record_id, donor_name, donor_addr, donor_city, donor_state,
+            donor_zip, donor_full_address, donor_occupation, donor_employer, donation_date,
+            donation_amt, donation_type, cycle_to_date_amt, page_num, page_type,
+            meta_segment_name, meta_file_name, donor_person_id, is_pac, is_corporate, import_date,
+            donation_key
+        )
+        SELECT
+            v_report_id, d.entity_id, d.record_id, d.donor_name, d.donor_addr, d.donor_city, d.donor_state,
+            d.donor_zip, d.donor_full_address, d.donor_occupation, d.donor_employer, d.donation_date,
+            d.donation_amt, d.donation_type, d.cycle_to_date_amt, d.page_num, d.page_type,
+            d.meta_segment_name, d.meta_file_name, d.donor_person_id,
+            COALESCE(d.is_pac, false), COALESCE(d.is_corporate, false),
+            COALESCE(d.import_date, CURRENT_TIMESTAMP),
+            d.donation_key
+        FROM jsonb_to_recordset(COALESCE(v_item->'donations', '[]'::jsonb)) AS d (
+            entity_id int,
+            record_id int,
+            donor_name varchar,
+            donor_addr text,
+            donor_city varchar,
+            donor_state varchar,
+            donor_zip varchar,
+            donor_full_address text,
+            donor_occupation varchar,
+            donor_employer varchar,
+            donation_date date,
+            donation_amt numeric,
+            donation_type varchar,
+            cycle_to_date_amt numeric,
+            page_num int,
+            page_type varchar,
+            meta_segment_name varchar,
+            meta_file_name varchar,
+            donor_person_id int,
+            is_pac boolean,
+            is_corporate boolean,
+            import_date timestamp,
+            donation_key text
+        )
+        ON CONFLICT (donation_key) DO UPDATE SET
+            report_id = EXCLUDED.report_id,
+            entity_id = EXCLUDED.entity_id,
+            donor_name = EXCLUDED.donor_name,
+            donor_addr = EXCLUDED.donor_addr,
+            donor_city = EXCLUDED.donor_city,
+            donor_state = EXCLUDED.donor_state,
+            donor_zip = EXCLUDED.donor_zip,
+            donor_full_address = EXCLUDED.donor_full_address,
+            donor_occupation = EXCLUDED.donor_occupation,
+            donor_employer = EXCLUDED.donor_employer,
+            donation_type = EXCLUDED.donation_type,
+            cycle_to_date_amt = EXCLUDED.cycle_to_date_amt,
+            page_type = EXCLUDED.page_type,
+            meta_segment_name = EXCLUDED.meta_segment_name,
+            meta_file_name = EXCLUDED.meta_file_name,
+            is_pac = EXCLUDED.is_pac,
+            is_corporate = EXCLUDED.is_corporate,
+            import_date = EXCLUDED.import_date;
+
+        UPDATE cf_report_pdfs p
+        SET
+            csv_converted = true,
+            conversion_date = CURRENT_TIMESTAMP,
+            error_message = NULL,
+            parser_name = v_item->'pdf_status'->>'parser_name',
+            parser_version = (v_item->'pdf_status'->>'parser_version')::int,
+            page_types = ARRAY(SELECT jsonb_array_elements_text(COALESCE(v_item->'pdf_status'->'page_types', '[]'::jsonb)))
+        WHERE p.pdf_id = v_pdf_id;
+
+        pdf_id := v_pdf_id;
+        report_id := v_report_id;
+        RETURN NEXT;
+    END LOOP;
+END;
+$$;
+
+-- PostgREST exposes this as POST /rest/v1/rpc/ingest_reports {"p_reports": [...]}
+GRANT EXECUTE ON FUNCTION public.ingest_reports(jsonb) TO service_role;
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Lease-based PDF claims for running step 3 on several nodes at once
+Each node claims batches of unconverted PDFs under its own id through the
+claim_report_pdfs functions (claim_report_pdfs_functions.sql), so no two nodes
+parse the same PDF, and a node that dies only holds its PDFs until its leases expire.
+"""
+
+import time
+from threading import Lock, Thread
+from typing import Dict, List, Optional, Set
+
+import requests
+
+
+class LeaseClaimer:
+    """Claims batches of unconverted PDFs through claim_report_pdfs (claim_report_pdfs_functions.sql)
+
+    Claims are leases held under node_id: a heartbeat thread renews them every
+    lease_seconds / 3 while this node works, and close() releases whatever is left.
+    PDFs that fail are released after each batch (release_failed) so other nodes can
+    take them, and are left out of this node's later claims.
+    """
+
+    def __init__(self, supabase_url: str, supabase_key: str, node_id: str, lease_seconds: int = 900,
+                 entity_id: Optional[int] = None, timeout: float = 30):
+        self.rpc_url = f"{supabase_url}/rest/v1/rpc"
+        self.node_id = node_id
+        self.lease_seconds = lease_seconds
+        self.entity_id = entity_id
+        self.timeout = timeout
+        self.session = requests.Session()
+        self.headers = {
+            "apikey": supabase_key,
+            "Authorization": f"Bearer {supabase_key}",
+            "Content-Type": "application/json"
+        }
+        self.lock = Lock()
+        self.failed: Set[int] = set()  # Failed here: never claimed again by this node
+        self.to_release: Set[int] = set()
+        self.stopped = False
+        self.heartbeat = Thread(target=self._renew_periodically, name="lease-heartbeat", daemon=True)
+        self.heartbeat.start()
+
+    def _rpc(self, function: str, payload: Dict):
+        response = self.session.post(f"{self.rpc_url}/{function}", headers=self.headers, json=payload,
+                                     timeout=self.timeout)
+        response.raise_for_status()
+        return response.json()
+
+    def claim(self, limit: int, pdf_ids: Optional[List[int]] = None) -> List[Dict]:
+        """Lease up to limit PDFs to this node: any but those that already failed here, or just pdf_ids
+
+        pdf_ids are scheduled retries, so they may include PDFs that failed here.
+        """
+        with self.lock:
+            skip = None if pdf_ids else sorted(self.failed) or None
+        return self._rpc('claim_report_pdfs', {
+            'p_worker_id': self.node_id,
+            'p_limit': limit,
+            'p_lease_seconds': self.lease_seconds,
+            'p_entity_id': self.entity_id,
+            'p_skip_pdf_ids': skip,
+            'p_pdf_ids': pdf_ids or None
+        })
+
+    def mark_failed(self, pdf_id: int):
+        """Queue a failed PDF's lease for the next release_failed"""
+        with self.lock:
+            self.failed.add(pdf_id)
+            self.to_release.add(pdf_id)
+
+    def release_failed(self) -> int:
+        """Give the leases on PDFs marked failed back, so other nodes can take them"""
+        with self.lock:
+            pdf_ids, self.to_release = sorted(self.to_release), set()
+        if not pdf_ids:
+            return 0
+        try:
+            return self._rpc('release_report_pdfs', {'p_worker_id': self.node_id, 'p_pdf_ids': pdf_ids})
+        except requests.exceptions.RequestException as e:
+            # The heartbeat keeps renewing them; close() releases them at the latest
+            print(f"\n⚠️  Releasing {len(pdf_ids)} failed claims failed: {e}")
+            return 0
+
+    def renew(self) -> int:
+        return self._rpc('renew_report_pdf_leases', {
+            'p_worker_id': self.node_id,
+            'p_lease_seconds': self.lease_seconds
+        })
+
+    def _renew_periodically(self):
+        interval = max(self.lease_seconds / 3, 1)
+        while True:
+            time.sleep(interval)
+            if self.stopped:
+                return
+            try:
+                self.renew()
+            except requests.exceptions.RequestException as e:
+                # Try again next beat; leases are only lost if a whole lease period passes
+                print(f"\n⚠️  Lease renewal failed: {e}")
+
+    def close(self) -> int:
+        """Stop the heartbeat and release this node's remaining claims"""
+        self.stopped = True
+        try:
+            return self._rpc('release_report_pdfs', {'p_worker_id': self.node_id})
+        except requests.exceptions.RequestException:
+            return 0  # The leases expire on their own
@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+"""
+Content-addressed local PDF cache for step 3
+Maps pdf_url -> SHA-256 addressed file on disk so reprocessing runs
+(parser fixes, reset_failed_pdfs.py resets, address clean-ups) read PDFs
+locally instead of downloading the whole corpus again.
+
+Layout:
+    <root>/objects/ab/abcdef....pdf   one file per distinct PDF content
+    <root>/index.sqlite3              url -> sha256 (+ ETag/Last-Modified), object sizes and last access
+
+Also holds TextCache, the extracted-text cache keyed by the same hashes.
+"""
+
+import gzip
+import hashlib
+import os
+import shutil
+import sqlite3
+import time
+from pathlib import Path
+from threading import Lock, get_ident
+from typing import Dict, Iterator, List, Optional, Tuple, Union
+
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def sha256_file(path: Path) -> str:
+    """SHA-256 hex digest of a file"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def link_or_copy(src: Path, dest: Path):
+    """Hard link src to dest (cheap, same filesystem), falling back to a copy"""
+    dest.unlink(missing_ok=True)
+    try:
+        os.link(src, dest)
+    except OSError:
+        shutil.copyfile(src, dest)
+
+
+class PDFCache:
+    """On-disk PDF cache keyed by URL, stored by content hash, evicted least-recently-used"""
+
+    def __init__(self, root: Path, max_bytes: int):
+        self.root = Path(root)
+        self.objects_dir = self.root / "objects"
+        self.objects_dir.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.lock = Lock()
+
+        self.db = sqlite3.connect(str(self.root / "index.sqlite3"), check_same_thread=False)
+        self.db.executescript('''
+            CREATE TABLE IF NOT EXISTS urls (
+                url TEXT PRIMARY KEY,
+                sha256 TEXT NOT NULL,
+                etag TEXT,
+                last_modified TEXT,
+                fetched_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_urls_sha256 ON urls(sha256);
+            CREATE TABLE IF NOT EXISTS objects (
+                sha256 TEXT PRIMARY KEY,
+                size INTEGER NOT NULL,
+                last_access REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_objects_last_access ON objects(last_access);
+        ''')
+        self.db.commit()
+
+    def object_path(self, sha256: str) -> Path:
+        return self.objects_dir / sha256[:2] / f"{sha256}.pdf"
+
+    def lookup(self, url: str) -> Optional[Dict]:
+        """Cache entry for a URL (sha256, path, etag, last_modified), or None on a miss"""
+        with self.lock:
+            row = self.db.execute(
+                "SELECT sha256, etag, last_modified, fetched_at FROM urls WHERE url = ?", (url,)
+            ).fetchone()
+            if not row:
+                return None
+
+            sha256, etag, last_modified, fetched_at = row
+            path = self.object_path(sha256)
+            if not path.exists():
+                # Object was removed behind our back - forget the entry
+                self.db.execute("DELETE FROM urls WHERE sha256 = ?", (sha256,))
+                self.db.execute("DELETE FROM objects WHERE sha256 = ?", (sha256,))
+                self.db.commit()
+                return None
+
+            self.db.execute("UPDATE objects SET last_access = ? WHERE sha256 = ?", (time.time(), sha256))
+            self.db.commit()
+
+        return {
+            'sha256': sha256,
+            'path': path,
+            'etag': etag,
+            'last_modified': last_modified,
+            'fetched_at': fetched_at
+        }
+
+    def store(self, url: str, src: Union[Path, bytes], sha256: Optional[str] = None,
+              etag: Optional[str] = None, last_modified: Optional[str] = None) -> Dict:
+        """Add a downloaded file (left in place) or its bytes under the content hash and point url at it"""
+        if isinstance(src, bytes):
+            sha256 = sha256 or hashlib.sha256(src).hexdigest()
+        else:
+            sha256 = sha256 or sha256_file(src)
+        path = self.object_path(sha256)
+
+        with self.lock:
+            if not path.exists():
+                path.parent.mkdir(exist_ok=True)
+                tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
+                if isinstance(src, bytes):
+                    tmp_path.write_bytes(src)
+                else:
+                    link_or_copy(src, tmp_path)
+                os.replace(tmp_path, path)
+
+            now = time.time()
+            self.db.execute(
+                "INSERT OR REPLACE INTO objects (sha256, size, last_access) VALUES (?, ?, ?)",
+                (sha256, path.stat().st_size, now)
+            )
+            self.db.execute(
+                "INSERT OR REPLACE INTO urls (url, sha256, etag, last_modified, fetched_at) VALUES (?, ?, ?, ?, ?)",
+                (url, sha256, etag, last_modified, now)
+            )
+            self.db.commit()
+            self._evict()
+
+        return {'sha256': sha256, 'path': path, 'etag': etag, 'last_modified': last_modified, 'fetched_at': now}
+
+    def mark_validated(self, url: str):
+        """Record that the server confirmed the cached copy is current (HTTP 304)"""
+        with self.lock:
+            self.db.execute("UPDATE urls SET fetched_at = ? WHERE url = ?", (time.time(), url))
+            self.db.commit()
+
+    def total_bytes(self) -> int:
+        with self.lock:
+            return self.db.execute("SELECT COALESCE(SUM(size), 0) FROM objects").fetchone()[0]
+
+    def _evict(self):
+        """Drop least recently used objects until the cache fits in max_bytes (lock held)"""
+        total = self.db.execute("SELECT COALESCE(SUM(size), 0) FROM objects").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+
+        for sha256, size in self.db.execute(
+            "SELECT sha256, size FROM objects ORDER BY last_access"
+        ).fetchall():
+            if total <= self.max_bytes:
+                break
+            # Unlinking only removes the cache's link; PDFs being processed keep theirs
+            self.object_path(sha256).unlink(missing_ok=True)
+            self.db.execute("DELETE FROM objects WHERE sha256 = ?", (sha256,))
+            self.db.execute("DELETE FROM urls WHERE sha256 = ?", (sha256,))
+            total -= size
+
+        self.db.commit()
+
+    def close(self):
+        with self.lock:
+            self.db.close()
+
+
+class TextCache:
+    """Extracted per-page PDF text, gzip-compressed and keyed by PDF SHA-256 + extractor version
+
+    Pages are stored the way pdftotext writes them: each page followed by a
+    form feed. The R wrapper reads and writes the same format, so both
+    extractors can rerun parsing rules without re-extracting any PDF.
+    """
+
+    def __init__(self, root: Path):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    def path_for(self, sha256: str, version: str) -> Path:
+        return self.root / version / sha256[:2] / f"{sha256}.txt.gz"
+
+    def load(self, sha256: str, version: str) -> Optional[List[str]]:
+        """Cached pages, or None on a miss"""
+        path = self.path_for(sha256, version)
+        try:
+            with gzip.open(path, 'rt', encoding='utf-8', newline='') as f:
+                text = f.read()
+        except (FileNotFoundError, OSError, EOFError):
+            return None
+
+        pages = text.split('\f')
+        if pages and pages[-1] == '':
+            pages.pop()
+        return pages
+
+    def store(self, sha256: str, version: str, pages: List[str]):
+        """Write pages atomically (concurrent writers of the same key produce the same file)"""
+        path = self.path_for(sha256, version)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix(f".{os.getpid()}.{get_ident()}.tmp")
+        with gzip.open(tmp_path, 'wt', encoding='utf-8', newline='') as f:
+            f.write(''.join(page + '\f' for page in pages))
+        os.replace(tmp_path, path)
+
+    def iter_cached(self, version: str) -> Iterator[Tuple[str, List[str]]]:
+        """Every (sha256, pages) cached for an extractor version"""
+        for path in sorted((self.root / version).glob('*/*.txt.gz')):
+            sha256 = path.name[:-len('.txt.gz')]
+            pages = self.load(sha256, version)
+            if pages is not None:
+                yield sha256, pages
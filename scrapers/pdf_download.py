@@ -0,0 +1,22 @@
+#!/usr/bin/env python3
+"""
+PDF download checks shared by step 3's download paths
+The threaded downloader (requests) and AsyncDownloader (httpx) both read bodies
+in DOWNLOAD_CHUNK_SIZE chunks and only accept one once its byte count matches
+Content-Length, so a truncated download is retried instead of being parsed.
+"""
+
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+
+
+class IncompleteDownloadError(Exception):
+    """Response body ended before Content-Length bytes arrived"""
+
+
+def check_content_length(headers, received: int):
+    """Raise IncompleteDownloadError unless received matches the response's Content-Length"""
+    expected = headers.get('Content-Length')
+    # Content-Length is the encoded size, so only compare for unencoded bodies
+    if expected and expected.isdigit() and not headers.get('Content-Encoding'):
+        if received != int(expected):
+            raise IncompleteDownloadError(f"got {received} of {expected} bytes")
@@ -0,0 +1,273 @@
+#!/usr/bin/env python3
+"""
+Long-lived R processes for step 3
+Each RWorker runs one Rscript that loads its libraries and the scraper once, then
+scrapes PDFs sent over stdin, so a PDF costs one TEMP_FUNC call instead of an R
+start-up. RWorkerPool hands the workers out to step 3's threads.
+
+setup_script is the R code that defines the scraping helpers the loop calls
+(scrape_pdf_to_csv, scrape_raw_to_stdout); step 3 passes R_SCRAPER_SETUP.
+
+The tail of each process's stderr is kept and printed when it exits or fails to
+start, so a broken R setup shows R's own error rather than only failed PDFs.
+
+Protocol (one request at a time per process):
+    READY   "@@READY<TAB>TRUE|FALSE" once started (whether TEMP_FUNC takes pages=)
+    request "pdf_path<TAB>output_csv<TAB>text_cache_path<TAB>page_list"
+            or "@@RAW<TAB>n_bytes<TAB>pdf_name<TAB>text_cache_path" + the PDF's bytes,
+            answered with "@@ROWS" and the CSV rows on stdout
+    reply   "@@DONE<TAB>OK<TAB>rows" or "@@DONE<TAB>ERROR<TAB>message"
+"""
+
+import subprocess
+import time
+from collections import deque
+from pathlib import Path
+from queue import Empty, Queue
+from threading import Thread
+from typing import List, Optional, Tuple
+
+R_WORKER_STARTUP_TIMEOUT = 120  # Seconds to wait for libraries to load
+R_WORKER_DONE_MARKER = "@@DONE"
+R_WORKER_READY_MARKER = "@@READY"
+R_WORKER_RAW_MARKER = "@@RAW"  # Request line for a PDF sent as bytes (in-memory mode)
+R_WORKER_ROWS_MARKER = "@@ROWS"  # Precedes CSV rows written to stdout (in-memory mode)
+R_WORKER_STDERR_LINES = 20  # Tail of R's stderr kept to explain a worker that exits or fails to start
+
+# Long-lived worker: reads "pdf_path<TAB>output_path<TAB>text_cache_path<TAB>page_list" lines from stdin,
+# or "@@RAW<TAB>n_bytes<TAB>pdf_name<TAB>text_cache_path" followed by the PDF's bytes (rows go to stdout)
+R_WORKER_LOOP = '''
+con <- file("stdin")
+open(con, "rb", blocking = TRUE)
+# READY reports whether TEMP_FUNC takes pages= (needed to parse a page subset)
+cat("@@READY\\t", "pages" %in% names(formals(TEMP_FUNC)), "\\n", sep = "")
+flush(stdout())
+
+repeat {
+    line <- readLines(con, n = 1)
+    if (length(line) == 0) break
+
+    fields <- strsplit(line, "\\t", fixed = TRUE)[[1]]
+    status <- tryCatch({
+        n <- if (fields[1] == "@@RAW") {
+            pdf_raw <- readBin(con, "raw", n = as.numeric(fields[2]))
+            scrape_raw_to_stdout(pdf_raw, fields[3], if (length(fields) >= 4) fields[4] else "")
+        } else {
+            scrape_pdf_to_csv(fields[1], fields[2], if (length(fields) >= 3) fields[3] else "",
+                              if (length(fields) >= 4) fields[4] else "")
+        }
+        paste0("OK\\t", n)
+    }, error = function(e) {
+        paste0("ERROR\\t", gsub("[\\r\\n\\t]", " ", conditionMessage(e)))
+    })
+
+    cat("@@DONE\\t", status, "\\n", sep = "")
+    flush(stdout())
+}
+'''
+
+
+class RWorker:
+    """A long-lived Rscript process that loads its libraries once and scrapes PDFs sent over stdin"""
+
+    def __init__(self, worker_id: int, script_dir: Path, setup_script: str):
+        self.worker_id = worker_id
+        self.script_path = script_dir / f"pdf_scraper_worker_{worker_id}.R"
+        self.setup_script = setup_script
+        self.process = None
+        self.lines = None
+        self.crashed = False
+        self.takes_pages = False  # TEMP_FUNC accepts pages= (from the READY line)
+        self.stderr_tail = deque(maxlen=R_WORKER_STDERR_LINES)
+        self.stderr_reader = None
+
+    @staticmethod
+    def _read_stdout(process: subprocess.Popen, lines: Queue):
+        """Forward the process's stdout lines to a queue so reads can time out"""
+        for line in process.stdout:
+            lines.put(line.rstrip('\n'))
+        lines.put(None)  # EOF - the process exited
+
+    @staticmethod
+    def _read_stderr(process: subprocess.Popen, tail: deque):
+        """Keep the last lines R wrote to stderr (library errors, warnings) for _report_exit"""
+        for line in process.stderr:
+            tail.append(line.rstrip('\n'))
+
+    def _report_exit(self, what: str):
+        """Print the end of R's stderr for a process that exited or failed to start"""
+        if self.stderr_reader is not None:
+            self.stderr_reader.join(timeout=1)  # Let it drain what the process wrote before exiting
+        detail = ''.join(f"\n    {line}" for line in self.stderr_tail) or " (nothing on stderr)"
+        print(f"\n⚠️ R worker {self.worker_id} {what}:{detail}")
+
+    def _wait_for(self, marker: str, timeout: float, output: Optional[List[str]] = None) -> Optional[str]:
+        """Wait for a protocol line starting with marker; None on timeout or crash
+
+        Lines read on the way are appended to output when it is given.
+        """
+        deadline = time.time() + timeout
+        while True:
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                return None
+            try:
+                line = self.lines.get(timeout=remaining)
+            except Empty:
+                return None
+            if line is None:
+                self.crashed = True
+                return None
+            if line.startswith(marker):
+                return line
+            if output is not None:
+                output.append(line)
+            # Anything else is chatter from TEMP_FUNC (e.g. "ERROR: Failed to read PDF") or in-memory rows
+
+    def start(self) -> bool:
+        """Start the R process and wait until its libraries are loaded"""
+        with open(self.script_path, 'w') as f:
+            f.write(self.setup_script + R_WORKER_LOOP)
+
+        self.process = subprocess.Popen(
+            ['Rscript', str(self.script_path)],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            text=True,
+            bufsize=1
+        )
+        self.lines = Queue()
+        self.crashed = False
+        self.stderr_tail = deque(maxlen=R_WORKER_STDERR_LINES)
+        Thread(target=self._read_stdout, args=(self.process, self.lines), daemon=True).start()
+        self.stderr_reader = Thread(target=self._read_stderr, args=(self.process, self.stderr_tail), daemon=True)
+        self.stderr_reader.start()
+
+        line = self._wait_for(R_WORKER_READY_MARKER, R_WORKER_STARTUP_TIMEOUT)
+        if line is None:
+            if not self.crashed:
+                self.process.kill()
+            self.stop()
+            self._report_exit('exited while starting' if self.crashed else 'did not start in time')
+            return False
+        self.takes_pages = line.split('\t')[1:2] == ['TRUE']
+        return True
+
+    def stop(self):
+        """Stop the R process, killing it if it doesn't exit on its own"""
+        if not self.process:
+            return
+        try:
+            self.process.stdin.close()
+            self.process.wait(timeout=5)
+        except Exception:
+            self.process.kill()
+            self.process.wait()
+        self.process = None
+        self.lines = None
+
+    def is_alive(self) -> bool:
+        return self.process is not None and self.process.poll() is None
+
+    def run(self, pdf_path: Path, output_csv: Path, timeout: float, text_cache_path: str = '',
+            page_list: str = '') -> str:
+        """Scrape one PDF. Returns 'ok', 'error' or 'timeout'; restarts R after crashes and timeouts"""
+        return self._request(f"{pdf_path}\t{output_csv}\t{text_cache_path}\t{page_list}\n", timeout)
+
+    def run_raw(self, pdf_bytes: bytes, pdf_name: Path, timeout: float,
+                text_cache_path: str = '') -> Tuple[str, Optional[str]]:
+        """Scrape a PDF sent as bytes on stdin. Returns (status as in run, CSV text of its rows when 'ok')"""
+        output = []
+        status = self._request(f"{R_WORKER_RAW_MARKER}\t{len(pdf_bytes)}\t{pdf_name}\t{text_cache_path}\n",
+                               timeout, pdf_bytes, output)
+        if status != 'ok' or R_WORKER_ROWS_MARKER not in output:
+            return ('error' if status == 'ok' else status), None
+        start = len(output) - output[::-1].index(R_WORKER_ROWS_MARKER)
+        return status, '\n'.join(output[start:])
+
+    def _request(self, request: str, timeout: float, payload: bytes = b'',
+                 output: Optional[List[str]] = None) -> str:
+        """Send one request line (and payload bytes) and wait for its @@DONE line"""
+        if not self.is_alive():
+            self.stop()
+            if not self.start():
+                return 'error'
+
+        try:
+            self.process.stdin.write(request)
+            self.process.stdin.flush()
+            if payload:
+                self.process.stdin.buffer.write(payload)
+                self.process.stdin.buffer.flush()
+        except (BrokenPipeError, OSError):
+            self.stop()
+            return 'error'
+
+        line = self._wait_for(R_WORKER_DONE_MARKER, timeout, output)
+        if line is None:
+            # Hung or crashed - kill it so the next job gets a fresh process
+            timed_out = not self.crashed
+            if timed_out:
+                self.process.kill()
+            self.stop()
+            if not timed_out:
+                self._report_exit('exited')
+            return 'timeout' if timed_out else 'error'
+
+        fields = line.split('\t')
+        return 'ok' if len(fields) > 1 and fields[1] == 'OK' else 'error'
+
+
+class RWorkerPool:
+    """Pool of long-lived R processes, one per step 3 worker"""
+
+    def __init__(self, size: int, script_dir: Path, setup_script: str):
+        self.workers = [RWorker(i, script_dir, setup_script) for i in range(size)]
+        self.idle = Queue()
+        for worker in self.workers:
+            self.idle.put(worker)
+        self.pages_supported: Optional[bool] = None
+
+    def start(self) -> int:
+        """Start every R process at once; returns how many started (0 means R can't run the scraper)"""
+        threads = [Thread(target=worker.start, daemon=True) for worker in self.workers]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return sum(worker.is_alive() for worker in self.workers)
+
+    def takes_pages(self) -> bool:
+        """Whether the scraper's TEMP_FUNC accepts pages= (as reported by an R process when it starts)"""
+        if self.pages_supported is None:
+            worker = self.idle.get()
+            try:
+                if worker.is_alive() or worker.start():
+                    self.pages_supported = worker.takes_pages
+            finally:
+                self.idle.put(worker)
+        return bool(self.pages_supported)
+
+    def run(self, pdf_path: Path, output_csv: Path, timeout: float, text_cache_path: str = '',
+            page_list: str = '') -> str:
+        """Scrape a PDF on the next free R process"""
+        worker = self.idle.get()
+        try:
+            return worker.run(pdf_path, output_csv, timeout, text_cache_path, page_list)
+        finally:
+            self.idle.put(worker)
+
+    def run_raw(self, pdf_bytes: bytes, pdf_name: Path, timeout: float,
+                text_cache_path: str = '') -> Tuple[str, Optional[str]]:
+        """Scrape PDF bytes on the next free R process (see RWorker.run_raw)"""
+        worker = self.idle.get()
+        try:
+            return worker.run_raw(pdf_bytes, pdf_name, timeout, text_cache_path)
+        finally:
+            self.idle.put(worker)
+
+    def close(self):
+        """Shut down every R process"""
+        for worker in self.workers:
+            worker.stop()
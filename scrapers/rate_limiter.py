@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+Process-wide per-host rate limiting for seethemoney.az.gov (and any other host we scrape)
+Every step and every worker thread draws from one token bucket per host, so
+worker counts can go up without multiplying the request rate.
+
+The bucket slows down on its own when the server pushes back: a 429 or 503
+halves the host's rate (and honours Retry-After), and each successful response
+wins a little of it back until the configured rate is reached again
+(additive increase, multiplicative decrease).
+
+Usage:
+    from rate_limiter import RateLimitedSession, configure
+    configure(args.rps)                 # every host
+    configure(2.0, 'seethemoney.az.gov')  # or one host
+    session = RateLimitedSession()      # drop-in requests.Session
+"""
+
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from threading import Lock
+from typing import Dict, Optional
+from urllib.parse import urlsplit
+
+import requests
+
+DEFAULT_RPS = 5.0
+MIN_RPS = 0.2  # Floor for slow-downs, so a host is never starved completely
+INCREASE_FRACTION = 0.02  # Share of the configured rate won back per successful response
+SLOW_DOWN_STATUSES = (429, 503)
+
+
+class TokenBucket:
+    """Token bucket for one host: rate tokens per second, up to burst saved up"""
+
+    def __init__(self, rate: float, burst: Optional[float] = None):
+        self.target_rate = rate
+        self.rate = rate
+        self.burst = burst or max(1.0, rate)
+        self.tokens = self.burst
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self.last_slow_down = 0.0
+        self.lock = Lock()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self) -> float:
+        """Take a token; returns how long the caller must wait before sending its request
+
+        Each caller reserves its token up front (the balance may go negative),
+        so waiting callers are served in arrival order. asyncio code sleeps on
+        this itself; threads use acquire().
+        """
+        with self.lock:
+            now = time.monotonic()
+            self._refill(now)
+            self.tokens -= 1
+            return max(-self.tokens / self.rate, self.paused_until - now, 0.0)
+
+    def acquire(self):
+        """Block until this caller may send a request"""
+        wait = self.reserve()
+        if wait > 0:
+            time.sleep(wait)
+
+    def record_response(self, status_code: int, retry_after: Optional[str] = None):
+        """Adjust the rate to a response: slow down on 429/503, recover on anything below 500"""
+        if status_code in SLOW_DOWN_STATUSES:
+            self.slow_down(parse_retry_after(retry_after))
+        elif status_code < 500:
+            self.speed_up()
+
+    def slow_down(self, retry_after: Optional[float] = None):
+        """Halve the rate (at most once per request interval, so one burst of 429s counts once)"""
+        with self.lock:
+            now = time.monotonic()
+            if now - self.last_slow_down >= 1 / self.rate:
+                self.rate = max(MIN_RPS, self.rate / 2)
+                self.last_slow_down = now
+            if retry_after:
+                self.paused_until = max(self.paused_until, now + retry_after)
+
+    def speed_up(self):
+        """Win back part of the configured rate after a successful response"""
+        with self.lock:
+            if self.rate < self.target_rate:
+                self.rate = min(self.target_rate, self.rate + self.target_rate * INCREASE_FRACTION)
+
+    def set_rate(self, rate: float):
+        with self.lock:
+            self._refill(time.monotonic())
+            self.target_rate = self.rate = rate
+            self.burst = max(1.0, rate)
+
+
+_lock = Lock()
+_default_rps = DEFAULT_RPS
+_host_rps: Dict[str, float] = {}
+_buckets: Dict[str, TokenBucket] = {}
+
+
+def configure(rps: float, host: Optional[str] = None):
+    """Set the requests-per-second limit for one host, or the default for every host"""
+    global _default_rps
+    with _lock:
+        if host is None:
+            _default_rps = rps
+            for bucket_host, bucket in _buckets.items():
+                if bucket_host not in _host_rps:
+                    bucket.set_rate(rps)
+        else:
+            _host_rps[host] = rps
+            if host in _buckets:
+                _buckets[host].set_rate(rps)
+
+
+def bucket_for(url: str) -> TokenBucket:
+    """The shared bucket for a URL's host"""
+    host = urlsplit(url).hostname or ''
+    with _lock:
+        bucket = _buckets.get(host)
+        if bucket is None:
+            bucket = _buckets[host] = TokenBucket(_host_rps.get(host, _default_rps))
+        return bucket
+
+
+def current_rate(url: str) -> float:
+    """Requests per second the URL's host is allowed right now (after any slow-downs)"""
+    return bucket_for(url).rate
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Seconds from a Retry-After header (delta-seconds or HTTP date), None if absent or unreadable"""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        return max(0.0, (parsedate_to_datetime(value) - datetime.now(timezone.utc)).total_seconds())
+    except (TypeError, ValueError):
+        return None
+
+
+class RateLimitedSession(requests.Session):
+    """requests.Session whose requests wait for their host's token bucket and feed its slow-downs"""
+
+    def request(self, method, url, *args, **kwargs):
+        bucket = bucket_for(url)
+        bucket.acquire()
+        response = super().request(method, url, *args, **kwargs)
+        bucket.record_response(response.status_code, response.headers.get('Retry-After'))
+        return response
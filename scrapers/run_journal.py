@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+"""
+Crash-safe run journal for step 3
+Records each PDF's stage transitions in a local SQLite file, so a run that was
+killed (crash, Ctrl+C) picks every PDF up after its last completed stage
+instead of downloading, parsing or uploading it again.
+
+Stages, in order:
+    downloaded          PDF is in the temp folder (pdf_path)
+    parsed              extracted CSV written (csv_path)
+    report_created      cf_reports header exists (report_id) - legacy upload only
+    donations_uploaded  donations stored under report_id - legacy upload only
+    marked              cf_report_pdfs.csv_converted is set; nothing left to do
+
+The ingest_reports RPC creates the report, stores the donations and marks the
+PDF in one transaction, so with it a PDF goes straight from parsed to marked.
+
+Tables:
+    pdf_state     one row per PDF: last stage plus what the later stages need
+    transitions   append-only log of every stage change
+    dead_letters  PDFs whose last attempt failed: failure class, attempts and
+                  when the next retry is due (exponential backoff; NULL once
+                  out of retries). taken_at marks retries handed out this run
+    passed_over   (temporary) released dead letters this run's filters don't
+                  cover; they stay scheduled for a run that does
+"""
+
+import sqlite3
+import time
+from pathlib import Path
+from threading import Lock
+from typing import Dict, Iterable, List, Optional
+
+STAGES = ('downloaded', 'parsed', 'report_created', 'donations_uploaded', 'marked')
+
+
+def stage_reached(state: Optional[Dict], stage: str) -> bool:
+    """True when a journal state (RunJournal.state) is at or past stage"""
+    return state is not None and STAGES.index(state['stage']) >= STAGES.index(stage)
+
+
+class RunJournal:
+    """Per-PDF stage journal, keyed by pdf_id and the parser that produced its rows
+
+    parser identifies the extractor and parsing rules (e.g. "r-1"); entries
+    written by a different parser are ignored, so a parser version bump
+    starts every PDF over.
+    """
+
+    def __init__(self, path: Path, parser: str):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.parser = parser
+        self.lock = Lock()
+
+        self.db = sqlite3.connect(str(self.path), check_same_thread=False)
+        self.db.executescript('''
+            PRAGMA journal_mode = WAL;
+            CREATE TABLE IF NOT EXISTS pdf_state (
+                pdf_id INTEGER PRIMARY KEY,
+                parser TEXT NOT NULL,
+                stage TEXT NOT NULL,
+                pdf_path TEXT,
+                csv_path TEXT,
+                report_id INTEGER,
+                updated_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_pdf_state_stage ON pdf_state(stage);
+            CREATE TABLE IF NOT EXISTS transitions (
+                pdf_id INTEGER NOT NULL,
+                stage TEXT NOT NULL,
+                at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_transitions_pdf_id ON transitions(pdf_id);
+            CREATE TABLE IF NOT EXISTS dead_letters (
+                pdf_id INTEGER PRIMARY KEY,
+                failure_class TEXT NOT NULL,
+                error TEXT,
+                attempts INTEGER NOT NULL,
+                first_failed_at REAL NOT NULL,
+                last_failed_at REAL NOT NULL,
+                next_eligible_at REAL,
+                taken_at REAL
+            );
+            CREATE INDEX IF NOT EXISTS idx_dead_letters_next_eligible_at ON dead_letters(next_eligible_at);
+        ''')
+        # Retries handed out by a run that died never reported back - make them due again
+        self.db.execute("UPDATE dead_letters SET taken_at = NULL WHERE taken_at IS NOT NULL")
+        self.db.execute("CREATE TEMP TABLE passed_over (pdf_id INTEGER PRIMARY KEY)")
+        self.db.commit()
+
+    def state(self, pdf_id: int) -> Optional[Dict]:
+        """Last recorded stage for a PDF (with pdf_path, csv_path, report_id), or None"""
+        with self.lock:
+            row = self.db.execute(
+                "SELECT stage, pdf_path, csv_path, report_id, updated_at FROM pdf_state "
+                "WHERE pdf_id = ? AND parser = ?",
+                (pdf_id, self.parser)
+            ).fetchone()
+        if not row:
+            return None
+
+        stage, pdf_path, csv_path, report_id, updated_at = row
+        return {
+            'stage': stage,
+            'pdf_path': Path(pdf_path) if pdf_path else None,
+            'csv_path': Path(csv_path) if csv_path else None,
+            'report_id': report_id,
+            'updated_at': updated_at
+        }
+
+    def record(self, pdf_id: int, stage: str, pdf_path: Optional[Path] = None,
+               csv_path: Optional[Path] = None, report_id: Optional[int] = None):
+        """Record that a PDF completed stage; fields not given keep their earlier values
+
+        Starting over at 'downloaded' (or under a new parser) clears what the
+        previous attempt left behind.
+        """
+        self.record_many([pdf_id], stage, pdf_path, csv_path, report_id)
+
+    def record_many(self, pdf_ids: Iterable[int], stage: str, pdf_path: Optional[Path] = None,
+                    csv_path: Optional[Path] = None, report_id: Optional[int] = None):
+        if stage not in STAGES:
+            raise ValueError(f"Unknown stage: {stage}")
+
+        now = time.time()
+        fresh = stage == 'downloaded'
+        with self.lock:
+            for pdf_id in pdf_ids:
+                self.db.execute('''
+                    INSERT INTO pdf_state (pdf_id, parser, stage, pdf_path, csv_path, report_id, updated_at)
+                    VALUES (?, ?, ?, ?, ?, ?, ?)
+                    ON CONFLICT(pdf_id) DO UPDATE SET
+                        parser = excluded.parser,
+                        stage = excluded.stage,
+                        pdf_path = CASE WHEN ? OR pdf_state.parser != excluded.parser
+                            THEN excluded.pdf_path ELSE COALESCE(excluded.pdf_path, pdf_state.pdf_path) END,
+                        csv_path = CASE WHEN ? OR pdf_state.parser != excluded.parser
+                            THEN excluded.csv_path ELSE COALESCE(excluded.csv_path, pdf_state.csv_path) END,
+                        report_id = CASE WHEN ? OR pdf_state.parser != excluded.parser
+                            THEN excluded.report_id ELSE COALESCE(excluded.report_id, pdf_state.report_id) END,
+                        updated_at = excluded.updated_at
+                ''', (pdf_id, self.parser, stage,
+                      str(pdf_path) if pdf_path else None, str(csv_path) if csv_path else None,
+                      report_id, now, fresh, fresh, fresh))
+                self.db.execute("INSERT INTO transitions (pdf_id, stage, at) VALUES (?, ?, ?)",
+                                (pdf_id, stage, now))
+            self.db.commit()
+
+    def stage_counts(self) -> Dict[str, int]:
+        """PDFs at each stage for the current parser"""
+        with self.lock:
+            rows = self.db.execute(
+                "SELECT stage, COUNT(*) FROM pdf_state WHERE parser = ? GROUP BY stage", (self.parser,)
+            ).fetchall()
+        return dict(rows)
+
+    def dead_letter(self, pdf_id: int, failure_class: str, error: Optional[str],
+                    max_retries: int, base_seconds: float) -> Optional[float]:
+        """Record a failed attempt; returns when the PDF may be retried (epoch seconds), None once out of retries
+
+        Failure n schedules the next try base_seconds * 2 ** (n - 1) later.
+        """
+        now = time.time()
+        with self.lock:
+            row = self.db.execute("SELECT attempts FROM dead_letters WHERE pdf_id = ?", (pdf_id,)).fetchone()
+            attempts = (row[0] if row else 0) + 1
+            next_eligible_at = now + base_seconds * 2 ** (attempts - 1) if attempts <= max_retries else None
+            self.db.execute('''
+                INSERT INTO dead_letters (pdf_id, failure_class, error, attempts, first_failed_at,
+                                          last_failed_at, next_eligible_at, taken_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, NULL)
+                ON CONFLICT(pdf_id) DO UPDATE SET
+                    failure_class = excluded.failure_class,
+                    error = excluded.error,
+                    attempts = excluded.attempts,
+                    last_failed_at = excluded.last_failed_at,
+                    next_eligible_at = excluded.next_eligible_at,
+                    taken_at = NULL
+            ''', (pdf_id, failure_class, error, attempts, now, now, next_eligible_at))
+            self.db.commit()
+        return next_eligible_at
+
+    def resolve_dead_letter(self, pdf_id: int):
+        """Forget a PDF's failures once it goes through"""
+        with self.lock:
+            self.db.execute("DELETE FROM dead_letters WHERE pdf_id = ?", (pdf_id,))
+            self.db.commit()
+
+    def release_dead_letters(self, pdf_ids: Iterable[int]):
+        """Hand taken retries back untouched (attempts and next_eligible_at are kept)
+
+        Released PDFs are not offered again for the rest of this run.
+        """
+        pdf_ids = [(pdf_id,) for pdf_id in pdf_ids]
+        with self.lock:
+            self.db.executemany("UPDATE dead_letters SET taken_at = NULL WHERE pdf_id = ?", pdf_ids)
+            self.db.executemany("INSERT OR IGNORE INTO passed_over (pdf_id) VALUES (?)", pdf_ids)
+            self.db.commit()
+
+    def take_due_retries(self, limit: int) -> List[int]:
+        """pdf_ids whose retry is due, earliest first, marked taken until their result comes back"""
+        now = time.time()
+        with self.lock:
+            pdf_ids = [row[0] for row in self.db.execute(
+                "SELECT pdf_id FROM dead_letters WHERE next_eligible_at <= ? AND taken_at IS NULL "
+                "AND pdf_id NOT IN (SELECT pdf_id FROM passed_over) ORDER BY next_eligible_at LIMIT ?",
+                (now, limit)
+            )]
+            self.db.executemany("UPDATE dead_letters SET taken_at = ? WHERE pdf_id = ?",
+                                [(now, pdf_id) for pdf_id in pdf_ids])
+            self.db.commit()
+        return pdf_ids
+
+    def next_retry_at(self) -> Optional[float]:
+        """When the earliest scheduled (not yet taken) retry is due, None if there is none"""
+        with self.lock:
+            return self.db.execute(
+                "SELECT MIN(next_eligible_at) FROM dead_letters WHERE taken_at IS NULL "
+                "AND pdf_id NOT IN (SELECT pdf_id FROM passed_over)"
+            ).fetchone()[0]
+
+    def dead_letter_counts(self) -> Dict[str, int]:
+        """PDFs in the dead-letter store by failure class"""
+        with self.lock:
+            rows = self.db.execute(
+                "SELECT failure_class, COUNT(*) FROM dead_letters GROUP BY failure_class"
+            ).fetchall()
+        return dict(rows)
+
+    def close(self):
+        with self.lock:
+            self.db.close()
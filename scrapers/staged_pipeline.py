@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+"""
+Staged download -> parse -> upload pipeline for step 3 (--pipeline)
+Each stage has its own thread pool, sized for what it waits on (network, CPU /
+R processes, Supabase), and the stages are joined by bounded queues so memory
+stays flat however long the PDF list is.
+"""
+
+from itertools import count
+from queue import Empty, Full, PriorityQueue, Queue
+from threading import Thread
+from typing import TYPE_CHECKING, Callable, Dict, List, Optional, Tuple
+
+from async_downloader import AsyncDownloader
+
+if TYPE_CHECKING:
+    from step3_concurrent import PDFDonationProcessor
+
+
+class LongestFirstQueue(PriorityQueue):
+    """Bounded queue of downloaded items that hands out the PDF with the most pages first
+
+    Big filings start as early as possible instead of being the last thing running.
+    None (the shutdown sentinel) sorts after every item.
+    """
+
+    def __init__(self, maxsize: int = 0):
+        super().__init__(maxsize)
+        self.counter = count()
+
+    def put(self, item, block=True, timeout=None):
+        priority = float('inf') if item is None else -(item.get('page_count') or 0)
+        super().put((priority, next(self.counter), item), block, timeout)
+
+    def get(self, block=True, timeout=None):
+        return super().get(block, timeout)[2]
+
+
+class StagedPipeline:
+    """Download -> parse -> upload stages, each with its own thread pool, joined by bounded queues
+
+    A full queue blocks the stage feeding it, so fast downloaders can't run far
+    ahead of the parsers and a slow upload backs the whole pipeline off. Parse
+    queues are longest-first, and PDFs with big_pdf_pages or more pages go to a
+    separate lane (parse_big) so they don't tie up every regular parser at once.
+
+    processor_factory returns the calling thread's PDFDonationProcessor, which
+    does the work of each stage. Feeding stops early once stop_requested() is true.
+    """
+
+    def __init__(self, download_workers: int, parse_workers: int, upload_workers: int,
+                 queue_size: int, processor_factory: Callable[[], 'PDFDonationProcessor'],
+                 upload_window: int = 1, big_parse_workers: int = 0, big_pdf_pages: int = 100,
+                 async_downloader: Optional[AsyncDownloader] = None,
+                 stop_requested: Callable[[], bool] = lambda: False):
+        self.processor_factory = processor_factory
+        self.stop_requested = stop_requested
+        self.upload_window = upload_window
+        self.big_pdf_pages = big_pdf_pages
+        # With an async_downloader, one asyncio thread replaces the download worker threads
+        self.async_downloader = async_downloader
+        self.stage_workers = {
+            'download': 1 if self.async_downloader else download_workers,
+            'parse': parse_workers,
+            'parse_big': big_parse_workers,
+            'upload': upload_workers
+        }
+        self.queues = {
+            'download': Queue(maxsize=queue_size),
+            'parse': LongestFirstQueue(maxsize=queue_size),
+            'parse_big': LongestFirstQueue(maxsize=queue_size),
+            'upload': Queue(maxsize=queue_size)
+        }
+        self.results = Queue()
+
+    def queue_depths(self) -> Dict[str, int]:
+        """Items waiting in front of each stage"""
+        return {stage: q.qsize() for stage, q in self.queues.items()}
+
+    def _download_worker(self):
+        if self.async_downloader is not None:
+            self.async_downloader.run(self.queues['download'], self.processor_factory, self._route_download)
+            return
+        processor = self.processor_factory()
+        while True:
+            pdf_record = self.queues['download'].get()
+            if pdf_record is None:
+                return
+            try:
+                item = processor.download_stage(pdf_record)
+            except Exception as e:
+                item = {'result': {**processor.new_result(pdf_record), 'error': str(e)}, 'pdf_path': None}
+            self._route_download(item)
+
+    def _route_download(self, item: Dict, block: bool = True) -> bool:
+        """Send a downloaded item to its parse lane, a resumed parsed one to upload, a failed one to results
+
+        With block=False, returns False instead of waiting when the next queue is full.
+        """
+        try:
+            if item['pdf_path']:
+                big = self.stage_workers['parse_big'] and (item.get('page_count') or 0) >= self.big_pdf_pages
+                self.queues['parse_big' if big else 'parse'].put(item, block)
+            elif item.get('csv_path'):
+                self.queues['upload'].put(item, block)  # Parsed before a restart (run journal)
+            else:
+                self.results.put(item['result'])
+        except Full:
+            return False
+        return True
+
+    def _parse_worker(self, stage: str = 'parse'):
+        processor = self.processor_factory()
+        while True:
+            item = self.queues[stage].get()
+            if item is None:
+                return
+            try:
+                processor.parse_stage(item)
+            except Exception as e:
+                item['result']['error'] = str(e)
+            if processor.is_parsed(item):
+                self.queues['upload'].put(item)
+            else:
+                self.results.put(item['result'])
+
+    def _take_upload_window(self) -> Tuple[List[Dict], bool]:
+        """Block for one parsed item, then take whatever else is already waiting (up to upload_window).
+        Returns (items, stop) where stop means this worker's shutdown sentinel was taken."""
+        item = self.queues['upload'].get()
+        if item is None:
+            return [], True
+
+        items = [item]
+        while len(items) < self.upload_window:
+            try:
+                item = self.queues['upload'].get_nowait()
+            except Empty:
+                break
+            if item is None:
+                return items, True
+            items.append(item)
+        return items, False
+
+    def _upload_worker(self):
+        processor = self.processor_factory()
+        while True:
+            items, stop = self._take_upload_window()
+            if items:
+                try:
+                    processor.upload_window(items)
+                except Exception as e:
+                    for item in items:
+                        if not item['result']['success']:
+                            item['result']['error'] = str(e)
+                for item in items:
+                    self.results.put(item['result'])
+            if stop:
+                return
+
+    def _start_stage(self, stage: str, target, *args) -> List[Thread]:
+        threads = [Thread(target=target, args=args, name=f"{stage}-{i}", daemon=True)
+                   for i in range(self.stage_workers[stage])]
+        for thread in threads:
+            thread.start()
+        return threads
+
+    def _drive(self, pdfs):
+        """Feed the first stage, then shut each stage down in order once the one before it is done
+
+        The shutdown runs even if pdfs raises, so run() always sees its final None.
+        """
+        stages = []
+        try:
+            stages.append(('download', self._start_stage('download', self._download_worker)))
+            stages.append(('parse', self._start_stage('parse', self._parse_worker, 'parse')))
+            stages.append(('parse_big', self._start_stage('parse_big', self._parse_worker, 'parse_big')))
+            stages.append(('upload', self._start_stage('upload', self._upload_worker)))
+
+            for pdf_record in pdfs:
+                if self.stop_requested():
+                    break
+                self.queues['download'].put(pdf_record)
+        except Exception as e:
+            print(f"\n⚠️  Pipeline input failed, finishing the PDFs already queued: {e}")
+        finally:
+            for stage, threads in stages:
+                for _ in threads:
+                    self.queues[stage].put(None)
+                for thread in threads:
+                    thread.join()
+
+            self.results.put(None)
+
+    def run(self, pdfs):
+        """Run the PDFs through the pipeline, yielding each result as its PDF finishes"""
+        Thread(target=self._drive, args=(pdfs,), name="pipeline-driver", daemon=True).start()
+        while True:
+            result = self.results.get()
+            if result is None:
+                return
+            yield result
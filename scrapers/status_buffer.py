@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Write-behind buffer for step 3's cf_report_pdfs status updates
+Instead of one PATCH per PDF, workers queue their converted / skipped / failed
+updates and a flusher sends them in set-based PATCHes (pdf_id=in.(...)), one per
+distinct update.
+"""
+
+import json
+import time
+from datetime import datetime
+from threading import Lock, Thread
+from typing import Dict, List, Optional, Set
+
+import requests
+
+from run_journal import RunJournal
+
+
+class StatusBuffer:
+    """Write-behind buffer for cf_report_pdfs status updates
+
+    Workers queue per-PDF updates; they are flushed as set-based PATCHes
+    (pdf_id=in.(...)), one per distinct update, every flush_items updates,
+    every flush_seconds and on close. conversion_date is stamped at flush time
+    so identical updates from different PDFs share one request.
+
+    PDFs whose conversion is sent are journaled as marked in run_journal, if given.
+    """
+
+    MAX_IDS_PER_PATCH = 500  # Keeps the pdf_id=in.(...) query string a sane length
+
+    def __init__(self, supabase_url: str, supabase_key: str, flush_items: int = 200,
+                 flush_seconds: float = 5.0, run_journal: Optional[RunJournal] = None, timeout: float = 30):
+        self.url = f"{supabase_url}/rest/v1/cf_report_pdfs"
+        self.flush_items = flush_items
+        self.flush_seconds = flush_seconds
+        self.run_journal = run_journal
+        self.timeout = timeout
+        self.session = requests.Session()
+        self.headers = {
+            "apikey": supabase_key,
+            "Authorization": f"Bearer {supabase_key}",
+            "Content-Type": "application/json"
+        }
+        self.lock = Lock()
+        self.flush_lock = Lock()
+        self.pending: Dict[int, Dict] = {}
+        self.succeeded: Set[int] = set()  # PDFs whose failure updates are stale (until the next flush ends)
+        self.stats = {'updates': 0, 'requests': 0, 'failed': 0}
+        self.closed = False
+        self.flusher = Thread(target=self._flush_periodically, name="status-flusher", daemon=True)
+        self.flusher.start()
+
+    def add(self, pdf_id: int, update: Dict):
+        """Queue an update for one PDF (a later update for the same PDF replaces it)"""
+        with self.lock:
+            self.pending[pdf_id] = update
+            full = len(self.pending) >= self.flush_items
+        if full:
+            self.flush()
+
+    def mark_converted(self, pdf_id: int, fields: Optional[Dict] = None):
+        self.add(pdf_id, {'csv_converted': True, 'error_message': None, **(fields or {})})
+
+    def mark_skipped(self, pdf_id: int, reason: str):
+        self.add(pdf_id, {'csv_converted': True, 'error_message': reason})
+
+    def mark_failed(self, pdf_id: int, error: str):
+        """Record why a PDF failed; it stays unconverted so the next run retries it"""
+        with self.lock:
+            if pdf_id in self.succeeded:
+                return
+        self.add(pdf_id, {'error_message': error})
+
+    def mark_succeeded(self, pdf_id: int):
+        """Drop a queued failure for a PDF that has since gone through (e.g. via ingest_reports)"""
+        with self.lock:
+            self.succeeded.add(pdf_id)
+            if pdf_id in self.pending and not self.pending[pdf_id].get('csv_converted'):
+                del self.pending[pdf_id]
+
+    def _flush_periodically(self):
+        while not self.closed:
+            time.sleep(self.flush_seconds)
+            self.flush()
+
+    def flush(self):
+        """Send everything queued so far, grouping PDFs that get the same update"""
+        with self.flush_lock:
+            with self.lock:
+                pending, self.pending = self.pending, {}
+                settled = set(self.succeeded)
+            self._send(pending)
+            # Their queued failures were dropped before this flush and none can be put back after it
+            with self.lock:
+                self.succeeded -= settled
+
+    def _send(self, pending: Dict[int, Dict]):
+        """PATCH pending updates, putting back the chunks that could not be sent"""
+        if not pending:
+            return
+
+        groups: Dict[str, List[int]] = {}
+        for pdf_id, update in pending.items():
+            groups.setdefault(json.dumps(update, sort_keys=True), []).append(pdf_id)
+
+        conversion_date = datetime.now().isoformat()
+        for key, pdf_ids in groups.items():
+            update = json.loads(key)
+            if update.get('csv_converted'):
+                update['conversion_date'] = conversion_date
+
+            for i in range(0, len(pdf_ids), self.MAX_IDS_PER_PATCH):
+                chunk = pdf_ids[i:i + self.MAX_IDS_PER_PATCH]
+                if not self._patch(chunk, update):
+                    # Put the chunk back unless a newer update arrived meanwhile
+                    # (or, for failures, the PDF has succeeded since)
+                    with self.lock:
+                        for pdf_id in chunk:
+                            if update.get('csv_converted') or pdf_id not in self.succeeded:
+                                self.pending.setdefault(pdf_id, pending[pdf_id])
+                elif update.get('csv_converted') and self.run_journal is not None:
+                    self.run_journal.record_many(chunk, 'marked')
+
+    def _patch(self, pdf_ids: List[int], update: Dict) -> bool:
+        params = {"pdf_id": f"in.({','.join(str(pdf_id) for pdf_id in pdf_ids)})"}
+        try:
+            response = self.session.patch(self.url, headers=self.headers, params=params, json=update,
+                                          timeout=self.timeout)
+            ok = response.status_code in [200, 204]
+        except requests.exceptions.RequestException:
+            ok = False
+
+        self.stats['requests'] += 1
+        if ok:
+            self.stats['updates'] += len(pdf_ids)
+        else:
+            self.stats['failed'] += 1
+        return ok
+
+    def close(self) -> int:
+        """Stop the periodic flusher and flush what's left; returns updates that could not be sent"""
+        self.closed = True
+        self.flush()
+        if self.pending:
+            self.flush()  # One retry for chunks that failed
+        return len(self.pending)
@@ -8,13 +8,13 @@ Using the discovered endpoint: /Reporting/GetNEWTableData/
 """
 
 import json
-import time
-import requests
 from pathlib import Path
 from datetime import datetime
 from typing import Dict, List
 import argparse
 
+from rate_limiter import DEFAULT_RPS, RateLimitedSession, configure as configure_rate_limit
+
 # Configuration
 OUTPUT_DIR = Path("campaign_finance_data")
 OUTPUT_DIR.mkdir(exist_ok=True)
@@ -24,7 +24,7 @@ class AZCampaignFinanceAPI:
     """Interface to Arizona Campaign Finance API"""
     
     def __init__(self):
-        self.session = requests.Session()
+        self.session = RateLimitedSession()  # Paced by the shared per-host limiter
         self.session.headers.update({
             'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36',
             'Accept': 'application/json, text/javascript, */*; q=0.01',
@@ -144,7 +144,6 @@ class AZCampaignFinanceAPI:
             
             # Prepare for next batch
             start += length
-            time.sleep(0.5)  # Rate limiting
         
         return all_entities
 
@@ -153,7 +152,10 @@ def main():
     parser = argparse.ArgumentParser(description='Fetch all entities from Arizona Campaign Finance')
     parser.add_argument('--update-db', action='store_true', 
                        help='Update entities directly in Supabase database')
+    parser.add_argument('--rps', type=float, default=DEFAULT_RPS,
+                       help=f'Requests per second to seethemoney.az.gov (default: {DEFAULT_RPS:g})')
     args = parser.parse_args()
+    configure_rate_limit(args.rps)
     
     print("\n" + "="*70)
     print("ARIZONA CAMPAIGN FINANCE - STEP 1: FETCH ALL ENTITIES (FINAL)")
@@ -8,13 +8,13 @@ Includes --backcheck option to recheck entities with invalid PDF URLs.
 """
 
 import json
-import time
-import requests
 from pathlib import Path
 from datetime import datetime
 from typing import Dict, List, Optional
 import argparse
 
+from rate_limiter import DEFAULT_RPS, RateLimitedSession, configure as configure_rate_limit
+
 # Configuration
 OUTPUT_DIR = Path("campaign_finance_data")
 OUTPUT_DIR.mkdir(exist_ok=True)
@@ -24,7 +24,7 @@ class ReportFetcher:
     """Fetch campaign finance reports for entities"""
     
     def __init__(self):
-        self.session = requests.Session()
+        self.session = RateLimitedSession()  # Paced by the shared per-host limiter
         self.session.headers.update({
             'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36',
             'Accept': 'application/json, text/javascript, */*; q=0.01',
@@ -140,9 +140,6 @@ def process_entities(entity_ids: List[int], backcheck_only: bool = False):
                     all_reports.append(report)
             
             stats['total_reports'] += len(reports)
-        
-        # Rate limiting
-        time.sleep(0.1)
     
     return all_reports, stats
 
@@ -155,7 +152,10 @@ def main():
                        help='Limit number of entities to process')
     parser.add_argument('--entity-id', type=int, default=None,
                        help='Process a specific entity ID')
+    parser.add_argument('--rps', type=float, default=DEFAULT_RPS,
+                       help=f'Requests per second to seethemoney.az.gov (default: {DEFAULT_RPS:g})')
     args = parser.parse_args()
+    configure_rate_limit(args.rps)
     
     print("\n" + "="*70)
     print("ARIZONA CAMPAIGN FINANCE - STEP 2: FETCH REPORTS (FINAL)")
@@ -9,18 +9,31 @@ import os
 import subprocess
 import time
 import csv
+import io
 import requests
 import hashlib
 import re
 from pathlib import Path
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Tuple
+from typing import Dict, List, Optional, Tuple, Union
 import argparse
-import json
-from concurrent.futures import ThreadPoolExecutor, as_completed
-from threading import Lock
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from itertools import islice
+from threading import Lock, local
+import shutil
 import signal
-import sys
+import socket
+
+import c2_extractor
+from async_downloader import HTTPX_AVAILABLE, AsyncDownloader
+from lease_claimer import LeaseClaimer
+from pdf_cache import PDFCache, TextCache, link_or_copy, sha256_file
+from pdf_download import DOWNLOAD_CHUNK_SIZE, IncompleteDownloadError, check_content_length
+from r_worker_pool import R_WORKER_ROWS_MARKER, RWorkerPool
+from rate_limiter import DEFAULT_RPS, RateLimitedSession, configure as configure_rate_limit
+from run_journal import RunJournal, stage_reached
+from staged_pipeline import StagedPipeline
+from status_buffer import StatusBuffer
 
 # Configuration
 OUTPUT_DIR = Path("campaign_finance_data")
@@ -42,7 +55,9 @@ global_stats = {
     'failed': 0,
     'skipped': 0,
     'start_time': None,
-    'donations_uploaded': 0
+    'donations_uploaded': 0,
+    'no_activity': 0,
+    'retried': 0
 }
 
 # Flag for graceful shutdown
@@ -56,33 +71,18 @@ def signal_handler(sig, frame):
 
 signal.signal(signal.SIGINT, signal_handler)
 
-class PDFDonationProcessor:
-    """Process PDFs through R scraper and upload to Supabase"""
-    
-    def __init__(self, worker_id: int = 0):
-        self.worker_id = worker_id
-        self.session = requests.Session()
-        self.session.headers.update({
-            'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36'
-        })
-        
-        self.supabase_headers = {
-            "apikey": SUPABASE_KEY,
-            "Authorization": f"Bearer {SUPABASE_KEY}",
-            "Content-Type": "application/json"
-        }
-        
-        # Create R wrapper script if it doesn't exist
-        self.r_wrapper_path = OUTPUT_DIR / f"pdf_scraper_wrapper_{worker_id}.R"
-        self._create_r_wrapper()
-    
-    def _create_r_wrapper(self):
-        """Create a simple R script to call the PDF scraper function"""
-        r_wrapper_content = '''
+# Batch mode configuration (one R session for many PDFs)
+R_BATCH_TIMEOUT_BASE = 60
+R_BATCH_TIMEOUT_PER_PDF = 30
+
+# Single-PDF R timeouts sized by page count (pdfinfo); unknown page counts use the base
+R_TIMEOUT_BASE = 60
+R_TIMEOUT_PER_PAGE = 2
+R_TIMEOUT_MAX = 1800
+
+# Shared R setup: libraries, scraper source and a helper that writes one PDF's CSV
+R_SCRAPER_SETUP = '''
 # R Wrapper for PDF Donation Scraper
-args <- commandArgs(trailingOnly = TRUE)
-pdf_path <- args[1]
-output_path <- args[2]
 
 # Load required libraries (individual tidyverse components)
 suppressMessages({
@@ -100,30 +100,272 @@ suppressMessages({
 fixed_scraper_path <- "/Users/jordanharb/Documents/az-campaign-finance/scrapers/r_scraper_fixed.R"
 original_scraper_path <- "/Users/jordanharb/Documents/az-campaign-finance/pdf-scraper/DonationReportScrapingCode/20250425-001_DonationReportDataScrape/_04-LocalFunctions/PDFData_DonorReports.R"
 
+# Source it with our own arguments hidden: a scraper's command-line block would
+# otherwise run TEMP_FUNC on "--batch" / "--stdin" while being sourced
+scraper_env <- new.env()
+scraper_env$commandArgs <- function(...) character(0)
+
 if (file.exists(fixed_scraper_path)) {
-    source(fixed_scraper_path)
+    source(fixed_scraper_path, local = scraper_env)
 } else if (file.exists(original_scraper_path)) {
-    source(original_scraper_path)
+    source(original_scraper_path, local = scraper_env)
 } else {
     stop("No R scraper function found")
 }
+TEMP_FUNC <- scraper_env$TEMP_FUNC
+
+# Page text for the pages in page_list ("1,2,7"); the other pages stay "" so
+# page numbers match the full PDF. "" means every page
+read_pdf_text <- function(pdf_path, page_list = "") {
+    if (is.na(page_list) || page_list == "") {
+        return(pdftools::pdf_text(pdf = pdf_path))
+    }
+
+    keep <- as.integer(strsplit(page_list, ",", fixed = TRUE)[[1]])
+    subset_path <- tempfile(fileext = ".pdf")
+    on.exit(unlink(subset_path))
+    pdftools::pdf_subset(pdf_path, pages = keep, output = subset_path)
+
+    pages <- rep("", pdftools::pdf_info(pdf_path)$pages)
+    pages[keep] <- pdftools::pdf_text(pdf = subset_path)
+    pages
+}
+
+# Page text from the step 3 text cache (gzip, one form feed after each page).
+# On a miss the PDF is extracted (only page_list pages if given) and the cache
+# written; on a hit only page_list pages are kept. NULL means "let TEMP_FUNC read the PDF itself" (no cache path and no
+# page list, or a scraper without pages=)
+cached_pdf_text <- function(pdf_path, text_cache_path, page_list = "") {
+    use_cache <- !is.na(text_cache_path) && text_cache_path != ""
+    prefiltered <- !is.na(page_list) && page_list != ""
+    if (!(use_cache || prefiltered) || !("pages" %in% names(formals(TEMP_FUNC)))) {
+        return(NULL)
+    }
+
+    if (use_cache && file.exists(text_cache_path)) {
+        con <- gzfile(text_cache_path, "rb")
+        txt <- paste(readLines(con, encoding = "UTF-8", warn = FALSE), collapse = "\\n")
+        close(con)
+        pages <- strsplit(txt, "\\f", fixed = TRUE)[[1]]
+        if (prefiltered) {
+            pages[-as.integer(strsplit(page_list, ",", fixed = TRUE)[[1]])] <- ""
+        }
+        return(pages)
+    }
+
+    pages <- tryCatch(read_pdf_text(pdf_path, page_list), error = function(e) NULL)
+    if (use_cache && !is.null(pages)) {
+        dir.create(dirname(text_cache_path), recursive = TRUE, showWarnings = FALSE)
+        tmp_path <- paste0(text_cache_path, ".", Sys.getpid(), ".tmp")
+        con <- gzfile(tmp_path, "wb")
+        writeChar(paste0(pages, "\\f", collapse = ""), con, eos = NULL, useBytes = TRUE)
+        close(con)
+        file.rename(tmp_path, text_cache_path)
+    }
+    pages
+}
+
+# Run TEMP_FUNC on one PDF and write its CSV, returning the row count
+scrape_pdf_to_csv <- function(pdf_path, output_path, text_cache_path = "", page_list = "") {
+    pages <- cached_pdf_text(pdf_path, text_cache_path, page_list)
+    result <- if (is.null(pages)) TEMP_FUNC(pdf_path) else TEMP_FUNC(pdf_path, pages = pages)
 
-# Process the PDF
-tryCatch({
-    result <- TEMP_FUNC(pdf_path)
-    
     if (nrow(result) > 0) {
         # Add metadata columns
         result$META_SegmentName <- basename(dirname(pdf_path))
         result$META_FileName <- basename(pdf_path)
+    }
+
+    # Write to CSV (headers only when nothing was found)
+    write.csv(result, output_path, row.names = FALSE)
+    nrow(result)
+}
+
+# Run TEMP_FUNC on PDF bytes (a raw vector) and write its CSV rows to stdout after an
+# @@ROWS line, returning the row count. pdf_name only fills the META_ columns; nothing
+# is written to disk
+scrape_raw_to_stdout <- function(pdf_raw, pdf_name, text_cache_path = "") {
+    pages <- cached_pdf_text(pdf_raw, text_cache_path)
+    result <- if (is.null(pages)) TEMP_FUNC(pdf_raw) else TEMP_FUNC(pdf_raw, pages = pages)
+
+    if (nrow(result) > 0) {
+        result$META_SegmentName <- basename(dirname(pdf_name))
+        result$META_FileName <- basename(pdf_name)
+    }
+
+    cat("@@ROWS\\n")
+    write.csv(result, stdout(), row.names = FALSE)
+    flush(stdout())
+    nrow(result)
+}
+
+# Run TEMP_FUNC on every PDF in a manifest (pdf_id, pdf_path, text_cache_path, page_list) and write one
+# combined CSV with a pdf_id column, printing one STATUS line per PDF
+scrape_batch_to_csv <- function(manifest_path, output_path) {
+    manifest <- read.csv(manifest_path, colClasses = "character")
+    results <- list()
+
+    for (i in seq_len(nrow(manifest))) {
+        pdf_id <- manifest$pdf_id[i]
+        pdf_path <- manifest$pdf_path[i]
+
+        status <- tryCatch({
+            pages <- cached_pdf_text(pdf_path, manifest$text_cache_path[i], manifest$page_list[i])
+            result <- if (is.null(pages)) TEMP_FUNC(pdf_path) else TEMP_FUNC(pdf_path, pages = pages)
+            if (nrow(result) > 0) {
+                result$META_SegmentName <- basename(dirname(pdf_path))
+                result$META_FileName <- basename(pdf_path)
+                result$pdf_id <- pdf_id
+                results[[length(results) + 1]] <- result
+            }
+            paste0("OK\\t", nrow(result))
+        }, error = function(e) {
+            paste0("ERROR\\t", gsub("[\\r\\n\\t]", " ", conditionMessage(e)))
+        })
+
+        cat("STATUS\\t", pdf_id, "\\t", status, "\\n", sep = "")
+        flush(stdout())
+    }
+
+    combined <- if (length(results) > 0) bind_rows(results) else tibble(pdf_id = character())
+    write.csv(combined %>% relocate(pdf_id), output_path, row.names = FALSE)
+}
+'''
+
+# Shared content-addressed PDF cache (RunSettings.pdf_cache unless --no-pdf-cache is given)
+PDF_CACHE_DIR = OUTPUT_DIR / "pdf_cache"
+
+# Report ingest: one ingest_reports call per PDF or batch (ingest_reports_function.sql). Databases
+# without the function fall back to the legacy requests, which need add_donation_key_column.sql
+INGEST_RPC_TIMEOUT = 120
+INGEST_RPC_MISSING = 'PGRST202'  # PostgREST error code for an unknown function
+
+# Version of the parsing rules (r_scraper_fixed.R, c2_extractor.py and the row
+# normalization in this file). Stamped on cf_report_pdfs with the extractor name;
+# bump it after a parser fix so --reprocess-older picks up the affected PDFs
+PARSER_VERSION = 1
+
+# Shared extracted-text cache (RunSettings.text_cache unless --no-text-cache is given)
+TEXT_CACHE_DIR = OUTPUT_DIR / "text_cache"
+R_TEXT_VERSION = "pdftools-1"  # Text cache key for pdftools::pdf_text output
+R_CHUNK_TEXT_SUFFIX = "-chunk"  # Text cache entries for the pages of one split chunk
+
+# Quick no-activity rows come from c2_extractor whichever extractor is configured; the CSV
+# name keeps that across a restart so the PDF is stamped with the parser that really ran
+NO_ACTIVITY_PARSER = 'python'
+NO_ACTIVITY_CSV_SUFFIX = '_no_activity_donations.csv'
+
+SPLIT_MIN_CHUNK_PAGES = 10  # Smaller chunks aren't worth an extra R run
+
+# Local stage journal so a restarted run resumes each PDF where it stopped (RunSettings.run_journal)
+RUN_JOURNAL_PATH = OUTPUT_DIR / "run_journal.sqlite3"
+
+RETRY_CHECK_SECONDS = 30  # How often the PDF stream looks for due retries
+RETRY_BATCH = 100  # Due retries mixed in per check
+
+SUPABASE_TIMEOUT = 30  # Seconds allowed for a single status request
+
+class RunSettings:
+    """Options and shared resources for one run, set up by main from the command line
+    
+    Passed to every PDFDonationProcessor and to the functions that record
+    results and schedule retries. The defaults leave every shared resource off.
+    """
+    
+    def __init__(self):
+        # Long-lived R processes (unless --no-r-pool or batch mode)
+        self.r_worker_pool: Optional[RWorkerPool] = None
+        # Content-addressed PDF cache (unless --no-pdf-cache); --revalidate-cache checks it with the server
+        self.pdf_cache: Optional[PDFCache] = None
+        self.revalidate_pdf_cache = False
+        # Extracted-text cache (unless --no-text-cache)
+        self.text_cache: Optional[TextCache] = None
+        # One ingest_reports call per PDF or batch (unless --legacy-upload)
+        self.use_ingest_rpc = True
+        # Write-behind cf_report_pdfs updates (unless --no-status-buffer)
+        self.status_buffer: Optional[StatusBuffer] = None
+        # Claim mode (--claim): leases on failed PDFs are released after each batch
+        self.lease_claimer: Optional[LeaseClaimer] = None
+        # Parse "NO ACTIVITY THIS PERIOD" reports from their first pages without running the extractor
+        self.quick_no_activity = True
+        # Extract only cover / Schedule C2 pages found by a fast pdftotext -raw pre-pass (--prefilter-pages)
+        self.prefilter_pages = False
+        # Keep PDFs and extracted rows in memory (--in-memory): PDF bytes go to the extractor on
+        # stdin and its rows come back on stdout, so no temp PDF or CSV is written
+        self.in_memory_pdfs = False
+        # PDFs with at least split_pages pages are parsed as page chunks on up to
+        # split_workers R workers (Python extractor: pdftotext processes); 0 turns it off
+        self.split_pages = 0
+        self.split_workers = 4
+        # Stage journal and dead-letter store (unless --no-journal)
+        self.run_journal: Optional[RunJournal] = None
+        # Dead-letter retries: a failed PDF is retried up to max_retries times,
+        # retry_base_seconds * 2 ** (n - 1) after its n-th failure
+        self.max_retries = 3
+        self.retry_base_seconds = 60.0
+
+class PDFDonationProcessor:
+    """Process PDFs through R scraper and upload to Supabase"""
+    
+    def __init__(self, worker_id: int = 0, extractor: str = 'r', settings: Optional[RunSettings] = None):
+        self.worker_id = worker_id
+        self.extractor = extractor
+        self.settings = settings or RunSettings()
+        self.session = RateLimitedSession()  # PDF downloads share one per-host limit across workers
+        self.session.headers.update({
+            'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36'
+        })
+        
+        self.supabase_headers = {
+            "apikey": SUPABASE_KEY,
+            "Authorization": f"Bearer {SUPABASE_KEY}",
+            "Content-Type": "application/json"
+        }
+        # Separate keep-alive session for Supabase so its connections stay warm too
+        self.supabase = requests.Session()
         
-        # Write to CSV
-        write.csv(result, output_path, row.names = FALSE)
-        cat("SUCCESS: Processed", nrow(result), "donations\\n")
+        # Create R wrapper script if it doesn't exist
+        self.r_wrapper_path = OUTPUT_DIR / f"pdf_scraper_wrapper_{worker_id}.R"
+        self._create_r_wrapper()
+    
+    def _create_r_wrapper(self):
+        """Create a simple R script to call the PDF scraper function"""
+        r_wrapper_content = R_SCRAPER_SETUP + '''
+args <- commandArgs(trailingOnly = TRUE)
+
+# Batch mode: Rscript wrapper.R --batch manifest.csv combined.csv
+if (length(args) >= 3 && args[1] == "--batch") {
+    scrape_batch_to_csv(args[2], args[3])
+    quit(status = 0)
+}
+
+# In-memory mode: Rscript wrapper.R --stdin n_bytes pdf_name [text_cache_path] < PDF bytes
+if (length(args) >= 3 && args[1] == "--stdin") {
+    con <- file("stdin", "rb")
+    pdf_raw <- readBin(con, "raw", n = as.numeric(args[2]))
+    close(con)
+    tryCatch({
+        scrape_raw_to_stdout(pdf_raw, args[3], if (length(args) >= 4) args[4] else "")
+    }, error = function(e) {
+        cat("ERROR:", e$message, "\\n")
+        quit(status = 1)
+    })
+    quit(status = 0)
+}
+
+pdf_path <- args[1]
+output_path <- args[2]
+text_cache_path <- if (length(args) >= 3) args[3] else ""
+page_list <- if (length(args) >= 4) args[4] else ""
+
+# Process the PDF
+tryCatch({
+    n <- scrape_pdf_to_csv(pdf_path, output_path, text_cache_path, page_list)
+    
+    if (n > 0) {
+        cat("SUCCESS: Processed", n, "donations\\n")
     } else {
         cat("WARNING: No donations found in PDF\\n")
-        # Write empty CSV with headers
-        write.csv(result, output_path, row.names = FALSE)
     }
 }, error = function(e) {
     cat("ERROR:", e$message, "\\n")
@@ -131,29 +373,80 @@ tryCatch({
 })
 '''
         
+        # Skip the write when an identical wrapper is already on disk
+        if self.r_wrapper_path.exists() and self.r_wrapper_path.read_text() == r_wrapper_content:
+            return
+        
         with open(self.r_wrapper_path, 'w') as f:
             f.write(r_wrapper_content)
     
-    def download_pdf(self, pdf_url: str, entity_id: int, pdf_id: int) -> Optional[Path]:
-        """Download a PDF to temporary directory with proper retry logic"""
+    def temp_pdf_path(self, entity_id: int, pdf_id: int) -> Path:
+        """Temp file for a downloaded PDF (with worker ID to avoid conflicts)"""
+        return TEMP_PDF_DIR / f"entity_{entity_id}_pdf_{pdf_id}_w{self.worker_id}.pdf"
+    
+    def download_pdf(self, pdf_url: str, entity_id: int, pdf_id: int,
+                     in_memory: bool = False) -> Union[Path, bytes, None]:
+        """Download a PDF to temporary directory with proper retry logic
+        
+        With in_memory the PDF's bytes are returned instead and no temp file is written.
+        """
         # Check if this is an unfiled report URL pattern (ReportFile/ID format)
         is_unfiled_report = '/ReportFile/' in pdf_url
         
+        pdf_path = self.temp_pdf_path(entity_id, pdf_id)
+        
+        # Serve from the local PDF cache when we already have this URL
+        cached = self.settings.pdf_cache.lookup(pdf_url) if self.settings.pdf_cache is not None else None
+        if cached and not self.settings.revalidate_pdf_cache:
+            pdf = self.from_cache(cached['path'], pdf_path, in_memory)
+            if pdf is not None:
+                return pdf
+            cached = None  # Evicted since the lookup - download it
+        
+        # Revalidating: ask the server whether our copy is still current
+        request_headers = {}
+        if cached:
+            if cached['etag']:
+                request_headers['If-None-Match'] = cached['etag']
+            if cached['last_modified']:
+                request_headers['If-Modified-Since'] = cached['last_modified']
+        
         max_retries = 1 if is_unfiled_report else 3
         
         for attempt in range(max_retries):
             try:
-                response = self.session.get(pdf_url, timeout=45)  # Increased timeout
-                if response.status_code == 200:
-                    # Create a safe filename with worker ID to avoid conflicts
-                    safe_name = f"entity_{entity_id}_pdf_{pdf_id}_w{self.worker_id}.pdf"
-                    pdf_path = TEMP_PDF_DIR / safe_name
-                    
-                    with open(pdf_path, 'wb') as f:
-                        f.write(response.content)
-                    
-                    return pdf_path
-                elif response.status_code == 404:
+                evicted = False
+                with self.session.get(pdf_url, timeout=45, headers=request_headers, stream=True) as response:  # Increased timeout
+                    status_code = response.status_code
+                    if status_code == 304 and cached:
+                        pdf = self.from_cache(cached['path'], pdf_path, in_memory)
+                        if pdf is not None:
+                            self.settings.pdf_cache.mark_validated(pdf_url)
+                            return pdf
+                        evicted = True
+                    elif status_code == 200:
+                        if in_memory:
+                            pdf = self.read_body(response)
+                            sha256 = hashlib.sha256(pdf).hexdigest()
+                        else:
+                            pdf = pdf_path
+                            sha256 = self.stream_to_file(response, pdf_path)
+                        
+                        if self.settings.pdf_cache is not None:
+                            self.settings.pdf_cache.store(
+                                pdf_url, pdf,
+                                sha256=sha256,
+                                etag=response.headers.get('ETag'),
+                                last_modified=response.headers.get('Last-Modified')
+                            )
+                        
+                        return pdf
+                
+                if evicted:
+                    # Our copy went away after the lookup - fetch it again without validators
+                    return self.download_pdf(pdf_url, entity_id, pdf_id, in_memory)
+                
+                if status_code == 404:
                     if is_unfiled_report:
                         # This is expected for unfiled reports - mark as skipped
                         self.mark_pdf_as_skipped(pdf_id, "Report not filed - unfiled report URL")
@@ -173,8 +466,9 @@ tryCatch({
                         time.sleep(2 ** attempt)
                         continue
                     return None
-            except (requests.exceptions.Timeout, requests.exceptions.ConnectionError) as e:
-                # Network errors - retry
+            except (requests.exceptions.Timeout, requests.exceptions.ConnectionError,
+                    requests.exceptions.ChunkedEncodingError, IncompleteDownloadError) as e:
+                # Network errors and truncated bodies - retry
                 if attempt < max_retries - 1:
                     time.sleep(2 ** attempt)
                     continue
@@ -187,8 +481,57 @@ tryCatch({
         
         return None
     
+    def from_cache(self, cached_path: Path, pdf_path: Path, in_memory: bool = False) -> Union[Path, bytes, None]:
+        """A cached PDF as its bytes (in memory) or hard linked to pdf_path
+        
+        None when the object is gone (evicted by another worker since the lookup),
+        which callers treat as a cache miss.
+        """
+        try:
+            if in_memory:
+                return cached_path.read_bytes()
+            link_or_copy(cached_path, pdf_path)
+        except FileNotFoundError:
+            return None
+        return pdf_path
+    
+    def read_body(self, response: requests.Response) -> bytes:
+        """In-memory stream_to_file: the whole body, checked against Content-Length"""
+        body = b''.join(response.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE))
+        check_content_length(response.headers, len(body))
+        return body
+    
+    def stream_to_file(self, response: requests.Response, dest: Path) -> str:
+        """Stream a response body to dest in chunks, hashing as it goes
+        
+        Writes to a .part file and renames it into place only once the byte
+        count matches Content-Length, so memory stays flat and a truncated
+        download never looks like a complete PDF. Returns the SHA-256.
+        """
+        part_path = dest.with_suffix('.part')
+        digest = hashlib.sha256()
+        written = 0
+        
+        try:
+            with open(part_path, 'wb') as f:
+                for chunk in response.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE):
+                    f.write(chunk)
+                    digest.update(chunk)
+                    written += len(chunk)
+            
+            check_content_length(response.headers, written)
+            os.replace(part_path, dest)
+        finally:
+            part_path.unlink(missing_ok=True)
+        
+        return digest.hexdigest()
+    
     def mark_pdf_as_skipped(self, pdf_id: int, reason: str):
         """Mark a PDF as skipped/processed so we don't retry it"""
+        if self.settings.status_buffer is not None:
+            self.settings.status_buffer.mark_skipped(pdf_id, reason)
+            return
+        
         url = f"{SUPABASE_URL}/rest/v1/cf_report_pdfs"
         params = {"pdf_id": f"eq.{pdf_id}"}
         update_data = {
@@ -197,22 +540,73 @@ tryCatch({
             'error_message': reason
         }
         
-        requests.patch(
+        self.supabase.patch(
             url, 
             headers=self.supabase_headers, 
             params=params,
-            json=update_data
+            json=update_data,
+            timeout=SUPABASE_TIMEOUT
         )
     
-    def process_pdf_with_r(self, pdf_path: Path, retry_count: int = 0) -> Optional[Path]:
+    def r_page_list(self, pdf_path: Path) -> str:
+        """Pages R should extract ("1,2,7") when prefiltering; '' means every page"""
+        try:
+            page_count, relevant = c2_extractor.find_relevant_pages(pdf_path)
+        except (c2_extractor.ExtractionError, subprocess.TimeoutExpired, OSError):
+            return ''
+        if not relevant or len(relevant) == page_count:
+            return ''
+        return ','.join(str(page_num) for page_num in relevant)
+    
+    def r_text_inputs(self, pdf_path: Path) -> Tuple[str, str]:
+        """(text cache path, page list) for an R run
+        
+        The cache path is '' when the text cache is off. The page pre-pass only runs
+        (with --prefilter-pages) when no cached text exists for this PDF.
+        """
+        if self.settings.text_cache is None:
+            return '', self.r_page_list(pdf_path) if self.settings.prefilter_pages else ''
+        
+        sha256 = sha256_file(pdf_path)
+        full_path = self.settings.text_cache.path_for(sha256, R_TEXT_VERSION).resolve()
+        if not self.settings.prefilter_pages or full_path.exists():
+            return str(full_path), ''
+        
+        prefiltered_path = self.settings.text_cache.path_for(
+            sha256, R_TEXT_VERSION + c2_extractor.PREFILTER_SUFFIX).resolve()
+        if prefiltered_path.exists():
+            return str(prefiltered_path), ''
+        
+        page_list = self.r_page_list(pdf_path)
+        return str(prefiltered_path if page_list else full_path), page_list
+    
+    def r_timeout(self, page_count: Optional[int], retry_count: int = 0) -> float:
+        """Seconds R gets for a PDF: base + per page (capped), 50% more on each retry"""
+        timeout_seconds = min(R_TIMEOUT_BASE + R_TIMEOUT_PER_PAGE * (page_count or 0), R_TIMEOUT_MAX)
+        return timeout_seconds * (1 + 0.5 * retry_count)
+    
+    def process_pdf_with_r(self, pdf_path: Path, retry_count: int = 0,
+                           page_count: Optional[int] = None) -> Optional[Path]:
         """Process PDF through R scraper with retry logic"""
         output_csv = PROCESSED_CSV_DIR / f"{pdf_path.stem}_donations.csv"
-        max_retries = 2  # Reduced for concurrent processing
-        timeout_seconds = 90 if retry_count > 0 else 60
+        # The timeout already scales with the page count, so a known-size PDF gets one retry
+        max_retries = 1 if page_count else 2
+        timeout_seconds = self.r_timeout(page_count, retry_count)
+        
+        text_cache_path, page_list = self.r_text_inputs(pdf_path)
+        
+        if self.settings.r_worker_pool is not None:
+            status = self.settings.r_worker_pool.run(pdf_path, output_csv, timeout_seconds, text_cache_path, page_list)
+            if status == 'ok' and output_csv.exists():
+                return output_csv
+            if status == 'timeout' and retry_count < max_retries:
+                time.sleep(1)
+                return self.process_pdf_with_r(pdf_path, retry_count + 1, page_count)
+            return None
         
         try:
             result = subprocess.run(
-                ['Rscript', str(self.r_wrapper_path), str(pdf_path), str(output_csv)],
+                ['Rscript', str(self.r_wrapper_path), str(pdf_path), str(output_csv), text_cache_path, page_list],
                 capture_output=True,
                 text=True,
                 timeout=timeout_seconds
@@ -221,17 +615,325 @@ tryCatch({
             if result.returncode == 0 and output_csv.exists():
                 return output_csv
             else:
+                self.warn_r_wrapper_failure(result.stdout, result.stderr)
                 return None
                 
         except subprocess.TimeoutExpired:
             if retry_count < max_retries:
                 time.sleep(1)
-                return self.process_pdf_with_r(pdf_path, retry_count + 1)
+                return self.process_pdf_with_r(pdf_path, retry_count + 1, page_count)
             else:
                 return None
         except Exception:
             return None
     
+    def warn_r_wrapper_failure(self, output: str, errors: str):
+        """Print R's error when a one-shot Rscript run died before scraping
+        
+        A PDF TEMP_FUNC can't parse prints "ERROR: ..." from the wrapper's handler and
+        stays a per-PDF failure. Anything else (libraries, scraper source, wrapper
+        arguments) fails every PDF the same way, so it is shown instead of hidden
+        behind per-PDF errors.
+        """
+        if 'ERROR:' in output:
+            return
+        detail = errors.strip().splitlines()
+        print(f"\n⚠️ Rscript {self.r_wrapper_path.name} failed before scraping: "
+              f"{detail[-1] if detail else 'no output'}")
+    
+    def split_chunks(self, pdf_path: Path) -> Optional[List[str]]:
+        """R page lists ("1,2,40,41,...") for a split parse: the cover pages plus one run of C2 pages each
+        
+        TEMP_FUNC parses each Schedule C2 page on its own (lines before a page's first
+        "Name:" are dropped, in a serial run too), so no record spans a chunk boundary
+        and the chunks' rows in page order are the serial output. None when the PDF
+        has no cover page, is a no-activity report or is too small to split.
+        """
+        try:
+            _, page_types = c2_extractor.find_page_types(pdf_path)
+        except (c2_extractor.ExtractionError, subprocess.TimeoutExpired, OSError):
+            return None
+        
+        cover = [page_num for page_num, page_type in page_types.items() if page_type == 'Cover Page']
+        c2_pages = [page_num for page_num, page_type in page_types.items() if page_type == 'Schedule C2']
+        if not cover or 'No Activity' in page_types.values() or len(c2_pages) < 2 * SPLIT_MIN_CHUNK_PAGES:
+            return None
+        
+        chunk_size = max(SPLIT_MIN_CHUNK_PAGES, -(-len(c2_pages) // self.settings.split_workers))
+        return [
+            ','.join(str(page_num) for page_num in sorted(cover + c2_pages[start:start + chunk_size]))
+            for start in range(0, len(c2_pages), chunk_size)
+        ]
+    
+    def r_chunk_text_cache_paths(self, pdf_path: Path, chunks: List[str]) -> List[str]:
+        """Text cache path for each split chunk ('' when the text cache is off)
+        
+        A cached text of the whole PDF serves every chunk (R keeps only the chunk's
+        pages). Otherwise each chunk caches the pages it extracts under its own key.
+        """
+        if self.settings.text_cache is None:
+            return [''] * len(chunks)
+        
+        sha256 = sha256_file(pdf_path)
+        full_path = self.settings.text_cache.path_for(sha256, R_TEXT_VERSION).resolve()
+        if full_path.exists():
+            return [str(full_path)] * len(chunks)
+        return [
+            str(self.settings.text_cache.path_for(hashlib.sha256(f"{sha256}:{chunk}".encode()).hexdigest(),
+                                                  R_TEXT_VERSION + R_CHUNK_TEXT_SUFFIX).resolve())
+            for chunk in chunks
+        ]
+    
+    def process_pdf_with_r_split(self, pdf_path: Path) -> Optional[Path]:
+        """Parse a big PDF as page chunks on several pooled R workers and merge their rows in page order
+        
+        None when the PDF can't be split or any chunk fails (the caller then parses it whole).
+        A scraper without pages= would parse the whole PDF in every chunk, so it is
+        never split.
+        """
+        if not self.settings.r_worker_pool.takes_pages():
+            return None
+        
+        chunks = self.split_chunks(pdf_path)
+        if not chunks:
+            return None
+        
+        output_csv = PROCESSED_CSV_DIR / f"{pdf_path.stem}_donations.csv"
+        chunk_csvs = [PROCESSED_CSV_DIR / f"{pdf_path.stem}_part{i}_donations.csv" for i in range(len(chunks))]
+        
+        text_cache_paths = self.r_chunk_text_cache_paths(pdf_path, chunks)
+        
+        def run_chunk(index: int) -> str:
+            timeout_seconds = self.r_timeout(chunks[index].count(',') + 1)
+            return self.settings.r_worker_pool.run(pdf_path, chunk_csvs[index], timeout_seconds,
+                                                   text_cache_paths[index], chunks[index])
+        
+        try:
+            with ThreadPoolExecutor(max_workers=self.settings.split_workers) as executor:
+                statuses = list(executor.map(run_chunk, range(len(chunks))))
+            if any(status != 'ok' for status in statuses) or not all(path.exists() for path in chunk_csvs):
+                return None
+            
+            # Chunks cover ascending page runs, so concatenating them keeps page order.
+            # Every chunk repeats the cover metadata; keep donation rows, or the first
+            # chunk's metadata-only row when no chunk found any donations
+            columns, rows = None, []
+            for chunk, chunk_csv in zip(chunks, chunk_csvs):
+                with open(chunk_csv, 'r', encoding='utf-8', errors='ignore') as f:
+                    reader = csv.DictReader(f)
+                    donations = [row for row in reader if (row.get('Donor_Name') or '').strip()]
+                # Rows from outside the chunk's pages mean the page list was ignored and
+                # the rows would repeat once per chunk - parse the PDF in one pass instead
+                pages = set(chunk.split(','))
+                if any((row.get('PageNum') or '').strip() not in pages for row in donations):
+                    return None
+                if donations:
+                    columns = columns or reader.fieldnames
+                    rows.extend(donations)
+            if columns is None:
+                shutil.copyfile(chunk_csvs[0], output_csv)
+                return output_csv
+            
+            with open(output_csv, 'w', newline='', encoding='utf-8') as f:
+                writer = csv.DictWriter(f, fieldnames=columns, extrasaction='ignore')
+                writer.writeheader()
+                writer.writerows(rows)
+            return output_csv
+        finally:
+            for chunk_csv in chunk_csvs:
+                chunk_csv.unlink(missing_ok=True)
+    
+    def split_workers_for(self, page_count: Optional[int]) -> int:
+        """Page chunks parsed at once for a PDF of page_count pages (1 = not split)"""
+        if self.settings.split_pages and (page_count or 0) >= self.settings.split_pages:
+            return self.settings.split_workers
+        return 1
+    
+    def process_pdf_with_python(self, pdf_path: Path, page_count: Optional[int] = None) -> Optional[Path]:
+        """Process PDF with the native Python extractor (no R subprocess)"""
+        output_csv = PROCESSED_CSV_DIR / f"{pdf_path.stem}_donations.csv"
+        try:
+            rows = c2_extractor.extract_pdf(pdf_path, self.settings.text_cache, self.settings.prefilter_pages,
+                                            page_count, self.split_workers_for(page_count))
+            c2_extractor.write_csv(rows, pdf_path, output_csv)
+            return output_csv
+        except (c2_extractor.ExtractionError, subprocess.TimeoutExpired, OSError):
+            return None
+    
+    def extract_no_activity(self, pdf_path: Path) -> Optional[Path]:
+        """CSV for a no-activity report, from a pdftotext read of its first two pages; None otherwise"""
+        if not self.settings.quick_no_activity:
+            return None
+        
+        rows = c2_extractor.no_activity_rows(pdf_path)
+        if rows is None:
+            return None
+        
+        output_csv = PROCESSED_CSV_DIR / f"{pdf_path.stem}{NO_ACTIVITY_CSV_SUFFIX}"
+        c2_extractor.write_csv(rows, pdf_path, output_csv)
+        with stats_lock:
+            global_stats['no_activity'] += 1
+        return output_csv
+    
+    def process_pdf_bytes_with_r(self, pdf_bytes: bytes, pdf_path: Path, retry_count: int = 0,
+                                 page_count: Optional[int] = None) -> Optional[List[Dict]]:
+        """In-memory process_pdf_with_r: PDF bytes to R on stdin, CSV rows back on stdout
+        
+        pdf_path only names the rows (META_ columns). Pages are never prefiltered
+        here, since R can only subset a PDF file.
+        """
+        max_retries = 1 if page_count else 2
+        timeout_seconds = self.r_timeout(page_count, retry_count)
+        text_cache_path = ''
+        if self.settings.text_cache is not None:
+            text_cache_path = str(self.settings.text_cache.path_for(hashlib.sha256(pdf_bytes).hexdigest(),
+                                                                    R_TEXT_VERSION).resolve())
+        
+        if self.settings.r_worker_pool is not None:
+            status, csv_text = self.settings.r_worker_pool.run_raw(pdf_bytes, pdf_path, timeout_seconds,
+                                                                   text_cache_path)
+            if status == 'ok':
+                return list(csv.DictReader(io.StringIO(csv_text)))
+            if status == 'timeout' and retry_count < max_retries:
+                time.sleep(1)
+                return self.process_pdf_bytes_with_r(pdf_bytes, pdf_path, retry_count + 1, page_count)
+            return None
+        
+        try:
+            result = subprocess.run(
+                ['Rscript', str(self.r_wrapper_path), '--stdin', str(len(pdf_bytes)), str(pdf_path), text_cache_path],
+                input=pdf_bytes,
+                capture_output=True,
+                timeout=timeout_seconds
+            )
+        except subprocess.TimeoutExpired:
+            if retry_count < max_retries:
+                time.sleep(1)
+                return self.process_pdf_bytes_with_r(pdf_bytes, pdf_path, retry_count + 1, page_count)
+            return None
+        except Exception:
+            return None
+        
+        output = result.stdout.decode('utf-8', errors='ignore')
+        marker = R_WORKER_ROWS_MARKER + '\n'
+        if result.returncode != 0 or marker not in output:
+            self.warn_r_wrapper_failure(output, result.stderr.decode('utf-8', errors='ignore'))
+            return None
+        return list(csv.DictReader(io.StringIO(output.rsplit(marker, 1)[1])))
+    
+    def no_activity_rows(self, pdf_bytes: bytes, pdf_path: Path) -> Optional[List[Dict]]:
+        """In-memory extract_no_activity: the rows of a no-activity report, None otherwise"""
+        if not self.settings.quick_no_activity:
+            return None
+        
+        rows = c2_extractor.no_activity_rows(pdf_bytes)
+        if rows is None:
+            return None
+        with stats_lock:
+            global_stats['no_activity'] += 1
+        return c2_extractor.csv_rows(rows, pdf_path)[1]
+    
+    def extract_rows(self, pdf_bytes: bytes, pdf_path: Path, page_count: Optional[int] = None) -> Optional[List[Dict]]:
+        """In-memory extract_pdf: the configured extractor's rows for PDF bytes, as csv.DictReader reads its CSV
+        
+        pdf_path only names the rows (META_ columns); nothing is written to disk.
+        Big PDFs are not split across R workers here (the Python extractor still
+        splits its pdftotext runs).
+        """
+        if self.extractor == 'r':
+            return self.process_pdf_bytes_with_r(pdf_bytes, pdf_path, page_count=page_count)
+        
+        try:
+            rows = c2_extractor.extract_pdf(pdf_bytes, self.settings.text_cache, self.settings.prefilter_pages,
+                                            page_count, self.split_workers_for(page_count))
+        except (c2_extractor.ExtractionError, subprocess.TimeoutExpired, OSError):
+            return None
+        return c2_extractor.csv_rows(rows, pdf_path)[1]
+    
+    def extract_pdf(self, pdf_path: Path, page_count: Optional[int] = None) -> Optional[Path]:
+        """Run the configured extractor on a PDF, returning its CSV"""
+        csv_path = self.extract_no_activity(pdf_path)
+        if csv_path:
+            return csv_path
+        if self.extractor == 'python':
+            return self.process_pdf_with_python(pdf_path, page_count)
+        if self.settings.r_worker_pool is not None and self.split_workers_for(page_count) > 1:
+            csv_path = self.process_pdf_with_r_split(pdf_path)
+            if csv_path:
+                return csv_path
+        return self.process_pdf_with_r(pdf_path, page_count=page_count)
+    
+    def process_pdfs_with_r_batch(self, pdfs: List[Tuple[int, Path]]) -> Dict[int, Path]:
+        """Run many PDFs through one R session; returns pdf_id -> per-PDF CSV for those that succeeded"""
+        if not pdfs:
+            return {}
+        
+        stamp = f"{self.worker_id}_{os.getpid()}_{int(time.time() * 1000)}"
+        manifest_path = PROCESSED_CSV_DIR / f"batch_{stamp}_manifest.csv"
+        combined_csv = PROCESSED_CSV_DIR / f"batch_{stamp}_donations.csv"
+        pdf_paths = dict(pdfs)
+        
+        with open(manifest_path, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(['pdf_id', 'pdf_path', 'text_cache_path', 'page_list'])
+            writer.writerows((pdf_id, pdf_path, *self.r_text_inputs(pdf_path)) for pdf_id, pdf_path in pdfs)
+        
+        try:
+            result = subprocess.run(
+                ['Rscript', str(self.r_wrapper_path), '--batch', str(manifest_path), str(combined_csv)],
+                capture_output=True,
+                text=True,
+                timeout=R_BATCH_TIMEOUT_BASE + R_BATCH_TIMEOUT_PER_PDF * len(pdfs)
+            )
+            output, errors = result.stdout, result.stderr
+        except subprocess.TimeoutExpired as e:
+            output = e.stdout.decode(errors='ignore') if isinstance(e.stdout, bytes) else (e.stdout or '')
+            errors = 'timed out'
+        except Exception as e:
+            output, errors = '', str(e)
+        finally:
+            manifest_path.unlink(missing_ok=True)
+        
+        # One "STATUS<TAB>pdf_id<TAB>OK|ERROR<TAB>detail" line per PDF
+        succeeded = set()
+        statuses = 0
+        for line in output.splitlines():
+            fields = line.split('\t')
+            if len(fields) >= 3 and fields[0] == 'STATUS':
+                statuses += 1
+                if fields[2] == 'OK':
+                    succeeded.add(int(fields[1]))
+        
+        if not statuses:
+            # R never reached the batch loop (e.g. the wrapper failed while loading) - say so
+            # instead of quietly running every PDF through the single-PDF fallback
+            detail = (errors or output).strip().splitlines()
+            print(f"\n⚠️ R batch of {len(pdfs)} PDFs reported no STATUS lines"
+                  f"{f': {detail[-1]}' if detail else ''} - falling back to one R run per PDF")
+        
+        if not succeeded or not combined_csv.exists():
+            return {}
+        
+        # Split the combined CSV into the per-PDF CSVs the rest of the pipeline reads
+        with open(combined_csv, 'r', encoding='utf-8', errors='ignore') as f:
+            reader = csv.DictReader(f)
+            fieldnames = [name for name in reader.fieldnames or [] if name != 'pdf_id']
+            rows_by_pdf = {}
+            for row in reader:
+                rows_by_pdf.setdefault(int(row.pop('pdf_id')), []).append(row)
+        combined_csv.unlink(missing_ok=True)
+        
+        csv_paths = {}
+        for pdf_id in succeeded:
+            output_csv = PROCESSED_CSV_DIR / f"{pdf_paths[pdf_id].stem}_donations.csv"
+            with open(output_csv, 'w', newline='') as f:
+                writer = csv.DictWriter(f, fieldnames=fieldnames)
+                writer.writeheader()
+                writer.writerows(rows_by_pdf.get(pdf_id, []))
+            csv_paths[pdf_id] = output_csv
+        
+        return csv_paths
+    
     def parse_occupation_employer(self, occupation_str: str) -> Tuple[str, str]:
         """Parse occupation field into occupation and employer"""
         if not occupation_str or occupation_str == 'NA':
@@ -371,53 +1073,175 @@ tryCatch({
         except:
             return None
     
-    def create_report_record(self, csv_path: Path, entity_id: int, pdf_id: int) -> Optional[int]:
-        """Create a cf_reports record from the CSV data"""
+    def build_donation(self, row: Dict, entity_id: int) -> Optional[Dict]:
+        """Normalize one extracted donation row; None if it lacks an amount or date"""
+        donor_name = row.get('Donor_Name', '').strip()
         
-        with open(csv_path, 'r', encoding='utf-8', errors='ignore') as f:
-            lines = f.readlines()
-            if len(lines) <= 1:
-                return self.create_empty_report_record(entity_id, pdf_id)
+        occupation, employer = self.parse_occupation_employer(row.get('Donor_Occupation', ''))
+        addr_components = self.parse_address_components(row.get('Donor_Addr', ''))
+        donation_date = self.parse_csv_date(row.get('Donation_Date'))
+        donation_amt = self.parse_amount(row.get('Donation_Amt'))
         
-        with open(csv_path, 'r', encoding='utf-8', errors='ignore') as f:
-            reader = csv.DictReader(f)
-            first_row = next(reader, None)
-            
-            if not first_row or not any(first_row.values()):
-                return self.create_empty_report_record(entity_id, pdf_id)
-            
-            if 'Donor_Name' not in first_row or not first_row.get('Donor_Name'):
-                report_id = self.create_report_record_from_metadata_only(csv_path, entity_id, pdf_id, first_row)
-                return report_id
-            
-            return self.create_report_record_from_data(csv_path, entity_id, pdf_id, first_row)
-    
-    def create_empty_report_record(self, entity_id: int, pdf_id: int, report_name: str = None) -> Optional[int]:
-        """Create a placeholder report record for PDFs with no donations"""
-        if not report_name:
-            url = f"{SUPABASE_URL}/rest/v1/cf_report_pdfs"
-            params = {"pdf_id": f"eq.{pdf_id}", "select": "report_name"}
-            response = requests.get(url, headers=self.supabase_headers, params=params)
-            if response.status_code == 200 and response.json():
-                report_name = response.json()[0].get('report_name', 'Campaign Finance Report')
-            else:
-                report_name = 'Campaign Finance Report'
+        if donation_amt is None or donation_date is None:
+            return None
         
-        report_data = {
-            'pdf_id': pdf_id,
+        record_id = None  # Foreign key to cf_entity_records
+        is_pac, is_corporate = self.detect_donor_type(donor_name)
+        
+        return {
+            'report_id': None,  # Stamped once the report record exists
             'entity_id': entity_id,
-            'rpt_title': 'Campaign Finance Report',
-            'rpt_name': report_name,
+            'record_id': record_id,
+            'donor_name': donor_name,
+            'donor_addr': addr_components['addr'],
+            'donor_city': addr_components['city'],
+            'donor_state': addr_components['state'],
+            'donor_zip': addr_components['zip'],
+            'donor_full_address': addr_components.get('full_address', ''),
+            'donor_occupation': occupation,
+            'donor_employer': employer,
+            'donation_date': donation_date,
+            'donation_amt': donation_amt,
+            'donation_type': row.get('Donation_Type', ''),
+            'cycle_to_date_amt': self.parse_amount(row.get('CycleToDate_Amt')),
+            'page_num': int(row.get('PageNum')) if row.get('PageNum') and row.get('PageNum').isdigit() else None,
+            'page_type': row.get('PageType', ''),
+            'meta_segment_name': row.get('META_SegmentName', ''),
+            'meta_file_name': row.get('META_FileName', ''),
+            'donor_person_id': None,
+            'is_pac': is_pac,
+            'is_corporate': is_corporate,
+            'import_date': datetime.now().isoformat()
+        }
+    
+    def donation_key(self, pdf_id: int, donation: Dict, occurrence: int) -> str:
+        """Stable content key for a donation (cf_donations.donation_key)
+        
+        Same PDF, donor, date, amount and page -> same key, so reruns upsert instead of
+        duplicating. occurrence numbers identical lines within a PDF so genuine repeats
+        (same donor, date and amount twice on one page) keep separate rows.
+        """
+        unique_str = "|".join([
+            str(pdf_id),
+            donation['donor_name'].upper(),
+            donation['donation_date'] or '',
+            f"{donation['donation_amt']:.2f}",
+            str(donation['page_num'] or ''),
+            str(occurrence)
+        ])
+        return hashlib.sha256(unique_str.encode()).hexdigest()
+    
+    def summarize_rows(self, rows, entity_id: int, pdf_id: Optional[int] = None,
+                       parser_name: Optional[str] = None) -> Dict:
+        """One pass over extracted rows: report metadata row, totals and normalized donations
+        
+        parser_name is the parser that produced the rows when it isn't this processor's extractor.
+        """
+        extracted = {
+            'first_row': None,
             'total_donations': 0.0,
             'donation_count': 0,
-            'processed_date': datetime.now().isoformat()
+            'donations': [],
+            'page_types': set(),
+            'parser_name': parser_name
         }
         
-        url = f"{SUPABASE_URL}/rest/v1/cf_reports"
-        response = requests.post(
-            url,
-            headers={**self.supabase_headers, "Prefer": "return=representation"},
-            json=report_data
+        seen = {}  # Identical donation lines so far, for donation_key occurrences
+        
+        for row in rows:
+            if extracted['first_row'] is None:
+                extracted['first_row'] = row
+            
+            page_type = (row.get('PageType') or '').strip()
+            if page_type and page_type != 'NA':
+                extracted['page_types'].add(page_type)
+            
+            if not row.get('Donor_Name', '').strip():  # Only count actual donations
+                continue
+            
+            amount = self.parse_amount(row.get('Donation_Amt'))
+            if amount:
+                extracted['total_donations'] += amount
+                extracted['donation_count'] += 1
+            
+            donation = self.build_donation(row, entity_id)
+            if donation:
+                if pdf_id is not None:
+                    line = (donation['donor_name'].upper(), donation['donation_date'],
+                            round(donation['donation_amt'], 2), donation['page_num'])
+                    seen[line] = seen.get(line, 0) + 1
+                    donation['donation_key'] = self.donation_key(pdf_id, donation, seen[line])
+                extracted['donations'].append(donation)
+        
+        return extracted
+    
+    def read_extracted_csv(self, csv_path: Path, entity_id: int, pdf_id: Optional[int] = None) -> Dict:
+        """Read an extracted CSV once (see summarize_rows)"""
+        parser_name = NO_ACTIVITY_PARSER if csv_path.name.endswith(NO_ACTIVITY_CSV_SUFFIX) else None
+        with open(csv_path, 'r', encoding='utf-8', errors='ignore') as f:
+            return self.summarize_rows(csv.DictReader(f), entity_id, pdf_id, parser_name)
+    
+    def read_item(self, item: Dict) -> Dict:
+        """summarize_rows for a parsed work item: its in-memory rows, or its CSV"""
+        entity_id = item['pdf_record'].get('entity_id')
+        pdf_id = item['pdf_record'].get('pdf_id')
+        if item['rows'] is not None:
+            return self.summarize_rows(item['rows'], entity_id, pdf_id, item['parser_name'])
+        return self.read_extracted_csv(item['csv_path'], entity_id, pdf_id)
+    
+    def create_report_record(self, extracted: Dict, entity_id: int, pdf_id: int,
+                             pdf_report_name: Optional[str] = None) -> Optional[int]:
+        """Create a cf_reports record from the extracted data"""
+        return self.insert_report(self.build_report_data(extracted, entity_id, pdf_id, pdf_report_name))
+    
+    def build_report_data(self, extracted: Dict, entity_id: int, pdf_id: int,
+                          pdf_report_name: Optional[str] = None) -> Dict:
+        """cf_reports row for the extracted data (pdf_report_name saves a lookup when the caller has it)"""
+        first_row = extracted['first_row']
+        
+        if not first_row or not any(first_row.values()):
+            return self.build_empty_report_data(entity_id, pdf_id, pdf_report_name)
+        
+        if 'Donor_Name' not in first_row or not first_row.get('Donor_Name'):
+            return self.build_report_data_from_metadata_only(entity_id, pdf_id, first_row, pdf_report_name)
+        
+        return self.build_report_data_from_data(entity_id, pdf_id, first_row, extracted)
+    
+    def fetch_pdf_report_name(self, pdf_id: int) -> Optional[str]:
+        """report_name from cf_report_pdfs"""
+        url = f"{SUPABASE_URL}/rest/v1/cf_report_pdfs"
+        params = {"pdf_id": f"eq.{pdf_id}", "select": "report_name"}
+        response = self.supabase.get(url, headers=self.supabase_headers, params=params)
+        if response.status_code == 200 and response.json():
+            return response.json()[0].get('report_name')
+        return None
+    
+    def create_report_records_bulk(self, report_rows: List[Dict]) -> Optional[Dict[int, int]]:
+        """Insert report headers for many PDFs in one POST; pdf_id -> report_id, None on failure"""
+        if not report_rows:
+            return {}
+        
+        # Rows drop their None fields, so name every column and let missing ones take defaults
+        columns = sorted({key for row in report_rows for key in row})
+        url = f"{SUPABASE_URL}/rest/v1/cf_reports"
+        response = self.supabase.post(
+            url,
+            headers={**self.supabase_headers, "Prefer": "return=representation,missing=default"},
+            params={"columns": ",".join(columns), "select": "pdf_id,report_id"},
+            json=report_rows
+        )
+        
+        if response.status_code not in [200, 201]:
+            return None
+        return {row['pdf_id']: row['report_id'] for row in response.json()}
+    
+    def insert_report(self, report_data: Dict) -> Optional[int]:
+        """POST one cf_reports row and return its report_id"""
+        url = f"{SUPABASE_URL}/rest/v1/cf_reports"
+        response = self.supabase.post(
+            url,
+            headers={**self.supabase_headers, "Prefer": "return=representation"},
+            json=report_data
         )
         
         if response.status_code in [200, 201]:
@@ -427,14 +1251,26 @@ tryCatch({
         
         return None
     
-    def create_report_record_from_metadata_only(self, csv_path: Path, entity_id: int, pdf_id: int, first_row: dict) -> Optional[int]:
-        """Create a report record when we have metadata but no donations"""
-        url = f"{SUPABASE_URL}/rest/v1/cf_report_pdfs"
-        params = {"pdf_id": f"eq.{pdf_id}", "select": "report_name"}
-        response = requests.get(url, headers=self.supabase_headers, params=params)
-        pdf_report_name = ""
-        if response.status_code == 200 and response.json():
-            pdf_report_name = response.json()[0].get('report_name', '')
+    def build_empty_report_data(self, entity_id: int, pdf_id: int, report_name: str = None) -> Dict:
+        """Placeholder report row for PDFs with no donations"""
+        if not report_name:
+            report_name = self.fetch_pdf_report_name(pdf_id) or 'Campaign Finance Report'
+        
+        return {
+            'pdf_id': pdf_id,
+            'entity_id': entity_id,
+            'rpt_title': 'Campaign Finance Report',
+            'rpt_name': report_name,
+            'total_donations': 0.0,
+            'donation_count': 0,
+            'processed_date': datetime.now().isoformat()
+        }
+    
+    def build_report_data_from_metadata_only(self, entity_id: int, pdf_id: int, first_row: dict,
+                                             pdf_report_name: Optional[str] = None) -> Dict:
+        """Report row when we have metadata but no donations"""
+        if pdf_report_name is None:
+            pdf_report_name = self.fetch_pdf_report_name(pdf_id) or ''
         
         # Get raw values
         org_email = first_row.get('OrgEml', '')
@@ -477,24 +1313,10 @@ tryCatch({
             'processed_date': datetime.now().isoformat()
         }
         
-        report_data = {k: v for k, v in report_data.items() if v is not None}
-        
-        url = f"{SUPABASE_URL}/rest/v1/cf_reports"
-        response = requests.post(
-            url,
-            headers={**self.supabase_headers, "Prefer": "return=representation"},
-            json=report_data
-        )
-        
-        if response.status_code in [200, 201]:
-            result = response.json()
-            if result and len(result) > 0:
-                return result[0].get('report_id')
-        
-        return None
+        return {k: v for k, v in report_data.items() if v is not None}
     
-    def create_report_record_from_data(self, csv_path: Path, entity_id: int, pdf_id: int, first_row: dict) -> Optional[int]:
-        """Create a report record from CSV data"""
+    def build_report_data_from_data(self, entity_id: int, pdf_id: int, first_row: dict, extracted: Dict) -> Dict:
+        """Report row, with its totals, from extracted data"""
         # Get raw values
         org_email = first_row.get('OrgEml', '')
         org_phone = first_row.get('OrgTel', '')
@@ -532,260 +1354,894 @@ tryCatch({
             'org_address': org_address,
             'org_treasurer': org_treasurer,
             'org_jurisdiction': org_jurisdiction,
+            'total_donations': extracted['total_donations'],
+            'donation_count': extracted['donation_count'],
             'processed_date': datetime.now().isoformat()
         }
         
-        report_data = {k: v for k, v in report_data.items() if v is not None}
-        
-        url = f"{SUPABASE_URL}/rest/v1/cf_reports"
-        response = requests.post(
-            url,
-            headers={**self.supabase_headers, "Prefer": "return=representation"},
-            json=report_data
-        )
-        
-        if response.status_code in [200, 201]:
-            result = response.json()
-            if result and len(result) > 0:
-                report_id = result[0].get('report_id')
-                self.update_report_totals(csv_path, report_id)
-                return report_id
-        
-        return None
+        return {k: v for k, v in report_data.items() if v is not None}
     
-    def update_report_totals(self, csv_path: Path, report_id: int):
-        """Calculate and update report totals from donations"""
-        total_donations = 0.0
-        donation_count = 0
-        
-        with open(csv_path, 'r', encoding='utf-8', errors='ignore') as f:
-            reader = csv.DictReader(f)
-            for row in reader:
-                if row.get('Donor_Name', '').strip():  # Only count actual donations
-                    amount = self.parse_amount(row.get('Donation_Amt'))
-                    if amount:
-                        total_donations += amount
-                        donation_count += 1
-        
-        url = f"{SUPABASE_URL}/rest/v1/cf_reports"
-        params = {"report_id": f"eq.{report_id}"}
-        update_data = {
-            'total_donations': total_donations,
-            'donation_count': donation_count
-        }
-        
-        requests.patch(
-            url,
-            headers=self.supabase_headers,
-            params=params,
-            json=update_data
-        )
-    
-    def upload_donations_to_supabase(self, csv_path: Path, entity_id: int, report_id: int, pdf_url: str):
-        """Upload donation data from CSV to Supabase"""
-        donations = []
-        
-        with open(csv_path, 'r', encoding='utf-8', errors='ignore') as f:
-            reader = csv.DictReader(f)
-            for row in reader:
-                donor_name = row.get('Donor_Name', '').strip()
-                if not donor_name:
-                    continue
-                
-                occupation, employer = self.parse_occupation_employer(row.get('Donor_Occupation', ''))
-                addr_components = self.parse_address_components(row.get('Donor_Addr', ''))
-                donation_date = self.parse_csv_date(row.get('Donation_Date'))
-                donation_amt = self.parse_amount(row.get('Donation_Amt'))
-                
-                record_id = None  # Foreign key to cf_entity_records
-                is_pac, is_corporate = self.detect_donor_type(donor_name)
-                
-                donation = {
-                    'report_id': report_id,
-                    'entity_id': entity_id,
-                    'record_id': record_id,
-                    'donor_name': donor_name,
-                    'donor_addr': addr_components['addr'],
-                    'donor_city': addr_components['city'],
-                    'donor_state': addr_components['state'],
-                    'donor_zip': addr_components['zip'],
-                    'donor_full_address': addr_components.get('full_address', ''),
-                    'donor_occupation': occupation,
-                    'donor_employer': employer,
-                    'donation_date': donation_date,
-                    'donation_amt': donation_amt,
-                    'donation_type': row.get('Donation_Type', ''),
-                    'cycle_to_date_amt': self.parse_amount(row.get('CycleToDate_Amt')),
-                    'page_num': int(row.get('PageNum')) if row.get('PageNum') and row.get('PageNum').isdigit() else None,
-                    'page_type': row.get('PageType', ''),
-                    'meta_segment_name': row.get('META_SegmentName', ''),
-                    'meta_file_name': row.get('META_FileName', ''),
-                    'donor_person_id': None,
-                    'is_pac': is_pac,
-                    'is_corporate': is_corporate,
-                    'import_date': datetime.now().isoformat()
-                }
-                
-                if donation['donation_amt'] is None:
-                    continue
-                if donation['donation_date'] is None:
-                    continue
-                
-                donations.append(donation)
+    def upload_donations_to_supabase(self, donations: List[Dict], report_id: int) -> Optional[int]:
+        """Upload normalized donations to Supabase under their report; None if any batch fails"""
+        for donation in donations:
+            donation['report_id'] = report_id
         
         if donations:
             batch_size = 100
             for i in range(0, len(donations), batch_size):
                 batch = donations[i:i+batch_size]
                 
+                # Upsert on donation_key: a retried or re-run PDF updates its rows instead of duplicating them
                 url = f"{SUPABASE_URL}/rest/v1/cf_donations"
-                response = requests.post(
+                response = self.supabase.post(
                     url, 
-                    headers=self.supabase_headers, 
+                    headers={**self.supabase_headers, "Prefer": "resolution=merge-duplicates"},
+                    params={"on_conflict": "donation_key"},
                     json=batch
                 )
                 
                 if response.status_code not in [200, 201]:
-                    return 0
+                    return None
         
         return len(donations)
     
-    def process_pdf(self, pdf_record: Dict) -> Dict:
-        """Process a single PDF through the full pipeline"""
-        entity_id = pdf_record.get('entity_id')
-        pdf_id = pdf_record.get('pdf_id')
-        pdf_url = pdf_record.get('pdf_url')
-        report_name = pdf_record.get('report_name', 'unknown')
+    def clear_previous_reports(self, pdf_id: int, keep_report_id: int):
+        """Delete reports (and their donations) left by an earlier parse or attempt of this PDF"""
+        url = f"{SUPABASE_URL}/rest/v1/cf_reports"
+        params = {"pdf_id": f"eq.{pdf_id}", "report_id": f"neq.{keep_report_id}", "select": "report_id"}
+        response = self.supabase.get(url, headers=self.supabase_headers, params=params)
+        if response.status_code != 200 or not response.json():
+            return
         
-        result = {
-            'entity_id': entity_id,
-            'pdf_id': pdf_id,
+        old_ids = ",".join(str(r['report_id']) for r in response.json())
+        self.supabase.delete(
+            f"{SUPABASE_URL}/rest/v1/cf_donations",
+            headers=self.supabase_headers,
+            params={"report_id": f"in.({old_ids})"}
+        )
+        self.supabase.delete(url, headers=self.supabase_headers, params={"report_id": f"in.({old_ids})"})
+    
+    def resume_state(self, pdf_id: int) -> Optional[Dict]:
+        """Where an earlier run left this PDF (see run_journal), or None to start from scratch
+        
+        A marked PDF that comes back again was reset on purpose, so it starts over.
+        """
+        if self.settings.run_journal is None:
+            return None
+        state = self.settings.run_journal.state(pdf_id)
+        if state is None or state['stage'] == 'marked':
+            return None
+        return state
+    
+    def journal_stage(self, pdf_id: int, stage: str, **fields):
+        """Record a completed stage in the run journal (when it's on)"""
+        if self.settings.run_journal is not None:
+            self.settings.run_journal.record(pdf_id, stage, **fields)
+    
+    def new_result(self, pdf_record: Dict) -> Dict:
+        """Create the result dict returned for one PDF"""
+        return {
+            'entity_id': pdf_record.get('entity_id'),
+            'pdf_id': pdf_record.get('pdf_id'),
             'success': False,
             'donations': 0,
-            'error': None
+            'error': None,
+            'reprocess': bool(pdf_record.get('csv_converted'))  # Already converted by an older parser
+        }
+    
+    def download_failed(self, pdf_record: Dict, result: Dict) -> Dict:
+        """Record a failed or skipped download in the result and stats"""
+        # Check if it was marked as skipped (unfiled report)
+        if '/ReportFile/' in pdf_record.get('pdf_url'):
+            result['error'] = 'Unfiled report - skipped'
+            with stats_lock:
+                global_stats['skipped'] += 1
+        else:
+            # Regular download failure - don't mark as processed
+            result['error'] = 'Download failed - will retry later'
+            with stats_lock:
+                global_stats['failed'] += 1
+        return result
+    
+    def pdf_status(self, extracted: Dict) -> Dict:
+        """Parser stamp written to cf_report_pdfs with the conversion"""
+        return {
+            'parser_name': extracted.get('parser_name') or self.extractor,
+            'parser_version': PARSER_VERSION,
+            'page_types': sorted(extracted['page_types'])
         }
+    
+    def build_ingest_payload(self, pdf_record: Dict, extracted: Dict) -> Dict:
+        """One ingest_reports entry: report header, donations and PDF status"""
+        entity_id = pdf_record.get('entity_id')
+        pdf_id = pdf_record.get('pdf_id')
+        return {
+            'pdf_id': pdf_id,
+            'report': self.build_report_data(extracted, entity_id, pdf_id, pdf_record.get('report_name')),
+            'donations': extracted['donations'],
+            'pdf_status': self.pdf_status(extracted)
+        }
+    
+    def ingest_reports_rpc(self, payloads: List[Dict]) -> Optional[Dict[int, int]]:
+        """Apply payloads in one transaction via the ingest_reports function; pdf_id -> report_id, None on failure"""
+        url = f"{SUPABASE_URL}/rest/v1/rpc/ingest_reports"
+        try:
+            response = self.supabase.post(
+                url,
+                headers=self.supabase_headers,
+                json={'p_reports': payloads},
+                timeout=INGEST_RPC_TIMEOUT
+            )
+        except requests.exceptions.RequestException:
+            return None
         
-        # Download PDF
-        pdf_path = self.download_pdf(pdf_url, entity_id, pdf_id)
-        if not pdf_path:
-            # Check if it was marked as skipped (unfiled report)
-            if '/ReportFile/' in pdf_url:
-                result['error'] = 'Unfiled report - skipped'
-                with stats_lock:
-                    global_stats['skipped'] += 1
-            else:
-                # Regular download failure - don't mark as processed
-                result['error'] = 'Download failed - will retry later'
-                with stats_lock:
-                    global_stats['failed'] += 1
+        if response.status_code != 200:
+            if self.ingest_rpc_missing(response):
+                self.fall_back_to_legacy_upload()
+            return None
+        return {row['pdf_id']: row['report_id'] for row in response.json()}
+    
+    @staticmethod
+    def ingest_rpc_missing(response) -> bool:
+        """Whether PostgREST says the ingest_reports function does not exist"""
+        try:
+            return response.json().get('code') == INGEST_RPC_MISSING
+        except (ValueError, AttributeError):
+            return False
+    
+    def fall_back_to_legacy_upload(self):
+        """Switch the whole run to --legacy-upload (the database has no ingest_reports function)"""
+        with stats_lock:
+            if not self.settings.use_ingest_rpc:
+                return
+            self.settings.use_ingest_rpc = False
+        print("\n⚠️ Database has no ingest_reports function (run ingest_reports_function.sql) - "
+              "falling back to legacy upload for this run")
+    
+    def ingest_succeeded(self, result: Dict, donation_count: int):
+        """Record a stored PDF in its result and the run stats"""
+        result['donations'] = donation_count
+        result['success'] = True
+        with stats_lock:
+            global_stats['donations_uploaded'] += donation_count
+    
+    def ingest_csv(self, pdf_record: Dict, csv_path: Path, result: Dict) -> Dict:
+        """Create the report, upload donations and mark the PDF converted from an extracted CSV"""
+        # Single pass over the CSV: metadata row, totals and donations
+        extracted = self.read_extracted_csv(csv_path, pdf_record.get('entity_id'), pdf_record.get('pdf_id'))
+        return self.ingest_extracted(pdf_record, extracted, result)
+    
+    def ingest_extracted(self, pdf_record: Dict, extracted: Dict, result: Dict) -> Dict:
+        """Store one PDF's report and donations (ingest_reports RPC unless --legacy-upload)"""
+        if not self.settings.use_ingest_rpc:
+            return self.ingest_extracted_legacy(pdf_record, extracted, result)
+        
+        pdf_id = pdf_record.get('pdf_id')
+        report_ids = self.ingest_reports_rpc([self.build_ingest_payload(pdf_record, extracted)])
+        if report_ids is None and not self.settings.use_ingest_rpc:
+            return self.ingest_extracted_legacy(pdf_record, extracted, result)
+        if not report_ids or pdf_id not in report_ids:
+            result['error'] = 'Failed to ingest report'
             return result
         
-        try:
-            # Process with R scraper
-            csv_path = self.process_pdf_with_r(pdf_path)
-            if not csv_path:
-                result['error'] = 'R scraper failed'
-                return result
-            
-            # Create report record
-            report_id = self.create_report_record(csv_path, entity_id, pdf_id)
-            if not report_id:
-                result['error'] = 'Failed to create report'
+        self.ingest_succeeded(result, len(extracted['donations']))
+        self.journal_stage(pdf_id, 'marked')
+        return result
+    
+    def ingest_group(self, items: List[Tuple[Dict, Dict, Dict]]):
+        """Ingest (pdf_record, extracted, result) for several PDFs, in one RPC call when possible"""
+        if not self.settings.use_ingest_rpc and len(items) > 1:
+            # Headers created before a restart are reused by ingest_extracted_legacy
+            resumed = {
+                pdf_record.get('pdf_id') for pdf_record, _, _ in items
+                if stage_reached(self.resume_state(pdf_record.get('pdf_id')), 'report_created')
+            }
+            report_ids = self.create_report_records_bulk([
+                self.build_report_data(extracted, pdf_record.get('entity_id'), pdf_record.get('pdf_id'),
+                                       pdf_record.get('report_name'))
+                for pdf_record, extracted, _ in items if pdf_record.get('pdf_id') not in resumed
+            ])
+            if report_ids is not None:
+                for pdf_record, extracted, result in items:
+                    report_id = report_ids.get(pdf_record.get('pdf_id'))
+                    if report_id or pdf_record.get('pdf_id') in resumed:
+                        self.ingest_extracted_legacy(pdf_record, extracted, result, report_id)
+                    else:
+                        result['error'] = 'Failed to create report'
+                return
+        
+        if self.settings.use_ingest_rpc and len(items) > 1:
+            report_ids = self.ingest_reports_rpc([
+                self.build_ingest_payload(pdf_record, extracted) for pdf_record, extracted, _ in items
+            ])
+            if report_ids is not None:
+                for pdf_record, extracted, result in items:
+                    if pdf_record.get('pdf_id') in report_ids:
+                        self.ingest_succeeded(result, len(extracted['donations']))
+                        self.journal_stage(pdf_record.get('pdf_id'), 'marked')
+                    else:
+                        result['error'] = 'Failed to ingest report'
+                return
+            # One bad PDF rolls back the whole call - retry them one by one
+        
+        for pdf_record, extracted, result in items:
+            self.ingest_extracted(pdf_record, extracted, result)
+    
+    def ingest_extracted_legacy(self, pdf_record: Dict, extracted: Dict, result: Dict,
+                                report_id: Optional[int] = None) -> Dict:
+        """Separate report POST, donation batches and status PATCH (no ingest_reports function needed)
+        
+        report_id is given when the header was already created by create_report_records_bulk.
+        Stages the run journal says an earlier run finished are not repeated.
+        """
+        entity_id = pdf_record.get('entity_id')
+        pdf_id = pdf_record.get('pdf_id')
+        state = self.resume_state(pdf_id)
+        
+        # Create report record
+        if not report_id and stage_reached(state, 'report_created'):
+            report_id = state['report_id']
+        elif not report_id:
+            report_id = self.create_report_record(extracted, entity_id, pdf_id, pdf_record.get('report_name'))
+        if not report_id:
+            result['error'] = 'Failed to create report'
+            return result
+        if not stage_reached(state, 'report_created'):
+            self.journal_stage(pdf_id, 'report_created', report_id=report_id)
+        
+        # Upload donations if there are any
+        donation_count = 0
+        if stage_reached(state, 'donations_uploaded'):
+            donation_count = len(extracted['donations'])
+        elif extracted['donations']:
+            donation_count = self.upload_donations_to_supabase(extracted['donations'], report_id)
+            if donation_count is None:
+                # Upserts on donation_key, so a retry can send every batch again
+                result['error'] = 'Failed to upload donations'
                 return result
-            
-            # Check if CSV has actual donations
-            has_donations = False
-            with open(csv_path, 'r', encoding='utf-8', errors='ignore') as f:
-                reader = csv.DictReader(f)
-                for row in reader:
-                    if row.get('Donor_Name', '').strip():
-                        has_donations = True
-                        break
-            
-            # Upload donations if there are any
-            if has_donations:
-                donation_count = self.upload_donations_to_supabase(csv_path, entity_id, report_id, pdf_url)
-                result['donations'] = donation_count
-                with stats_lock:
-                    global_stats['donations_uploaded'] += donation_count
-            
-            # Mark PDF as converted
+            self.journal_stage(pdf_id, 'donations_uploaded')
+        
+        # The new rows are in: drop reports from an older parser (reprocessing) or from an
+        # earlier attempt that failed after creating its header, so retries leave no orphans
+        self.clear_previous_reports(pdf_id, report_id)
+        
+        # Mark PDF as converted, stamped with the parser that produced its rows
+        if self.settings.status_buffer is not None:
+            self.settings.status_buffer.mark_converted(pdf_id, self.pdf_status(extracted))
+        else:
             url = f"{SUPABASE_URL}/rest/v1/cf_report_pdfs"
             params = {"pdf_id": f"eq.{pdf_id}"}
             update_data = {
                 'csv_converted': True,
-                'conversion_date': datetime.now().isoformat()
+                'conversion_date': datetime.now().isoformat(),
+                'error_message': None,
+                **self.pdf_status(extracted)
             }
             
-            requests.patch(
+            self.supabase.patch(
                 url, 
                 headers=self.supabase_headers, 
                 params=params,
-                json=update_data
+                json=update_data,
+                timeout=SUPABASE_TIMEOUT
             )
+            self.journal_stage(pdf_id, 'marked')
+        
+        self.ingest_succeeded(result, donation_count)
+        return result
+    
+    def new_item(self, pdf_record: Dict) -> Dict:
+        """Work item passed between the stages, starting where the run journal left this PDF
+        
+        A PDF the run journal has as parsed comes back with csv_path set and no
+        pdf_path (straight to upload); one left downloaded has its temp file as
+        pdf_path. Otherwise both are None and the PDF needs downloading.
+        
+        In-memory mode carries the PDF as pdf_bytes (pdf_path then only names it)
+        and the parsed rows as rows instead of csv_path.
+        """
+        item = {
+            'pdf_record': pdf_record,
+            'result': self.new_result(pdf_record),
+            'pdf_path': None,
+            'pdf_bytes': None,
+            'csv_path': None,
+            'rows': None,
+            'parser_name': None,  # Set when the rows don't come from the configured extractor
+            'page_count': None
+        }
+        
+        state = self.resume_state(pdf_record.get('pdf_id'))
+        if stage_reached(state, 'parsed') and state['csv_path'] and state['csv_path'].exists():
+            item['csv_path'] = state['csv_path']
+        elif state and state['pdf_path'] and state['pdf_path'].exists():
+            item['pdf_path'] = state['pdf_path']
+        return item
+    
+    def finish_download(self, item: Dict, pdf_path: Union[Path, bytes, None]) -> Dict:
+        """Put a download (None if it failed) in the item and the run journal, and read its page count"""
+        if isinstance(pdf_path, bytes):
+            # In memory: nothing on disk to journal, a restart downloads the PDF again
+            item['pdf_bytes'] = pdf_path
+            item['pdf_path'] = self.temp_pdf_path(item['pdf_record'].get('entity_id'), item['pdf_record'].get('pdf_id'))
+            item['page_count'] = c2_extractor.pdf_page_count(pdf_path)
+            return item
+        if pdf_path and pdf_path != item['pdf_path']:
+            self.journal_stage(item['pdf_record'].get('pdf_id'), 'downloaded', pdf_path=pdf_path)
+        item['pdf_path'] = pdf_path
+        if not pdf_path:
+            self.download_failed(item['pdf_record'], item['result'])
+        else:
+            item['page_count'] = c2_extractor.pdf_page_count(pdf_path)
+        return item
+    
+    def download_stage(self, pdf_record: Dict) -> Dict:
+        """Pipeline stage 1: download the PDF. Returns the work item passed between stages (see new_item)"""
+        item = self.new_item(pdf_record)
+        if item['csv_path'] is None:
+            pdf_path = item['pdf_path'] or self.download_pdf(pdf_record.get('pdf_url'), pdf_record.get('entity_id'),
+                                                             pdf_record.get('pdf_id'), self.settings.in_memory_pdfs)
+            self.finish_download(item, pdf_path)
+        return item
+    
+    def parse_stage(self, item: Dict) -> Dict:
+        """Pipeline stage 2: extract donations to CSV (rows in memory), then drop the temporary PDF"""
+        try:
+            # Extract donations (R scraper or native Python extractor)
+            if item['pdf_bytes'] is not None:
+                item['rows'] = self.no_activity_rows(item['pdf_bytes'], item['pdf_path'])
+                if item['rows'] is not None:
+                    item['parser_name'] = NO_ACTIVITY_PARSER
+                else:
+                    item['rows'] = self.extract_rows(item['pdf_bytes'], item['pdf_path'], item.get('page_count'))
+            else:
+                item['csv_path'] = self.extract_pdf(item['pdf_path'], item.get('page_count'))
+                if item['csv_path']:
+                    self.journal_stage(item['pdf_record'].get('pdf_id'), 'parsed', csv_path=item['csv_path'])
+            if not self.is_parsed(item):
+                item['result']['error'] = 'R scraper failed' if self.extractor == 'r' else 'Python extractor failed'
+        finally:
+            # Clean up temporary PDF
+            item['pdf_bytes'] = None
+            if item['pdf_path'] and item['pdf_path'].exists():
+                item['pdf_path'].unlink(missing_ok=True)
+        return item
+    
+    @staticmethod
+    def is_parsed(item: Dict) -> bool:
+        """True once a work item has rows to upload (a CSV, or rows in memory)"""
+        return bool(item['csv_path']) or item['rows'] is not None
+    
+    def upload_stage(self, item: Dict) -> Dict:
+        """Pipeline stage 3: create the report, upload donations and mark the PDF converted"""
+        return self.ingest_extracted(item['pdf_record'], self.read_item(item), item['result'])
+    
+    def upload_window(self, items: List[Dict]):
+        """Pipeline stage 3 for a window of parsed PDFs: read their CSVs, then ingest them as one group"""
+        parsed = []
+        for item in items:
+            try:
+                extracted = self.read_item(item)
+            except Exception as e:
+                item['result']['error'] = str(e)
+                continue
+            parsed.append((item['pdf_record'], extracted, item['result']))
+        self.ingest_group(parsed)
+    
+    def process_pdf(self, pdf_record: Dict) -> Dict:
+        """Process a single PDF through the full pipeline (from its journaled stage, when resuming)"""
+        item = self.download_stage(pdf_record)
+        if item['pdf_path']:
+            self.parse_stage(item)
+        if self.is_parsed(item):
+            self.upload_stage(item)
+        return item['result']
+    
+    def process_batch(self, pdf_records: List[Dict]) -> List[Dict]:
+        """Process a batch of PDFs with a single R session for the whole batch"""
+        results = {}
+        downloaded = []
+        ready = []  # (pdf_record, csv_path) to ingest, including PDFs parsed by an earlier run
+        
+        for pdf_record in pdf_records:
+            pdf_id = pdf_record.get('pdf_id')
+            results[pdf_id] = self.new_result(pdf_record)
+            state = self.resume_state(pdf_id)
+            if stage_reached(state, 'parsed') and state['csv_path'] and state['csv_path'].exists():
+                ready.append((pdf_record, state['csv_path']))
+                continue
+            pdf_path = self.download_pdf(pdf_record.get('pdf_url'), pdf_record.get('entity_id'), pdf_id)
+            if pdf_path:
+                downloaded.append((pdf_record, pdf_path))
+            else:
+                self.download_failed(pdf_record, results[pdf_id])
+        
+        try:
+            csv_paths = {}
+            for pdf_record, pdf_path in downloaded:
+                csv_path = self.extract_no_activity(pdf_path)
+                if csv_path:
+                    csv_paths[pdf_record.get('pdf_id')] = csv_path
+            
+            if self.extractor == 'r':
+                csv_paths.update(self.process_pdfs_with_r_batch([
+                    (r.get('pdf_id'), p) for r, p in downloaded if r.get('pdf_id') not in csv_paths
+                ]))
+            
+            parsed = []
+            for pdf_record, pdf_path in downloaded:
+                pdf_id = pdf_record.get('pdf_id')
+                csv_path = csv_paths.get(pdf_id)
+                if not csv_path:
+                    # Batch missed this PDF (R crashed or timed out) - fall back to a single run
+                    csv_path = self.extract_pdf(pdf_path, c2_extractor.pdf_page_count(pdf_path))
+                if not csv_path:
+                    results[pdf_id]['error'] = 'R scraper failed' if self.extractor == 'r' else 'Python extractor failed'
+                    continue
+                self.journal_stage(pdf_id, 'parsed', csv_path=csv_path)
+                ready.append((pdf_record, csv_path))
             
-            result['success'] = True
+            for pdf_record, csv_path in ready:
+                extracted = self.read_extracted_csv(csv_path, pdf_record.get('entity_id'), pdf_record.get('pdf_id'))
+                parsed.append((pdf_record, extracted, results[pdf_record.get('pdf_id')]))
             
+            self.ingest_group(parsed)
         finally:
-            # Clean up temporary PDF
-            if pdf_path and pdf_path.exists():
+            for _, pdf_path in downloaded:
                 pdf_path.unlink(missing_ok=True)
         
-        return result
+        return list(results.values())
+
+def report_pdf_filters(entity_id: Optional[int] = None, reprocess_older: bool = False,
+                       page_type: Optional[str] = None) -> Dict[str, str]:
+    """PostgREST filters selecting the cf_report_pdfs rows step 3 should process
+    
+    With reprocess_older, select converted PDFs parsed before PARSER_VERSION instead
+    (optionally only those containing page_type, e.g. "Schedule C2"). PDFs converted
+    before versions were tracked have no version or page types and are always included.
+    """
+    params = {
+        "pdf_url": "not.is.null",
+        "csv_converted": "eq.false"
+    }
+    
+    if reprocess_older:
+        params["csv_converted"] = "eq.true"
+        params["error_message"] = "is.null"  # Skipped PDFs (404s) were never parsed
+        version_filter = f"or(parser_version.is.null,parser_version.lt.{PARSER_VERSION})"
+        if page_type:
+            params["and"] = f'({version_filter},or(page_types.is.null,page_types.cs.{{"{page_type}"}}))'
+        else:
+            params["or"] = version_filter[2:]
+    
+    if entity_id:
+        params["entity_id"] = f"eq.{entity_id}"
+    
+    return params
 
-def fetch_reports_from_supabase(entity_id: Optional[int] = None, limit: Optional[int] = None):
-    """Fetch all unprocessed report PDFs from Supabase"""
+def count_reports_from_supabase(entity_id: Optional[int] = None, reprocess_older: bool = False,
+                                page_type: Optional[str] = None) -> Optional[int]:
+    """Number of PDFs iter_reports_from_supabase will yield (None if the count failed)"""
+    headers = {
+        "apikey": SUPABASE_KEY,
+        "Authorization": f"Bearer {SUPABASE_KEY}",
+        "Prefer": "count=exact"
+    }
+    params = {**report_pdf_filters(entity_id, reprocess_older, page_type), "select": "pdf_id", "limit": "1"}
+    
+    response = requests.get(f"{SUPABASE_URL}/rest/v1/cf_report_pdfs", headers=headers, params=params,
+                            timeout=SUPABASE_TIMEOUT)
+    content_range = response.headers.get('Content-Range', '')
+    if response.status_code not in [200, 206] or '/' not in content_range:
+        return None
+    
+    total = content_range.rsplit('/', 1)[1]
+    return int(total) if total.isdigit() else None
+
+def iter_reports_from_supabase(entity_id: Optional[int] = None, limit: Optional[int] = None,
+                               reprocess_older: bool = False, page_type: Optional[str] = None,
+                               batch_size: int = 1000):
+    """Yield the report PDFs to process, one page at a time
+    
+    Pages are keyset-paginated on pdf_id (pdf_id > last seen), so each page costs
+    the same however deep into the table it is, and PDFs converted while we run
+    don't shift later pages the way an offset would. Filters are report_pdf_filters.
+    """
     headers = {
         "apikey": SUPABASE_KEY,
         "Authorization": f"Bearer {SUPABASE_KEY}"
     }
     
-    all_pdfs = []
-    offset = 0
-    batch_size = 1000
+    last_pdf_id = None
+    yielded = 0
     
-    while True:
+    while not limit or yielded < limit:
         url = f"{SUPABASE_URL}/rest/v1/cf_report_pdfs"
         params = {
+            **report_pdf_filters(entity_id, reprocess_older, page_type),
             "select": "*",
-            "pdf_url": "not.is.null",
-            "csv_converted": "eq.false",
-            "limit": str(batch_size),
-            "offset": str(offset),
+            "limit": str(batch_size if not limit else min(batch_size, limit - yielded)),
             "order": "pdf_id"
         }
+        if last_pdf_id is not None:
+            params["pdf_id"] = f"gt.{last_pdf_id}"
+        
+        try:
+            response = requests.get(url, headers=headers, params=params, timeout=SUPABASE_TIMEOUT)
+        except requests.exceptions.RequestException as e:
+            print(f"\n⚠️  Fetching PDFs failed after pdf_id {last_pdf_id}: {e}")
+            return
         
-        if entity_id:
-            params["entity_id"] = f"eq.{entity_id}"
+        if response.status_code != 200:
+            print(f"\n⚠️  Fetching PDFs failed after pdf_id {last_pdf_id}: HTTP {response.status_code}")
+            return
         
-        if limit and len(all_pdfs) >= limit:
-            all_pdfs = all_pdfs[:limit]
+        try:
+            batch = response.json()
+        except ValueError:
+            print(f"\n⚠️  Fetching PDFs failed after pdf_id {last_pdf_id}: response is not JSON")
+            return
+        for pdf in batch:
+            yield pdf
+        yielded += len(batch)
+        
+        if len(batch) < int(params["limit"]):
+            return
+        last_pdf_id = batch[-1]['pdf_id']
+
+def fetch_reports_by_ids(pdf_ids: List[int], entity_id: Optional[int] = None, reprocess_older: bool = False,
+                         page_type: Optional[str] = None, run_journal: Optional[RunJournal] = None) -> List[Dict]:
+    """The given report PDFs that still match the run's filters (report_pdf_filters)
+    
+    Dead letters outside the filters (converted elsewhere, or another --entity /
+    --reprocess-older selection) are released in run_journal for a run they match.
+    On a failed request they stay taken until the next run.
+    """
+    if not pdf_ids:
+        return []
+    
+    headers = {
+        "apikey": SUPABASE_KEY,
+        "Authorization": f"Bearer {SUPABASE_KEY}"
+    }
+    params = {
+        **report_pdf_filters(entity_id, reprocess_older, page_type),
+        "select": "*",
+        "pdf_id": f"in.({','.join(str(pdf_id) for pdf_id in pdf_ids)})",
+        "order": "pdf_id"
+    }
+    try:
+        response = requests.get(f"{SUPABASE_URL}/rest/v1/cf_report_pdfs", headers=headers, params=params,
+                                timeout=SUPABASE_TIMEOUT)
+    except requests.exceptions.RequestException:
+        return []
+    if response.status_code != 200:
+        return []
+    
+    pdfs = response.json()
+    found = {pdf['pdf_id'] for pdf in pdfs}
+    if run_journal is not None:
+        run_journal.release_dead_letters(pdf_id for pdf_id in pdf_ids if pdf_id not in found)
+    return pdfs
+
+def claim_retries(claimer: LeaseClaimer, pdf_ids: List[int], run_journal: RunJournal) -> List[Dict]:
+    """Lease the given dead letters to this node (fetch_reports_by_ids for claim mode)
+    
+    Ones converted or leased elsewhere are released in run_journal for this run.
+    On a failed request they stay taken until the next run.
+    """
+    if not pdf_ids:
+        return []
+    try:
+        pdfs = claimer.claim(len(pdf_ids), pdf_ids)
+    except requests.exceptions.RequestException:
+        return []
+    
+    found = {pdf['pdf_id'] for pdf in pdfs}
+    run_journal.release_dead_letters(pdf_id for pdf_id in pdf_ids if pdf_id not in found)
+    return pdfs
+
+def due_retries(args, settings: RunSettings, limit: Optional[int] = None) -> List[Dict]:
+    """Take the dead-letter retries that are due (at most limit) and fetch their records
+    
+    In claim mode they are leased by id instead, so no other node parses them meanwhile.
+    """
+    if settings.run_journal is None or limit == 0:
+        return []
+    batch = RETRY_BATCH if limit is None else min(RETRY_BATCH, limit)
+    pdf_ids = settings.run_journal.take_due_retries(batch)
+    if settings.lease_claimer is not None:
+        pdfs = claim_retries(settings.lease_claimer, pdf_ids, settings.run_journal)
+    else:
+        pdfs = fetch_reports_by_ids(pdf_ids, entity_id=args.entity, reprocess_older=args.reprocess_older,
+                                    page_type=args.page_type, run_journal=settings.run_journal)
+    with stats_lock:
+        global_stats['retried'] += len(pdfs)
+    return pdfs
+
+def with_due_retries(pdfs, args, settings: RunSettings):
+    """Yield pdfs with due dead-letter retries mixed in every RETRY_CHECK_SECONDS
+    
+    A PDF already handed out as a retry is skipped when the stream reaches it.
+    Retries count against --limit: with one set they take the place of stream PDFs.
+    """
+    remaining = args.limit or None
+    handed_out = 0
+    retried = set()
+    last_check = None
+    for pdf in pdfs:
+        if last_check is None or time.monotonic() - last_check >= RETRY_CHECK_SECONDS:
+            last_check = time.monotonic()
+            for retry in due_retries(args, settings, remaining):
+                retried.add(retry['pdf_id'])
+                handed_out += 1
+                if remaining is None:
+                    with stats_lock:
+                        global_stats['total'] += 1
+                else:
+                    remaining -= 1
+                yield retry
+        
+        if remaining == 0:
             break
+        if pdf['pdf_id'] in retried:
+            if remaining is None:
+                with stats_lock:
+                    global_stats['total'] -= 1  # Counted when it was retried
+            continue
+        handed_out += 1
+        if remaining is not None:
+            remaining -= 1
+        yield pdf
+    
+    with stats_lock:
+        global_stats['total'] = handed_out
+
+def drain_retries(args, settings: RunSettings):
+    """After the main pass: wait for each scheduled retry and run it, until none are left
+    
+    Stops early once --limit PDFs (main pass plus retries) have been handed out.
+    """
+    def remaining() -> Optional[int]:
+        if not args.limit:
+            return None
+        with stats_lock:
+            return max(0, args.limit - global_stats['total'])
+    
+    while settings.run_journal is not None and not shutdown_requested and remaining() != 0:
+        next_retry_at = settings.run_journal.next_retry_at()
+        if next_retry_at is None:
+            return
         
-        response = requests.get(url, headers=headers, params=params)
+        wait_seconds = next_retry_at - time.time()
+        if wait_seconds > 0:
+            print(f"\n⏳ Waiting {wait_seconds:.0f}s for the next scheduled retry")
+            while time.time() < next_retry_at and not shutdown_requested:
+                time.sleep(min(1.0, next_retry_at - time.time()))
         
-        if response.status_code == 200:
-            batch = response.json()
-            all_pdfs.extend(batch)
-            
-            if len(batch) < batch_size:
+        while not shutdown_requested:
+            pdfs = due_retries(args, settings, remaining())
+            if not pdfs:
                 break
-                
-            offset += batch_size
+            with stats_lock:
+                global_stats['total'] += len(pdfs)
+            process_pdfs(pdfs, args, settings)
+
+# One processor per executor thread, reused for every PDF that thread handles
+thread_state = local()
+worker_id_lock = Lock()
+next_worker_id = 0
+
+def get_thread_processor(extractor: str = 'r', settings: Optional[RunSettings] = None) -> PDFDonationProcessor:
+    """Return this thread's processor, creating it (with a unique worker id) on first use"""
+    global next_worker_id
+    processor = getattr(thread_state, 'processor', None)
+    if processor is None:
+        with worker_id_lock:
+            worker_id = next_worker_id
+            next_worker_id += 1
+        processor = PDFDonationProcessor(worker_id, extractor, settings)
+        thread_state.processor = processor
+    return processor
+
+def worker_process_pdf(pdf_record: Dict, extractor: str = 'r', settings: Optional[RunSettings] = None) -> Dict:
+    """Worker function to process a single PDF"""
+    return get_thread_processor(extractor, settings).process_pdf(pdf_record)
+
+def worker_process_batch(pdf_records: List[Dict], extractor: str = 'r',
+                         settings: Optional[RunSettings] = None) -> List[Dict]:
+    """Worker function to process a batch of PDFs in one R session"""
+    return get_thread_processor(extractor, settings).process_batch(pdf_records)
+
+def failure_class(error: str) -> Optional[str]:
+    """Dead-letter class for a failed PDF's error; None when retrying can't help"""
+    if error.startswith('Unfiled report'):
+        return None
+    if error.startswith('Download failed'):
+        return 'download'
+    if error in ('R scraper failed', 'Python extractor failed'):
+        return 'parse'
+    if error.startswith('Failed to'):
+        return 'upload'
+    return 'error'
+
+def dead_letter(pdf_id: int, error: str, settings: RunSettings):
+    """Schedule a failed PDF's next retry in the dead-letter store (when the run journal is on)"""
+    failure = failure_class(error)
+    if settings.run_journal is not None and failure:
+        settings.run_journal.dead_letter(pdf_id, failure, error, settings.max_retries,
+                                         settings.retry_base_seconds)
+
+def mark_pdf_failed(pdf_id: int, error: str, settings: RunSettings):
+    """Record why a PDF failed on cf_report_pdfs (buffered unless --no-status-buffer); it stays unconverted"""
+    if settings.status_buffer is not None:
+        settings.status_buffer.mark_failed(pdf_id, error)
+        return
+    
+    headers = {
+        "apikey": SUPABASE_KEY,
+        "Authorization": f"Bearer {SUPABASE_KEY}",
+        "Content-Type": "application/json"
+    }
+    try:
+        requests.patch(f"{SUPABASE_URL}/rest/v1/cf_report_pdfs", headers=headers,
+                       params={"pdf_id": f"eq.{pdf_id}"}, json={'error_message': error},
+                       timeout=SUPABASE_TIMEOUT)
+    except requests.exceptions.RequestException:
+        pass  # Only the reason is lost - the PDF is retried either way
+
+def record_result(result: Dict, settings: RunSettings):
+    """Count a finished PDF in the global stats, queue the reason it failed and schedule its retry"""
+    with stats_lock:
+        if result['success']:
+            global_stats['success'] += 1
+        elif result['error'] and '404' in result['error']:
+            pass  # Already counted in skipped
         else:
-            break
+            global_stats['failed'] += 1
     
-    if limit:
-        all_pdfs = all_pdfs[:limit]
+    # Skipped PDFs were already marked with their reason. A failed reprocess leaves the
+    # older parser's rows in place: an error_message would drop it from --reprocess-older
+    if result['success']:
+        if settings.status_buffer is not None:
+            settings.status_buffer.mark_succeeded(result['pdf_id'])
+    elif (result['error'] and not result['error'].startswith('Unfiled report')
+            and not result.get('reprocess')):
+        mark_pdf_failed(result['pdf_id'], result['error'], settings)
+    if not result['success'] and settings.lease_claimer is not None:
+        settings.lease_claimer.mark_failed(result['pdf_id'])
     
-    return all_pdfs
+    if result['success']:
+        if settings.run_journal is not None:
+            settings.run_journal.resolve_dead_letter(result['pdf_id'])
+    else:
+        dead_letter(result['pdf_id'], result['error'] or 'Unknown error', settings)
 
-def worker_process_pdf(worker_id: int, pdf_record: Dict) -> Dict:
-    """Worker function to process a single PDF"""
-    processor = PDFDonationProcessor(worker_id)
-    return processor.process_pdf(pdf_record)
+def run_executor(pdfs, args, settings: RunSettings):
+    """Process PDFs with one worker pool where each task runs download, parse and upload in series
+    
+    pdfs may be any iterable (e.g. the streaming iter_reports_from_supabase); at most
+    --max-in-flight tasks are submitted at a time, so memory doesn't grow with the backlog.
+    """
+    pdfs = iter(pdfs)
+    if args.batch_size > 1:
+        tasks = iter(lambda: list(islice(pdfs, args.batch_size)), [])
+        worker = worker_process_batch
+    else:
+        tasks = pdfs
+        worker = worker_process_pdf
+    max_in_flight = args.max_in_flight or args.workers * 2
+    
+    with ThreadPoolExecutor(max_workers=args.workers) as executor:
+        future_to_pdf = {}
+        
+        def submit_more():
+            while len(future_to_pdf) < max_in_flight and not shutdown_requested:
+                task = next(tasks, None)
+                if task is None:
+                    return
+                future_to_pdf[executor.submit(worker, task, args.extractor, settings)] = task
+        
+        submit_more()
+        
+        # Process completed tasks, topping the window back up as they finish
+        while future_to_pdf:
+            done, _ = wait(future_to_pdf, return_when=FIRST_COMPLETED)
+            if shutdown_requested:
+                executor.shutdown(wait=False, cancel_futures=True)
+                break
+            
+            for future in done:
+                pdf = future_to_pdf.pop(future)
+                task_size = len(pdf) if isinstance(pdf, list) else 1
+                try:
+                    results = future.result()
+                    if isinstance(results, dict):
+                        results = [results]
+                    for result in results:
+                        record_result(result, settings)
+                except Exception as e:
+                    with stats_lock:
+                        global_stats['failed'] += task_size
+                    for pdf_record in (pdf if isinstance(pdf, list) else [pdf]):
+                        dead_letter(pdf_record.get('pdf_id'), str(e), settings)
+                        if settings.lease_claimer is not None:
+                            settings.lease_claimer.mark_failed(pdf_record.get('pdf_id'))
+                
+                # Print progress every 10 PDFs
+                total_processed = global_stats['success'] + global_stats['failed'] + global_stats['skipped']
+                if task_size > 1 or total_processed % 10 == 0:
+                    print_progress()
+            
+            submit_more()
+
+def run_pipeline(pdfs, args, settings: RunSettings):
+    """Process PDFs through the staged download -> parse -> upload pipeline"""
+    async_downloader = None
+    if args.async_downloads:
+        async_downloader = AsyncDownloader(
+            concurrency=args.async_downloads,
+            per_host=args.per_host_downloads,
+            temp_dir=TEMP_PDF_DIR,
+            pdf_cache=settings.pdf_cache,
+            revalidate=settings.revalidate_pdf_cache,
+            in_memory=settings.in_memory_pdfs
+        )
+    pipeline = StagedPipeline(
+        download_workers=args.download_workers,
+        parse_workers=args.parse_workers,
+        upload_workers=args.upload_workers,
+        queue_size=args.queue_size,
+        processor_factory=lambda: get_thread_processor(args.extractor, settings),
+        upload_window=args.upload_window,
+        big_parse_workers=args.big_parse_workers,
+        big_pdf_pages=args.big_pdf_pages,
+        async_downloader=async_downloader,
+        stop_requested=lambda: shutdown_requested
+    )
+    
+    for result in pipeline.run(pdfs):
+        record_result(result, settings)
+        
+        # Print progress every 10 PDFs
+        total_processed = global_stats['success'] + global_stats['failed'] + global_stats['skipped']
+        if total_processed % 10 == 0:
+            print_progress(pipeline)
+
+def process_pdfs(pdfs, args, settings: RunSettings):
+    """Run PDFs through the pipeline or the executor"""
+    if args.pipeline:
+        run_pipeline(pdfs, args, settings)
+    else:
+        run_executor(pdfs, args, settings)
+    if settings.lease_claimer is not None:
+        settings.lease_claimer.release_failed()
+
+def process_claimed(claimer: LeaseClaimer, args, settings: RunSettings):
+    """Claim, process and repeat until nothing is left to claim (or --limit is reached)
+    
+    Each batch starts with the dead-letter retries that are due; drain_retries runs
+    the ones still scheduled once nothing else is left.
+    """
+    while not shutdown_requested:
+        limit = args.claim_batch
+        if args.limit:
+            limit = min(limit, args.limit - global_stats['total'])
+            if limit <= 0:
+                return
+        
+        pdfs = due_retries(args, settings, limit)
+        if len(pdfs) < limit:
+            pdfs += claimer.claim(limit - len(pdfs))
+        if not pdfs:
+            print("\n✅ Nothing left to claim")
+            return
+        
+        with stats_lock:
+            global_stats['total'] += len(pdfs)
+        process_pdfs(pdfs, args, settings)
 
-def print_progress():
+def print_progress(pipeline: Optional[StagedPipeline] = None):
     """Print progress statistics"""
     with stats_lock:
         if global_stats['start_time']:
@@ -798,6 +2254,11 @@ def print_progress():
                   f"✅ {global_stats['success']} | ❌ {global_stats['failed']} | ⏭️ {global_stats['skipped']} | "
                   f"💰 {global_stats['donations_uploaded']} donations | "
                   f"⚡ {rate:.1f}/sec | ⏱️ ETA: {str(eta).split('.')[0]}", end='', flush=True)
+            
+            if pipeline is not None:
+                depths = pipeline.queue_depths()
+                print(f" | 📦 queues: download {depths['download']} / parse {depths['parse']} "
+                      f"(+{depths['parse_big']} big) / upload {depths['upload']}", end='', flush=True)
 
 def main():
     """Main execution with concurrent processing"""
@@ -808,37 +2269,222 @@ def main():
                        help='Limit number of PDFs to process')
     parser.add_argument('--workers', type=int, default=8,
                        help='Number of parallel workers (default: 8)')
+    parser.add_argument('--extractor', choices=['r', 'python'], default='r',
+                       help='PDF extractor: R scraper or native Python port on pdftotext (default: r)')
+    parser.add_argument('--no-r-pool', action='store_true',
+                       help='Start a fresh Rscript per PDF instead of using long-lived R workers')
+    parser.add_argument('--max-in-flight', type=int, default=None,
+                       help='Max PDFs (or batches) submitted to the workers at once (default: 2 x workers)')
+    parser.add_argument('--batch-size', type=int, default=1,
+                       help='PDFs per R session in batch mode (default: 1 = one PDF per task)')
+    parser.add_argument('--rps', type=float, default=DEFAULT_RPS,
+                       help=f'PDF download requests per second, shared by all workers (default: {DEFAULT_RPS:g})')
+    parser.add_argument('--no-pdf-cache', action='store_true',
+                       help='Always download PDFs instead of using the local PDF cache')
+    parser.add_argument('--pdf-cache-gb', type=float, default=20,
+                       help='Max size of the local PDF cache in GB (default: 20)')
+    parser.add_argument('--revalidate-cache', action='store_true',
+                       help='Check cached PDFs with the server (ETag/Last-Modified) before reusing them')
+    parser.add_argument('--no-text-cache', action='store_true',
+                       help='Re-extract PDF text on every parse instead of using the text cache')
+    parser.add_argument('--legacy-upload', action='store_true',
+                       help='Upload with separate report/donation/status requests instead of the ingest_reports '
+                            'function (used automatically when the database does not have it)')
+    parser.add_argument('--no-journal', action='store_true',
+                       help=f'Do not keep {RUN_JOURNAL_PATH} (no resume after a crash, no scheduled retries)')
+    parser.add_argument('--max-retries', type=int, default=3,
+                       help='Retries for a failed PDF within the run (dead-letter store in the run journal; default: 3)')
+    parser.add_argument('--retry-base-seconds', type=float, default=60.0,
+                       help='Delay before the first retry, doubled for each later one (default: 60)')
+    parser.add_argument('--no-status-buffer', action='store_true',
+                       help='PATCH each PDF status immediately instead of batching the updates')
+    parser.add_argument('--status-flush-items', type=int, default=200,
+                       help='Flush buffered status updates after this many PDFs (default: 200)')
+    parser.add_argument('--status-flush-seconds', type=float, default=5.0,
+                       help='Flush buffered status updates at least this often (default: 5)')
+    parser.add_argument('--claim', action='store_true',
+                       help='Lease PDFs in batches (claim_report_pdfs) so several nodes can run at once')
+    parser.add_argument('--node-id', default=f"{socket.gethostname()}-{os.getpid()}",
+                       help='Claim mode: id this node holds leases under (default: hostname-pid)')
+    parser.add_argument('--claim-batch', type=int, default=100,
+                       help='Claim mode: PDFs leased per claim (default: 100)')
+    parser.add_argument('--lease-seconds', type=int, default=900,
+                       help='Claim mode: lease length, renewed every third of it (default: 900)')
+    parser.add_argument('--reprocess-older', action='store_true',
+                       help=f'Re-parse converted PDFs whose parser version is older than {PARSER_VERSION}')
+    parser.add_argument('--page-type', default=None,
+                       help='With --reprocess-older: only PDFs with this page type (e.g. "Schedule C2")')
+    parser.add_argument('--no-quick-no-activity', action='store_true',
+                       help='Run the full extractor on "NO ACTIVITY THIS PERIOD" reports too')
+    parser.add_argument('--prefilter-pages', action='store_true',
+                       help='Find cover and Schedule C2 pages with a fast pre-pass and extract only those')
+    parser.add_argument('--in-memory', action='store_true',
+                       help='Keep PDFs and extracted rows in memory: PDF bytes go to the extractor on stdin and '
+                            'rows come back on stdout, with no temp PDF or CSV files (not in batch mode). The PDF '
+                            'and text caches still write to disk unless --no-pdf-cache / --no-text-cache')
+    parser.add_argument('--split-pages', type=int, default=200,
+                       help='Parse PDFs with at least this many pages as parallel page chunks on R workers; '
+                            'the Python extractor only runs pdftotext in parallel for them; 0 disables (default: 200)')
+    parser.add_argument('--split-workers', type=int, default=4,
+                       help='Chunks parsed at once for one split PDF (Python extractor: pdftotext processes) '
+                            '(default: 4)')
+    parser.add_argument('--pipeline', action='store_true',
+                       help='Run download, parse and upload as separate stages with their own pools; only this '
+                            'mode parses big PDFs longest-first in their own lane (--big-parse-workers)')
+    parser.add_argument('--download-workers', type=int, default=16,
+                       help='Pipeline mode: concurrent downloads (default: 16)')
+    parser.add_argument('--async-downloads', type=int, default=0,
+                       help='Pipeline mode: download on one asyncio thread with this many fetches in flight '
+                            'instead of download threads; needs httpx (default: 0 = threads)')
+    parser.add_argument('--per-host-downloads', type=int, default=16,
+                       help='Pipeline mode: max async downloads in flight to one host (default: 16)')
+    parser.add_argument('--parse-workers', type=int, default=os.cpu_count() or 4,
+                       help='Pipeline mode: concurrent PDF parses (default: CPU count)')
+    parser.add_argument('--big-parse-workers', type=int, default=1,
+                       help='Pipeline mode: parsers reserved for big PDFs, 0 = no separate lane; the default '
+                            'executor parses PDFs in fetch order (default: 1)')
+    parser.add_argument('--big-pdf-pages', type=int, default=100,
+                       help='Pipeline mode: PDFs with at least this many pages use the big-PDF lane (default: 100)')
+    parser.add_argument('--upload-workers', type=int, default=4,
+                       help='Pipeline mode: concurrent Supabase uploads (default: 4)')
+    parser.add_argument('--queue-size', type=int, default=32,
+                       help='Pipeline mode: max items waiting between stages (default: 32)')
+    parser.add_argument('--upload-window', type=int, default=16,
+                       help='Pipeline mode: max parsed PDFs stored per upload request (default: 16)')
     args = parser.parse_args()
+    if args.in_memory and args.batch_size > 1 and not args.pipeline and args.extractor == 'r':
+        parser.error("--in-memory does not work with --batch-size > 1 (batch mode R reads a manifest of PDF files)")
+    settings = RunSettings()
     
     print("\n" + "="*70)
     print("ARIZONA CAMPAIGN FINANCE - CONCURRENT PDF PROCESSOR")
     print("="*70)
     
-    # Check R is available
-    try:
-        subprocess.run(['Rscript', '--version'], capture_output=True, check=True)
-    except:
-        print("❌ R is not installed or not in PATH")
-        return
-    
-    # Fetch PDFs
-    print(f"\n📥 Fetching unprocessed PDFs...")
-    pdfs = fetch_reports_from_supabase(entity_id=args.entity, limit=args.limit)
-    
-    if not pdfs:
-        print("No PDFs found to process")
-        return
+    # Check the extractor is available
+    if args.extractor == 'python':
+        try:
+            subprocess.run(['pdftotext', '-v'], capture_output=True, check=True)
+        except:
+            print("❌ pdftotext (poppler-utils) is not installed or not in PATH")
+            return
+    else:
+        try:
+            subprocess.run(['Rscript', '--version'], capture_output=True, check=True)
+        except:
+            print("❌ R is not installed or not in PATH")
+            return
     
-    print(f"✅ Found {len(pdfs)} PDFs to process")
-    print(f"🔧 Using {args.workers} parallel workers")
+    # Fetch PDFs (claim mode leases them in batches as it goes instead)
+    if args.claim:
+        if args.reprocess_older:
+            print("❌ --claim only hands out unconverted PDFs; run --reprocess-older without it")
+            return
+        pdfs = []
+        print(f"\n📥 Claiming PDFs in batches of {args.claim_batch} as node {args.node_id} "
+              f"(lease {args.lease_seconds}s)")
+    elif args.reprocess_older:
+        print(f"\n📥 Fetching PDFs parsed before parser version {PARSER_VERSION}"
+              f"{f' with {args.page_type} pages' if args.page_type else ''}...")
+    else:
+        print("\n📥 Fetching unprocessed PDFs...")
+    total_pdfs = 0
+    if not args.claim:
+        total_pdfs = count_reports_from_supabase(entity_id=args.entity, reprocess_older=args.reprocess_older,
+                                                 page_type=args.page_type)
+        if total_pdfs is None:
+            print("❌ Could not count PDFs to process")
+            return
+        if args.limit:
+            total_pdfs = min(total_pdfs, args.limit)
+        
+        if not total_pdfs:
+            print("No PDFs found to process")
+            return
+        
+        # Streamed page by page while workers run
+        pdfs = iter_reports_from_supabase(entity_id=args.entity, limit=args.limit,
+                                          reprocess_older=args.reprocess_older, page_type=args.page_type)
+        print(f"✅ Found {total_pdfs} PDFs to process")
+    if args.pipeline:
+        parse_workers = args.parse_workers + args.big_parse_workers
+        if args.async_downloads and not HTTPX_AVAILABLE:
+            print("⚠️ --async-downloads needs httpx (pip install httpx) - using download threads")
+            args.async_downloads = 0
+        downloaders = (f"async downloads ({args.async_downloads} in flight, {args.per_host_downloads} per host)"
+                       if args.async_downloads else f"{args.download_workers} downloaders")
+        print(f"🔧 Pipeline mode: {downloaders} → {args.parse_workers} parsers "
+              f"(+{args.big_parse_workers} for PDFs of {args.big_pdf_pages}+ pages) → "
+              f"{args.upload_workers} uploaders (queue size {args.queue_size}, up to {args.upload_window} PDFs per upload)")
+    else:
+        parse_workers = args.workers
+        print(f"🔧 Using {args.workers} parallel workers")
+        if any(getattr(args, name) != parser.get_default(name) for name in ('big_parse_workers', 'big_pdf_pages')):
+            print("\n⚠️ --big-parse-workers / --big-pdf-pages only apply with --pipeline "
+                  "(the executor parses PDFs in fetch order)")
+    if not args.no_pdf_cache:
+        settings.pdf_cache = PDFCache(PDF_CACHE_DIR, int(args.pdf_cache_gb * 1024 ** 3))
+        settings.revalidate_pdf_cache = args.revalidate_cache
+        print(f"🔧 PDF cache: {PDF_CACHE_DIR} "
+              f"({settings.pdf_cache.total_bytes() / 1024 ** 3:.1f} of {args.pdf_cache_gb:g} GB used)")
+    configure_rate_limit(args.rps)
+    print(f"🔧 Downloads limited to {args.rps:g} requests/second (slower while the server returns 429/503)")
+    settings.use_ingest_rpc = not args.legacy_upload
+    if args.legacy_upload:
+        print("🔧 Legacy upload: separate report, donation and status requests")
+    if not args.no_journal:
+        settings.run_journal = RunJournal(RUN_JOURNAL_PATH, f"{args.extractor}-{PARSER_VERSION}")
+        unfinished = {stage: n for stage, n in settings.run_journal.stage_counts().items() if stage != 'marked'}
+        print(f"🔧 Run journal: {RUN_JOURNAL_PATH}"
+              f"{f' (resuming {sum(unfinished.values())} unfinished PDFs)' if unfinished else ''}")
+        settings.max_retries = args.max_retries
+        settings.retry_base_seconds = args.retry_base_seconds
+        dead_letters = settings.run_journal.dead_letter_counts()
+        if dead_letters:
+            print("🔧 Dead letters: " + ", ".join(f"{n} {failure}" for failure, n in sorted(dead_letters.items())))
+    if not args.no_status_buffer:
+        settings.status_buffer = StatusBuffer(SUPABASE_URL, SUPABASE_KEY, args.status_flush_items,
+                                              args.status_flush_seconds, settings.run_journal, SUPABASE_TIMEOUT)
+    settings.prefilter_pages = args.prefilter_pages
+    settings.quick_no_activity = not args.no_quick_no_activity and shutil.which('pdftotext') is not None
+    if settings.prefilter_pages:
+        print("🔧 Page prefilter: extracting only cover and Schedule C2 pages")
+    settings.split_pages = args.split_pages if args.split_workers > 1 else 0
+    settings.split_workers = args.split_workers
+    if settings.split_pages:
+        print(f"🔧 PDFs of {settings.split_pages}+ pages are parsed as up to {settings.split_workers} "
+              f"parallel page chunks")
+    if not args.no_text_cache:
+        settings.text_cache = TextCache(TEXT_CACHE_DIR)
+        print(f"🔧 Text cache: {TEXT_CACHE_DIR}")
+    settings.in_memory_pdfs = args.in_memory
+    if settings.in_memory_pdfs:
+        caches = ', '.join(name for name, cache in (('PDFs', settings.pdf_cache), ('text', settings.text_cache))
+                           if cache is not None)
+        print("🔧 In-memory mode: PDFs go to the extractor on stdin, rows come back on stdout (no temp files)"
+              f"{f'; still cached on disk: {caches}' if caches else ''}")
+    if args.extractor == 'python':
+        print("🔧 Using the native Python extractor")
+    elif args.batch_size > 1 and not args.pipeline:
+        print(f"🔧 Batch mode: {args.batch_size} PDFs per R session")
+    elif not args.no_r_pool:
+        settings.r_worker_pool = RWorkerPool(parse_workers, OUTPUT_DIR, R_SCRAPER_SETUP)
+        started = settings.r_worker_pool.start()
+        if not started:
+            # Every PDF would fail the same way - stop here with R's errors on screen
+            print("❌ No R worker process could start (see the R errors above)")
+            settings.r_worker_pool.close()
+            return
+        print(f"🔧 Using a pool of {started} long-lived R processes"
+              f"{f' ({parse_workers - started} failed to start)' if started < parse_workers else ''}")
     
     # Calculate estimates
-    total_time_estimate = len(pdfs) * 5 / args.workers  # Assume 5 seconds per PDF
-    print(f"⏱️  Estimated time: {timedelta(seconds=total_time_estimate)}")
+    if total_pdfs:
+        total_time_estimate = total_pdfs * 5 / parse_workers  # Assume 5 seconds per PDF
+        print(f"⏱️  Estimated time: {timedelta(seconds=total_time_estimate)}")
     
     # Initialize stats
     with stats_lock:
-        global_stats['total'] = len(pdfs)
+        global_stats['total'] = total_pdfs
         global_stats['start_time'] = datetime.now()
     
     print("\n" + "="*70)
@@ -846,37 +2492,33 @@ def main():
     print("="*70 + "\n")
     
     # Process PDFs concurrently
-    with ThreadPoolExecutor(max_workers=args.workers) as executor:
-        # Submit all tasks
-        future_to_pdf = {
-            executor.submit(worker_process_pdf, i % args.workers, pdf): pdf 
-            for i, pdf in enumerate(pdfs)
-        }
-        
-        # Process completed tasks
-        for future in as_completed(future_to_pdf):
-            if shutdown_requested:
-                executor.shutdown(wait=False)
-                break
-                
-            pdf = future_to_pdf[future]
-            try:
-                result = future.result()
-                with stats_lock:
-                    if result['success']:
-                        global_stats['success'] += 1
-                    elif result['error'] and '404' in result['error']:
-                        pass  # Already counted in skipped
-                    else:
-                        global_stats['failed'] += 1
-            except Exception as e:
-                with stats_lock:
-                    global_stats['failed'] += 1
-            
-            # Print progress every 10 PDFs
-            total_processed = global_stats['success'] + global_stats['failed'] + global_stats['skipped']
-            if total_processed % 10 == 0:
-                print_progress()
+    claimer = None
+    if args.claim:
+        claimer = LeaseClaimer(SUPABASE_URL, SUPABASE_KEY, args.node_id, args.lease_seconds, args.entity,
+                               SUPABASE_TIMEOUT)
+        settings.lease_claimer = claimer
+    try:
+        if claimer is not None:
+            process_claimed(claimer, args, settings)
+        else:
+            process_pdfs(with_due_retries(pdfs, args, settings), args, settings)
+        drain_retries(args, settings)
+    finally:
+        if claimer is not None:
+            released = claimer.close()
+            print(f"\n🔧 Released {released} unfinished claims")
+        if settings.r_worker_pool is not None:
+            settings.r_worker_pool.close()
+        if settings.pdf_cache is not None:
+            settings.pdf_cache.close()
+        if settings.status_buffer is not None:
+            unsent = settings.status_buffer.close()
+            stats = settings.status_buffer.stats
+            print(f"\n🔧 Status updates: {stats['updates']} PDFs in {stats['requests']} requests")
+            if unsent:
+                print(f"⚠️  {unsent} status updates could not be saved")
+        if settings.run_journal is not None:
+            settings.run_journal.close()  # After the status buffer, whose last flush journals its marks
     
     # Final statistics
     print("\n\n" + "="*70)
@@ -889,6 +2531,8 @@ def main():
         print(f"  Successfully processed: {global_stats['success']}")
         print(f"  Failed: {global_stats['failed']}")
         print(f"  Skipped (404s): {global_stats['skipped']}")
+        print(f"  No-activity reports (no extractor run): {global_stats['no_activity']}")
+        print(f"  Retries of failed PDFs: {global_stats['retried']}")
         print(f"  Total donations uploaded: {global_stats['donations_uploaded']}")
         print(f"  Total time: {str(elapsed).split('.')[0]}")
         print(f"  Average rate: {(global_stats['success'] + global_stats['failed'] + global_stats['skipped']) / elapsed.total_seconds():.2f} PDFs/second")
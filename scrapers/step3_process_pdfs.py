@@ -8,13 +8,14 @@ Includes support for backcheck mode to retry failed PDFs.
 """
 
 import json
-import time
 import requests
 from pathlib import Path
 from datetime import datetime
 from typing import Dict, List, Optional
 import argparse
 
+from rate_limiter import DEFAULT_RPS, RateLimitedSession, configure as configure_rate_limit
+
 # Configuration
 OUTPUT_DIR = Path("campaign_finance_data")
 OUTPUT_DIR.mkdir(exist_ok=True)
@@ -29,7 +30,7 @@ class PDFProcessor:
     """Download and process campaign finance PDFs"""
     
     def __init__(self, upload_to_supabase: bool = False):
-        self.session = requests.Session()
+        self.session = RateLimitedSession()  # Paced by the shared per-host limiter
         self.session.headers.update({
             'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36'
         })
@@ -182,9 +183,6 @@ def process_reports(reports: List[Dict], backcheck: bool = False, upload_to_supa
             # Still upload to Supabase but mark as invalid
             if upload_to_supabase and pdf_url:
                 processor.upload_to_supabase_db(report, pdf_url, False)
-        
-        # Rate limiting
-        time.sleep(0.05)
     
     return stats
 
@@ -199,7 +197,10 @@ def main():
                        help='Limit number of reports to process')
     parser.add_argument('--valid-only', action='store_true',
                        help='Only process reports with valid PDF URLs')
+    parser.add_argument('--rps', type=float, default=DEFAULT_RPS,
+                       help=f'Requests per second to seethemoney.az.gov (default: {DEFAULT_RPS:g})')
     args = parser.parse_args()
+    configure_rate_limit(args.rps)
     
     print("\n" + "="*70)
     print("ARIZONA CAMPAIGN FINANCE - STEP 3: PROCESS PDFs (FINAL)")
@@ -21,6 +21,8 @@ import random
 from queue import Queue
 import atexit
 
+from rate_limiter import DEFAULT_RPS, RateLimitedSession, configure as configure_rate_limit
+
 # Configuration
 OUTPUT_DIR = Path("campaign_finance_transactions")
 OUTPUT_DIR.mkdir(exist_ok=True)
@@ -87,7 +89,7 @@ class TransactionScraper:
     
     def __init__(self, worker_id: int = 0):
         self.worker_id = worker_id
-        self.session = requests.Session()
+        self.session = RateLimitedSession()  # All workers share one per-host limit
         self.session.headers.update({
             'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36',
             'Accept': 'application/json, text/javascript, */*; q=0.01',
@@ -590,7 +592,10 @@ def main():
                        help='Disable automatic upload to Supabase')
     parser.add_argument('--upload-interval', type=int, default=60,
                        help='Upload interval in seconds (default: 60)')
+    parser.add_argument('--rps', type=float, default=DEFAULT_RPS,
+                       help=f'Requests per second to seethemoney.az.gov, shared by all workers (default: {DEFAULT_RPS:g})')
     args = parser.parse_args()
+    configure_rate_limit(args.rps)
     
     global UPLOAD_INTERVAL_SECONDS, upload_thread
     UPLOAD_INTERVAL_SECONDS = args.upload_interval
@@ -668,9 +673,6 @@ def main():
             # Check if we should upload (every N entities)
             if not args.no_upload and processed % UPLOAD_BATCH_SIZE == 0:
                 upload_pending_data(force=False)
-            
-            # Add small delay to avoid overwhelming the server
-            time.sleep(0.1)
     
     # Final upload of any remaining data
     if not args.no_upload and not shutdown_requested:
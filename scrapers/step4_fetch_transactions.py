@@ -28,6 +28,8 @@ import sys
 import atexit
 from queue import Queue
 
+from rate_limiter import DEFAULT_RPS, RateLimitedSession, configure as configure_rate_limit
+
 # Configuration
 OUTPUT_DIR = Path("campaign_finance_transactions")
 OUTPUT_DIR.mkdir(exist_ok=True)
@@ -118,7 +120,7 @@ class TransactionScraperV3:
     """Enhanced scraper that pulls from Supabase and handles foreign keys properly"""
     
     def __init__(self, upload_to_db: bool = False):
-        self.session = requests.Session()
+        self.session = RateLimitedSession()  # All workers share one per-host limit
         self.session.headers.update({
             'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36',
             'Accept': 'application/json, text/javascript, */*; q=0.01',
@@ -353,8 +355,8 @@ class TransactionScraperV3:
         response = self.session.post(url, data=post_data, timeout=30)
         if response.status_code == 200:
             return response.json()
-        elif response.status_code >= 500:
-            # Server errors should trigger retry
+        elif response.status_code >= 500 or response.status_code == 429:
+            # Server errors and rate limiting (the session already slowed down) should trigger retry
             raise Exception(f"Server error fetching entity {entity_id} page {table_page}: Status {response.status_code}")
         else:
             # Client errors shouldn't retry (400-499)
@@ -396,8 +398,6 @@ class TransactionScraperV3:
         logger.info(f"Entity {entity_id}: {total_records} transactions across {total_pages} pages")
         
         for page in range(2, total_pages + 1):
-            time.sleep(0.1)  # Rate limiting
-            
             page_data = self.fetch_entity_transactions(entity_id, table_page=page, table_length=page_size)
             if page_data and 'data' in page_data:
                 all_transactions.extend(page_data['data'])
@@ -875,7 +875,10 @@ def main():
                        help='Force re-scraping of all entities, ignoring existing data')
     parser.add_argument('--workers', type=int, default=10,
                        help='Number of parallel workers (default: 10)')
+    parser.add_argument('--rps', type=float, default=DEFAULT_RPS,
+                       help=f'Requests per second to seethemoney.az.gov, shared by all workers (default: {DEFAULT_RPS:g})')
     args = parser.parse_args()
+    configure_rate_limit(args.rps)
     
     # Update global retry configuration if specified
     global MAX_RETRIES
@@ -985,9 +988,6 @@ def main():
                 logger.error(f"Error processing entity {entity_id}: {e}")
                 with stats_lock:
                     global_stats['failed'] += 1
-            
-            # Small delay to avoid overwhelming server
-            time.sleep(0.1)
     
     # Final upload
     if args.upload and not shutdown_requested:
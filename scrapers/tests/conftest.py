@@ -0,0 +1,51 @@
+"""
+Shared fixtures for the scraper tests
+Run from scrapers/: python -m pytest -q tests
+"""
+
+import importlib
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+
+class FakeClock:
+    """Stand-in for time.time / time.monotonic: returns now, then moves it on by tick"""
+
+    def __init__(self, now: float = 1000.0, tick: float = 0.0):
+        self.now = now
+        self.tick = tick
+
+    def __call__(self) -> float:
+        now = self.now
+        self.now += self.tick
+        return now
+
+
+@pytest.fixture
+def fake_clock():
+    return FakeClock()
+
+
+@pytest.fixture(scope="session")
+def step3(tmp_path_factory):
+    """step3_concurrent, imported (and run) inside a scratch directory
+
+    The module creates campaign_finance_data/ in the working directory on import
+    and processors write their R wrappers there, so keep it out of the checkout.
+    """
+    cwd = os.getcwd()
+    os.chdir(tmp_path_factory.mktemp("run"))
+    try:
+        yield importlib.import_module("step3_concurrent")
+    finally:
+        os.chdir(cwd)
+
+
+@pytest.fixture
+def processor(step3):
+    return step3.PDFDonationProcessor(0, 'python', step3.RunSettings())
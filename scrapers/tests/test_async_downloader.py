@@ -0,0 +1,62 @@
+import asyncio
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+httpx = pytest.importorskip("httpx")
+
+from async_downloader import AsyncDownloader
+
+
+class ThreadProcessor:
+    """Processor stand-in recording which thread called it"""
+
+    def __init__(self, calls):
+        self.calls = calls
+
+    def finish_download(self, item, pdf_path):
+        self.calls.append((self, threading.current_thread().name))
+
+
+def run_in_downloader(downloader, coroutine_factory):
+    with ThreadPoolExecutor(max_workers=4, thread_name_prefix="async-download") as executor:
+        downloader.executor = executor
+        return asyncio.run(coroutine_factory())
+
+
+def test_stream_to_file_writes_off_the_event_loop(tmp_path):
+    downloader = AsyncDownloader(concurrency=4, per_host=4, temp_dir=tmp_path)
+    body = b'%PDF' * 50000
+    response = httpx.Response(200, headers={'Content-Length': str(len(body))}, content=body)
+    dest = tmp_path / "a.pdf"
+
+    sha256 = run_in_downloader(downloader, lambda: downloader.stream_to_file(response, dest))
+
+    assert sha256 == hashlib.sha256(body).hexdigest()
+    assert dest.read_bytes() == body
+    assert not dest.with_suffix('.part').exists()
+
+
+def test_executor_threads_get_their_own_processor(tmp_path):
+    calls, processors = [], threading.local()
+
+    def processor_factory():
+        if not hasattr(processors, 'processor'):
+            processors.processor = ThreadProcessor(calls)
+        return processors.processor
+
+    downloader = AsyncDownloader(concurrency=4, per_host=4, temp_dir=tmp_path)
+    downloader.processor_factory = processor_factory
+
+    async def finish_many():
+        await asyncio.gather(*(downloader._in_executor('finish_download', {}, None) for _ in range(20)))
+
+    run_in_downloader(downloader, finish_many)
+
+    assert all(name.startswith("async-download") for _, name in calls)
+    by_thread = {}
+    for processor, name in calls:
+        assert by_thread.setdefault(name, processor) is processor
+    assert len({id(processor) for processor, _ in calls}) == len(by_thread)
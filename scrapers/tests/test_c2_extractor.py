@@ -0,0 +1,139 @@
+import c2_extractor
+
+COVER = "\n".join([
+    "Campaign Finance Report",
+    "Friends of Jane Doe",
+    "",
+    "Treasurer: Bob Smith",
+    "1 Main St, Phoenix AZ 85001",
+    "Phone: 602-555-0100",
+    "Email: jane@example.com",
+    "Q1 Report",
+    "",
+    "Election Cycle: 2024",
+    "Date Filed: 4/15/2024",
+    "Reporting Period: 1/1/2024 - 3/31/2024",
+])
+
+C2_PAGE = "\n".join([
+    "Schedule C2",
+    "Name:  Alice Jones  01/02/2024  $100.00  $250.00",
+    "Address:  12 Elm St, Tempe AZ  Individual  Cash",
+    "Occupation:  Teacher",
+    "Memo:  should be skipped",
+    "",
+    "Name:  Bob Brown  01/05/2024  $50.00  $50.00",
+    "Address:  9 Oak Ave, Mesa AZ  Individual  Check",
+    "Total of Individual Contributions  $150.00",
+])
+
+NO_ACTIVITY_COVER = "\n".join([
+    "Campaign Finance Report",
+    "Friends of Jane Doe",
+    "Treasurer: Bob Smith",
+    "1 Main St, Phoenix AZ 85001",
+    "Q1 Report",
+    "Election Cycle: 2024",
+    "Date Filed: 4/15/2024",
+    "Reporting Period: 1/1/2024 - 3/31/2024",
+    "NO ACTIVITY THIS PERIOD",
+])
+
+
+def test_parse_c2_page_reads_each_record():
+    rows = c2_extractor.parse_c2_page(C2_PAGE.split("\n"), 3)
+
+    assert [row['Donor_Name'] for row in rows] == ['Alice Jones', 'Bob Brown']
+    alice, bob = rows
+    assert alice == {
+        'PageNum': 3,
+        'PageType': 'Schedule C2',
+        'Donor_Name': 'Alice Jones',
+        'Donor_Addr': '12 Elm St, Tempe AZ',
+        'Donor_Occupation': 'Teacher',
+        'Donation_Date': '01/02/2024',
+        'Donation_Amt': '$100.00',
+        'Donation_Type': 'Cash',
+        'CycleToDate_Amt': '$250.00',
+    }
+    # The totals line is filtered out, so Bob's record has no occupation line
+    assert bob['Donor_Occupation'] == 'NO INFO'
+    assert bob['Donation_Type'] == 'Check'
+
+
+def test_extract_from_pages_merges_cover_metadata():
+    rows = c2_extractor.extract_from_pages([COVER, "Summary page", C2_PAGE])
+
+    assert len(rows) == 2
+    assert rows[0]['OrgNm'] == 'Friends of Jane Doe'
+    assert rows[0]['Rpt_Name'] == 'Q1 Report'
+    assert rows[0]['Rpt_Cycle'] == '2024'
+    assert rows[0]['PageNum'] == 3
+    assert rows[1]['Donor_Name'] == 'Bob Brown'
+
+
+def test_extract_from_pages_without_donations_keeps_metadata_row():
+    rows = c2_extractor.extract_from_pages([COVER])
+
+    assert len(rows) == 1
+    assert 'Donor_Name' not in rows[0]
+    assert rows[0]['OrgTreasurer'] == 'Bob Smith'
+
+
+def test_no_activity_report_returns_cover_metadata_only():
+    rows = c2_extractor.extract_from_pages([NO_ACTIVITY_COVER, C2_PAGE])
+
+    assert len(rows) == 1
+    assert rows[0]['Rpt_Name'] == 'Q1 Report'
+    assert rows[0]['OrgAdr'] == '1 Main St, Phoenix AZ 85001'
+    assert 'Donor_Name' not in rows[0]
+
+
+def test_prefilter_extracts_only_relevant_page_runs(monkeypatch):
+    filler = "Schedule A\nLoans received"
+    raw_pages = [COVER, filler, C2_PAGE, C2_PAGE, filler]
+    layout_calls = []
+
+    def pdf_to_pages(pdf, timeout=120, first=None, last=None, mode='-layout'):
+        if mode == '-raw':
+            return raw_pages
+        layout_calls.append((first, last))
+        return raw_pages[first - 1:last]
+
+    monkeypatch.setattr(c2_extractor, 'pdf_to_pages', pdf_to_pages)
+
+    pages, prefiltered = c2_extractor.pdf_to_pages_prefiltered('report.pdf')
+
+    assert prefiltered
+    assert layout_calls == [(1, 1), (3, 4)]
+    # Skipped pages stay in place, empty, so page numbers match a full extraction
+    assert pages == [COVER, '', C2_PAGE, C2_PAGE, '']
+
+
+def test_no_activity_rows_reads_only_the_first_pages(monkeypatch):
+    calls = []
+
+    def pdf_to_pages(pdf, timeout=120, first=None, last=None):
+        calls.append((first, last))
+        return [NO_ACTIVITY_COVER, C2_PAGE]
+
+    monkeypatch.setattr(c2_extractor, 'pdf_to_pages', pdf_to_pages)
+
+    rows = c2_extractor.no_activity_rows(b'%PDF')
+    assert calls == [(1, 2)]
+    assert rows == c2_extractor.extract_from_pages([NO_ACTIVITY_COVER, C2_PAGE])
+
+
+def test_no_activity_rows_is_none_for_regular_reports(monkeypatch):
+    monkeypatch.setattr(c2_extractor, 'pdf_to_pages', lambda *args, **kwargs: [COVER, C2_PAGE])
+
+    assert c2_extractor.no_activity_rows(b'%PDF') is None
+
+
+def test_no_activity_rows_is_none_when_pdftotext_fails(monkeypatch):
+    def pdf_to_pages(*args, **kwargs):
+        raise c2_extractor.ExtractionError("pdftotext failed")
+
+    monkeypatch.setattr(c2_extractor, 'pdf_to_pages', pdf_to_pages)
+
+    assert c2_extractor.no_activity_rows(b'%PDF') is None
@@ -0,0 +1,91 @@
+import time
+
+import pytest
+import requests
+
+from lease_claimer import LeaseClaimer
+
+
+class FakeResponse:
+    def __init__(self, body):
+        self.body = body
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return self.body
+
+
+@pytest.fixture
+def calls():
+    return []
+
+
+def make_claimer(monkeypatch, calls, lease_seconds=900, fail=False):
+    def post(self, url, headers, json, timeout):
+        calls.append((url.rsplit('/', 1)[1], json))
+        if fail:
+            raise requests.exceptions.ConnectionError("down")
+        return FakeResponse([{'pdf_id': 1}, {'pdf_id': 2}] if url.endswith('/claim_report_pdfs') else 2)
+
+    monkeypatch.setattr(requests.Session, 'post', post)
+    return LeaseClaimer('http://supabase.test', 'key', 'node-a', lease_seconds, entity_id=7)
+
+
+def test_claim_leases_a_batch_to_this_node(monkeypatch, calls):
+    claimer = make_claimer(monkeypatch, calls)
+
+    assert claimer.claim(50) == [{'pdf_id': 1}, {'pdf_id': 2}]
+    assert calls == [('claim_report_pdfs', {'p_worker_id': 'node-a', 'p_limit': 50,
+                                            'p_lease_seconds': 900, 'p_entity_id': 7,
+                                            'p_skip_pdf_ids': None, 'p_pdf_ids': None})]
+    claimer.close()
+
+
+def test_retries_are_claimed_by_id_even_after_failing_here(monkeypatch, calls):
+    claimer = make_claimer(monkeypatch, calls)
+    claimer.mark_failed(1)
+
+    claimer.claim(2, [1, 2])
+
+    assert calls[0][1]['p_pdf_ids'] == [1, 2]
+    assert calls[0][1]['p_skip_pdf_ids'] is None
+    claimer.close()
+
+
+def test_failed_pdfs_are_released_and_not_claimed_again(monkeypatch, calls):
+    claimer = make_claimer(monkeypatch, calls)
+    claimer.mark_failed(2)
+    claimer.mark_failed(1)
+
+    assert claimer.release_failed() == 2
+    assert claimer.release_failed() == 0  # Nothing new to release
+    claimer.claim(50)
+
+    assert calls[0] == ('release_report_pdfs', {'p_worker_id': 'node-a', 'p_pdf_ids': [1, 2]})
+    assert len(calls) == 2
+    assert calls[1][1]['p_skip_pdf_ids'] == [1, 2]
+    claimer.close()
+
+
+def test_heartbeat_renews_the_leases(monkeypatch, calls):
+    claimer = make_claimer(monkeypatch, calls, lease_seconds=3)
+
+    time.sleep(1.3)
+    assert ('renew_report_pdf_leases', {'p_worker_id': 'node-a', 'p_lease_seconds': 3}) in calls
+    claimer.close()
+
+
+def test_close_releases_what_is_left(monkeypatch, calls):
+    claimer = make_claimer(monkeypatch, calls)
+
+    assert claimer.close() == 2
+    assert calls == [('release_report_pdfs', {'p_worker_id': 'node-a'})]
+    assert claimer.stopped
+
+
+def test_release_failure_leaves_the_leases_to_expire(monkeypatch, calls):
+    claimer = make_claimer(monkeypatch, calls, fail=True)
+
+    assert claimer.close() == 0
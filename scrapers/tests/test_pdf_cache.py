@@ -0,0 +1,82 @@
+import pytest
+
+import pdf_cache
+from pdf_cache import PDFCache
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch, fake_clock):
+    fake_clock.tick = 1  # Every access is later than the one before
+    monkeypatch.setattr(pdf_cache.time, 'time', fake_clock)
+    cache = PDFCache(tmp_path / "pdf_cache", max_bytes=250)
+    yield cache
+    cache.close()
+
+
+@pytest.fixture
+def download(tmp_path):
+    """Write a downloaded PDF to disk, as the downloaders do before storing it"""
+    def download(name, content):
+        path = tmp_path / f"{name}.pdf"
+        path.write_bytes(content)
+        return path
+    return download
+
+
+def test_store_and_lookup(cache, download):
+    stored = cache.store('http://host/a.pdf', download('a', b'a' * 100), etag='"v1"')
+
+    entry = cache.lookup('http://host/a.pdf')
+    assert entry['sha256'] == stored['sha256']
+    assert entry['path'].read_bytes() == b'a' * 100
+    assert entry['etag'] == '"v1"'
+    assert cache.lookup('http://host/missing.pdf') is None
+
+
+def test_pdf_bytes_are_stored_like_a_download(cache, download):
+    stored = cache.store('http://host/a.pdf', b'a' * 100)
+
+    assert stored['sha256'] == cache.store('http://host/copy-of-a.pdf', download('a', b'a' * 100))['sha256']
+    assert cache.lookup('http://host/a.pdf')['path'].read_bytes() == b'a' * 100
+    assert cache.total_bytes() == 100
+
+
+def test_identical_pdfs_are_stored_once(cache, download):
+    cache.store('http://host/a.pdf', download('a', b'a' * 100))
+    cache.store('http://host/copy-of-a.pdf', download('copy-of-a', b'a' * 100))
+
+    assert cache.total_bytes() == 100
+    assert cache.lookup('http://host/a.pdf')['path'] == cache.lookup('http://host/copy-of-a.pdf')['path']
+
+
+def test_least_recently_used_pdf_is_evicted(cache, download):
+    cache.store('http://host/a.pdf', download('a', b'a' * 100))
+    cache.store('http://host/b.pdf', download('b', b'b' * 100))
+    cache.lookup('http://host/a.pdf')  # b is now the least recently used
+
+    cache.store('http://host/c.pdf', download('c', b'c' * 100))
+
+    assert cache.total_bytes() == 200
+    assert cache.lookup('http://host/b.pdf') is None
+    assert cache.lookup('http://host/a.pdf') is not None
+    assert cache.lookup('http://host/c.pdf') is not None
+
+
+def test_eviction_keeps_links_held_elsewhere(cache, download, tmp_path):
+    entry = cache.store('http://host/a.pdf', download('a', b'a' * 100))
+    in_use = tmp_path / "in_use.pdf"
+    pdf_cache.link_or_copy(entry['path'], in_use)
+
+    cache.store('http://host/b.pdf', download('b', b'b' * 100))
+    cache.store('http://host/c.pdf', download('c', b'c' * 100))
+
+    assert cache.lookup('http://host/a.pdf') is None
+    assert in_use.read_bytes() == b'a' * 100
+
+
+def test_objects_removed_behind_the_cache_are_misses(cache, download):
+    entry = cache.store('http://host/a.pdf', download('a', b'a' * 100))
+    entry['path'].unlink()
+
+    assert cache.lookup('http://host/a.pdf') is None
+    assert cache.total_bytes() == 0
@@ -0,0 +1,119 @@
+import os
+import sys
+
+import pytest
+
+from r_worker_pool import RWorkerPool
+
+# Speaks the worker loop's line protocol: PDFs named crash* kill the process,
+# hang* never answer, anything else gets a CSV naming the process that wrote it
+FAKE_RSCRIPT = '''#!{python}
+import os, sys, time
+from pathlib import Path
+
+out = sys.stdout
+out.write("@@READY\\tFALSE\\n")
+out.flush()
+while True:
+    line = sys.stdin.buffer.readline().decode()
+    if not line:
+        break
+    fields = line.rstrip("\\n").split("\\t")
+    if fields[0] == "@@RAW":
+        pdf = sys.stdin.buffer.read(int(fields[1]))
+        out.write("@@ROWS\\nDonor_Name,Bytes\\n" + fields[2] + "," + str(len(pdf)) + "\\n")
+    else:
+        name = Path(fields[0]).name
+        if name.startswith("crash"):
+            sys.stderr.write("Error in scrape_pdf_to_csv: cannot open file\\n")
+            sys.exit(1)
+        if name.startswith("hang"):
+            time.sleep(60)
+        Path(fields[1]).write_text("pid\\n" + str(os.getpid()) + "\\n")
+    out.write("@@DONE\\tOK\\t1\\n")
+    out.flush()
+'''
+
+
+# R that dies while sourcing the setup script, before the worker loop starts
+BROKEN_RSCRIPT = '''#!{python}
+import sys
+sys.stderr.write("Error in library(pdftools) : there is no package called 'pdftools'\\n")
+sys.exit(1)
+'''
+
+
+@pytest.fixture
+def install_rscript(tmp_path, monkeypatch):
+    """Put a fake Rscript built from one of the scripts above first on PATH"""
+    def install_rscript(script):
+        bin_dir = tmp_path / "bin"
+        bin_dir.mkdir(exist_ok=True)
+        rscript = bin_dir / "Rscript"
+        rscript.write_text(script.format(python=sys.executable))
+        rscript.chmod(0o755)
+        monkeypatch.setenv('PATH', f"{bin_dir}{os.pathsep}{os.environ['PATH']}")
+    return install_rscript
+
+
+@pytest.fixture
+def pool(tmp_path, install_rscript):
+    install_rscript(FAKE_RSCRIPT)
+    pool = RWorkerPool(1, tmp_path, "# setup\n")
+    yield pool
+    pool.close()
+
+
+def scrape(pool, tmp_path, name, timeout=10):
+    output_csv = tmp_path / f"{name}.csv"
+    status = pool.run(tmp_path / f"{name}.pdf", output_csv, timeout)
+    return status, output_csv.read_text().split()[1] if output_csv.exists() else None
+
+
+def test_one_r_process_serves_many_pdfs(pool, tmp_path):
+    first = scrape(pool, tmp_path, "a")
+    second = scrape(pool, tmp_path, "b")
+
+    assert first[0] == second[0] == 'ok'
+    assert first[1] == second[1]
+
+
+def test_crashed_worker_restarts_for_the_next_pdf(pool, tmp_path):
+    _, pid = scrape(pool, tmp_path, "a")
+
+    assert scrape(pool, tmp_path, "crash") == ('error', None)
+    status, new_pid = scrape(pool, tmp_path, "b")
+    assert status == 'ok'
+    assert new_pid != pid
+
+
+def test_crashed_worker_reports_what_r_printed(pool, tmp_path, capsys):
+    scrape(pool, tmp_path, "crash")
+
+    assert "Error in scrape_pdf_to_csv: cannot open file" in capsys.readouterr().out
+
+
+def test_hung_worker_is_killed_and_restarted(pool, tmp_path):
+    _, pid = scrape(pool, tmp_path, "a")
+
+    assert scrape(pool, tmp_path, "hang", timeout=0.5) == ('timeout', None)
+    status, new_pid = scrape(pool, tmp_path, "b")
+    assert status == 'ok'
+    assert new_pid != pid
+
+
+def test_pdf_bytes_go_in_on_stdin_and_rows_come_back_on_stdout(pool, tmp_path):
+    status, csv_text = pool.run_raw(b'%PDF-1.4 fake', tmp_path / "a.pdf", 10)
+
+    assert status == 'ok'
+    assert csv_text == "Donor_Name,Bytes\n" + str(tmp_path / "a.pdf") + ",13"
+    assert list(tmp_path.glob("*.csv")) == []
+
+
+def test_pool_reports_when_no_worker_can_start(tmp_path, install_rscript, capsys):
+    install_rscript(BROKEN_RSCRIPT)
+    pool = RWorkerPool(2, tmp_path, "# setup\n")
+
+    assert pool.start() == 0
+    assert "there is no package called 'pdftools'" in capsys.readouterr().out
+    pool.close()
@@ -0,0 +1,83 @@
+import pytest
+
+import rate_limiter
+from rate_limiter import MIN_RPS, TokenBucket, parse_retry_after
+
+
+@pytest.fixture
+def clock(monkeypatch, fake_clock):
+    monkeypatch.setattr(rate_limiter.time, 'monotonic', fake_clock)
+    return fake_clock
+
+
+def test_reserve_spends_the_burst_then_queues(clock):
+    bucket = TokenBucket(rate=2.0)
+
+    assert bucket.reserve() == 0
+    assert bucket.reserve() == 0
+    # Later callers wait their turn in arrival order
+    assert bucket.reserve() == pytest.approx(0.5)
+    assert bucket.reserve() == pytest.approx(1.0)
+
+
+def test_reserve_refills_over_time(clock):
+    bucket = TokenBucket(rate=2.0)
+    bucket.reserve()
+    bucket.reserve()
+
+    clock.now += 0.5
+    assert bucket.reserve() == 0
+    # Never saves up more than the burst
+    clock.now += 60
+    assert [bucket.reserve() for _ in range(3)] == [0, 0, pytest.approx(0.5)]
+
+
+def test_slow_down_halves_the_rate_once_per_interval(clock):
+    bucket = TokenBucket(rate=4.0)
+
+    bucket.record_response(429)
+    bucket.record_response(503)  # Same burst of pushback
+    assert bucket.rate == 2.0
+
+    clock.now += 1
+    bucket.record_response(429)
+    assert bucket.rate == 1.0
+
+
+def test_slow_down_stops_at_the_floor(clock):
+    bucket = TokenBucket(rate=MIN_RPS * 1.5)
+
+    for _ in range(5):
+        clock.now += 10
+        bucket.slow_down()
+    assert bucket.rate == MIN_RPS
+
+
+def test_speed_up_recovers_additively(clock):
+    bucket = TokenBucket(rate=10.0)
+    bucket.slow_down()
+
+    bucket.record_response(200)
+    assert bucket.rate == pytest.approx(5.0 + 10.0 * rate_limiter.INCREASE_FRACTION)
+    for _ in range(100):
+        bucket.record_response(200)
+    assert bucket.rate == 10.0
+
+    # Server errors other than 503 leave the rate alone
+    clock.now += 1
+    bucket.slow_down()
+    bucket.record_response(500)
+    assert bucket.rate == 5.0
+
+
+def test_retry_after_pauses_the_bucket(clock):
+    bucket = TokenBucket(rate=10.0)
+
+    bucket.record_response(429, retry_after='7')
+    assert bucket.reserve() == pytest.approx(7.0)
+
+
+def test_parse_retry_after():
+    assert parse_retry_after('12') == 12.0
+    assert parse_retry_after(None) is None
+    assert parse_retry_after('soon') is None
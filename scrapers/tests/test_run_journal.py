@@ -0,0 +1,129 @@
+from pathlib import Path
+
+import pytest
+
+import run_journal
+from run_journal import RunJournal, stage_reached
+
+
+@pytest.fixture
+def clock(monkeypatch, fake_clock):
+    monkeypatch.setattr(run_journal.time, 'time', fake_clock)
+    return fake_clock
+
+
+@pytest.fixture
+def journal(tmp_path, clock):
+    journal = RunJournal(tmp_path / "journal.sqlite3", "r-1")
+    yield journal
+    journal.close()
+
+
+def test_stages_keep_earlier_fields(journal):
+    journal.record(1, 'downloaded', pdf_path=Path('a.pdf'))
+    journal.record(1, 'parsed', csv_path=Path('a.csv'))
+    journal.record(1, 'report_created', report_id=5)
+
+    state = journal.state(1)
+    assert state['stage'] == 'report_created'
+    assert state['pdf_path'] == Path('a.pdf')
+    assert state['csv_path'] == Path('a.csv')
+    assert state['report_id'] == 5
+    assert stage_reached(state, 'parsed')
+    assert not stage_reached(state, 'marked')
+
+
+def test_downloaded_starts_over(journal):
+    journal.record(1, 'parsed', pdf_path=Path('a.pdf'), csv_path=Path('a.csv'))
+    journal.record(1, 'downloaded', pdf_path=Path('b.pdf'))
+
+    state = journal.state(1)
+    assert state['pdf_path'] == Path('b.pdf')
+    assert state['csv_path'] is None
+
+
+def test_other_parsers_entries_are_ignored(tmp_path, journal):
+    journal.record(1, 'parsed', csv_path=Path('a.csv'))
+    journal.close()
+
+    newer = RunJournal(tmp_path / "journal.sqlite3", "r-2")
+    assert newer.state(1) is None
+    assert newer.stage_counts() == {}
+    newer.close()
+
+
+def test_stage_counts_and_transitions(journal):
+    journal.record_many([1, 2, 3], 'downloaded')
+    journal.record_many([1, 2], 'parsed')
+    journal.record(1, 'marked')
+
+    assert journal.stage_counts() == {'downloaded': 1, 'parsed': 1, 'marked': 1}
+    transitions = journal.db.execute(
+        "SELECT stage FROM transitions WHERE pdf_id = 1 ORDER BY rowid"
+    ).fetchall()
+    assert [stage for stage, in transitions] == ['downloaded', 'parsed', 'marked']
+
+
+def test_unknown_stage_is_rejected(journal):
+    with pytest.raises(ValueError):
+        journal.record(1, 'uploaded')
+
+
+def test_dead_letter_backoff_doubles(journal, clock):
+    assert journal.dead_letter(1, 'download', 'Download failed', max_retries=3, base_seconds=60) == 1060
+    assert journal.dead_letter(1, 'download', 'Download failed', max_retries=3, base_seconds=60) == 1120
+    assert journal.dead_letter(1, 'download', 'Download failed', max_retries=3, base_seconds=60) == 1240
+    # Out of retries: kept for the record but never due again
+    assert journal.dead_letter(1, 'parse', 'R scraper failed', max_retries=3, base_seconds=60) is None
+    assert journal.next_retry_at() is None
+    assert journal.dead_letter_counts() == {'parse': 1}
+
+
+def test_take_due_retries_earliest_first(journal, clock):
+    journal.dead_letter(1, 'download', 'Download failed', 3, 120)
+    journal.dead_letter(2, 'parse', 'R scraper failed', 3, 60)
+    journal.dead_letter(3, 'upload', 'Failed to upload', 3, 600)
+
+    assert journal.take_due_retries(10) == []
+    assert journal.next_retry_at() == 1060
+
+    clock.now = 1200
+    assert journal.take_due_retries(10) == [2, 1]
+    # Taken retries are not handed out twice
+    assert journal.take_due_retries(10) == []
+    assert journal.next_retry_at() == 1600
+
+
+def test_take_due_retries_respects_limit(journal, clock):
+    for pdf_id in (1, 2, 3):
+        journal.dead_letter(pdf_id, 'download', 'Download failed', 3, 60)
+
+    clock.now = 2000
+    assert len(journal.take_due_retries(2)) == 2
+    assert len(journal.take_due_retries(2)) == 1
+
+
+def test_resolved_dead_letters_are_forgotten(journal, clock):
+    journal.dead_letter(1, 'download', 'Download failed', 3, 60)
+    journal.resolve_dead_letter(1)
+
+    clock.now = 2000
+    assert journal.take_due_retries(10) == []
+    assert journal.dead_letter_counts() == {}
+
+
+def test_released_dead_letters_wait_for_another_run(tmp_path, journal, clock):
+    journal.dead_letter(1, 'download', 'Download failed', 3, 60)
+    journal.dead_letter(2, 'download', 'Download failed', 3, 60)
+
+    clock.now = 2000
+    assert journal.take_due_retries(10) == [1, 2]
+    journal.release_dead_letters([2])
+    assert journal.take_due_retries(10) == []
+    assert journal.next_retry_at() is None
+    journal.close()
+
+    # A new run (and one that died with retries taken) offers them again
+    next_run = RunJournal(tmp_path / "journal.sqlite3", "r-1")
+    assert next_run.take_due_retries(10) == [1, 2]
+    next_run.close()
@@ -0,0 +1,89 @@
+import threading
+import time
+
+from staged_pipeline import LongestFirstQueue, StagedPipeline
+
+
+class FakeProcessor:
+    """Stage methods StagedPipeline calls, recording what ran where"""
+
+    def __init__(self, log, upload_gate=None):
+        self.log = log
+        self.upload_gate = upload_gate
+
+    def new_result(self, pdf_record):
+        return {'pdf_id': pdf_record['pdf_id'], 'success': False, 'error': None}
+
+    def download_stage(self, pdf_record):
+        self.log.append(('download', pdf_record['pdf_id']))
+        return {'pdf_record': pdf_record, 'result': self.new_result(pdf_record),
+                'pdf_path': f"{pdf_record['pdf_id']}.pdf", 'csv_path': None,
+                'page_count': pdf_record.get('pages')}
+
+    def parse_stage(self, item):
+        self.log.append((threading.current_thread().name.split('-')[0], item['pdf_record']['pdf_id']))
+        item['csv_path'] = f"{item['pdf_record']['pdf_id']}.csv"
+        return item
+
+    @staticmethod
+    def is_parsed(item):
+        return bool(item['csv_path'])
+
+    def upload_stage(self, item):
+        if self.upload_gate is not None:
+            self.upload_gate.wait()
+        item['result']['success'] = True
+        return item['result']
+
+    def upload_window(self, items):
+        for item in items:
+            self.upload_stage(item)
+
+
+def run_pipeline(pipeline, records):
+    results = []
+    consumer = threading.Thread(target=lambda: results.extend(pipeline.run(iter(records))), daemon=True)
+    consumer.start()
+    return consumer, results
+
+
+def test_full_queues_hold_back_the_downloads():
+    log, gate = [], threading.Event()
+    processor = FakeProcessor(log, gate)
+    pipeline = StagedPipeline(download_workers=1, parse_workers=1, upload_workers=1, queue_size=1,
+                              processor_factory=lambda: processor)
+
+    consumer, results = run_pipeline(pipeline, [{'pdf_id': i} for i in range(20)])
+    time.sleep(0.3)
+    # One item per worker and per queue slot between download and the stuck upload
+    assert len([entry for entry in log if entry[0] == 'download']) <= 5
+
+    gate.set()
+    consumer.join(10)
+    assert sorted(result['pdf_id'] for result in results) == list(range(20))
+    assert all(result['success'] for result in results)
+
+
+def test_longest_first_queue_hands_out_big_pdfs_first():
+    queue = LongestFirstQueue()
+    for pages in (5, None, 50, 20):
+        queue.put({'page_count': pages})
+    queue.put(None)
+
+    assert [queue.get()['page_count'] for _ in range(4)] == [50, 20, 5, None]
+    assert queue.get() is None
+
+
+def test_big_pdfs_get_their_own_parse_lane():
+    log = []
+    processor = FakeProcessor(log)
+    pipeline = StagedPipeline(download_workers=2, parse_workers=2, upload_workers=1, queue_size=4,
+                              processor_factory=lambda: processor, big_parse_workers=1, big_pdf_pages=100)
+
+    records = [{'pdf_id': i, 'pages': pages} for i, pages in enumerate([3, 250, 40, 100, 99])]
+    consumer, results = run_pipeline(pipeline, records)
+    consumer.join(10)
+
+    lanes = {pdf_id: stage for stage, pdf_id in log if stage != 'download'}
+    assert lanes == {0: 'parse', 1: 'parse_big', 2: 'parse', 3: 'parse_big', 4: 'parse'}
+    assert len(results) == 5
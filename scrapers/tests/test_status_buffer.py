@@ -0,0 +1,142 @@
+import pytest
+
+from status_buffer import StatusBuffer
+
+
+@pytest.fixture
+def patches(monkeypatch):
+    """PATCHes sent by every StatusBuffer, as (pdf_ids, update) pairs"""
+    sent = []
+
+    def patch(self, pdf_ids, update):
+        sent.append((list(pdf_ids), dict(update)))
+        return True
+
+    monkeypatch.setattr(StatusBuffer, '_patch', patch)
+    return sent
+
+
+@pytest.fixture
+def buffer(patches):
+    buffer = StatusBuffer('http://supabase.test', 'key', flush_items=1000, flush_seconds=3600)
+    yield buffer
+    buffer.close()
+
+
+def pdf_id_filter(pdf_ids):
+    return f"in.({','.join(str(pdf_id) for pdf_id in pdf_ids)})"
+
+
+def test_same_updates_share_one_patch(buffer, patches):
+    for pdf_id in (1, 2, 3):
+        buffer.mark_failed(pdf_id, 'R scraper failed')
+    buffer.mark_failed(4, 'Download failed')
+    buffer.mark_skipped(5, 'Unfiled report')
+
+    buffer.flush()
+
+    sent = {tuple(pdf_ids): update for pdf_ids, update in patches}
+    assert len(patches) == 3
+    assert sent[(1, 2, 3)] == {'error_message': 'R scraper failed'}
+    assert sent[(4,)] == {'error_message': 'Download failed'}
+    assert sent[(5,)]['csv_converted'] is True
+    assert sent[(5,)]['error_message'] == 'Unfiled report'
+
+
+def test_converted_pdfs_share_the_conversion_date(buffer, patches):
+    buffer.mark_converted(1)
+    buffer.mark_converted(2)
+
+    buffer.flush()
+
+    assert len(patches) == 1
+    pdf_ids, update = patches[0]
+    assert pdf_ids == [1, 2]
+    assert update['csv_converted'] is True and update['error_message'] is None
+    assert 'conversion_date' in update
+
+
+def test_large_groups_are_split(buffer, patches):
+    pdf_ids = list(range(StatusBuffer.MAX_IDS_PER_PATCH + 10))
+    for pdf_id in pdf_ids:
+        buffer.mark_failed(pdf_id, 'R scraper failed')
+
+    buffer.flush()
+
+    assert [len(ids) for ids, _ in patches] == [StatusBuffer.MAX_IDS_PER_PATCH, 10]
+
+
+def test_patch_filters_by_pdf_id_list(monkeypatch):
+    calls = []
+
+    class Response:
+        status_code = 204
+
+    def patch(url, headers, params, json, timeout):
+        calls.append((url, params, json))
+        return Response()
+
+    buffer = StatusBuffer('http://supabase.test', 'key', flush_items=1000, flush_seconds=3600)
+    monkeypatch.setattr(buffer.session, 'patch', patch)
+    buffer.mark_failed(7, 'Download failed')
+    buffer.mark_failed(9, 'Download failed')
+    buffer.close()
+
+    assert calls == [('http://supabase.test/rest/v1/cf_report_pdfs', {'pdf_id': pdf_id_filter([7, 9])},
+                      {'error_message': 'Download failed'})]
+    assert buffer.stats == {'updates': 2, 'requests': 1, 'failed': 0}
+
+
+def test_later_update_replaces_earlier(buffer, patches):
+    buffer.mark_failed(1, 'Download failed')
+    buffer.mark_converted(1)
+
+    buffer.flush()
+
+    assert len(patches) == 1
+    assert patches[0][1]['csv_converted'] is True
+
+
+def test_success_drops_stale_failures(buffer, patches):
+    buffer.mark_failed(1, 'R scraper failed')
+    buffer.mark_succeeded(1)
+    buffer.mark_failed(1, 'R scraper failed')
+
+    buffer.flush()
+
+    assert patches == []
+
+
+def test_succeeded_pdfs_are_forgotten_after_a_flush(buffer, patches):
+    buffer.mark_succeeded(1)
+    buffer.flush()
+
+    assert buffer.succeeded == set()
+    buffer.mark_failed(1, 'Download failed')  # A later retry that failed is recorded again
+    buffer.flush()
+    assert patches == [([1], {'error_message': 'Download failed'})]
+
+
+def test_failed_patches_are_retried_on_close(monkeypatch):
+    attempts = []
+
+    def patch(self, pdf_ids, update):
+        attempts.append(list(pdf_ids))
+        return len(attempts) > 1
+
+    monkeypatch.setattr(StatusBuffer, '_patch', patch)
+    buffer = StatusBuffer('http://supabase.test', 'key', flush_items=1000, flush_seconds=3600)
+    buffer.mark_failed(1, 'Download failed')
+
+    assert buffer.close() == 0
+    assert attempts == [[1], [1]]
+
+
+def test_flushes_when_full(patches):
+    buffer = StatusBuffer('http://supabase.test', 'key', flush_items=2, flush_seconds=3600)
+    buffer.mark_failed(1, 'Download failed')
+    assert patches == []
+
+    buffer.mark_failed(2, 'Download failed')
+    assert patches == [([1, 2], {'error_message': 'Download failed'})]
+    buffer.close()
@@ -0,0 +1,336 @@
+import csv
+import subprocess
+from types import SimpleNamespace
+
+import pytest
+
+
+def donation_row(name='Alice Jones', date='01/02/2024', amount='$100.00', page='3'):
+    return {
+        'Rpt_Name': 'Q1 Report',
+        'PageNum': page,
+        'PageType': 'Schedule C2',
+        'Donor_Name': name,
+        'Donor_Addr': '12 Elm St, Tempe AZ 85281',
+        'Donor_Occupation': 'Teacher',
+        'Donation_Date': date,
+        'Donation_Amt': amount,
+        'Donation_Type': 'Cash',
+        'CycleToDate_Amt': '$250.00',
+    }
+
+
+def test_summarize_rows_totals_donations(processor):
+    rows = [
+        {'Rpt_Name': 'Q1 Report', 'PageType': 'Cover Page', 'Donor_Name': ''},
+        donation_row(),
+        donation_row('Bob Brown', amount='$50.50'),
+    ]
+
+    extracted = processor.summarize_rows(rows, entity_id=7, pdf_id=11)
+
+    assert extracted['first_row'] is rows[0]
+    assert extracted['donation_count'] == 2
+    assert extracted['total_donations'] == 150.5
+    assert extracted['page_types'] == {'Cover Page', 'Schedule C2'}
+    assert extracted['parser_name'] is None
+    assert [d['donor_name'] for d in extracted['donations']] == ['Alice Jones', 'Bob Brown']
+    assert extracted['donations'][0]['donation_date'] == '2024-01-02'
+
+
+def test_repeated_donation_lines_get_numbered_keys(processor):
+    rows = [donation_row(), donation_row('ALICE JONES'), donation_row(page='4')]
+
+    donations = processor.summarize_rows(rows, entity_id=7, pdf_id=11)['donations']
+
+    first, repeat, other_page = donations
+    # Same donor (any case), date, amount and page: occurrence 1 and 2
+    assert first['donation_key'] == processor.donation_key(11, first, 1)
+    assert repeat['donation_key'] == processor.donation_key(11, repeat, 2)
+    assert first['donation_key'] != repeat['donation_key']
+    # A different page starts its own count
+    assert other_page['donation_key'] == processor.donation_key(11, other_page, 1)
+
+
+def test_donation_keys_are_stable_across_runs(processor):
+    rows = [donation_row(), donation_row()]
+
+    first_run = processor.summarize_rows(rows, entity_id=7, pdf_id=11)['donations']
+    second_run = processor.summarize_rows(rows, entity_id=7, pdf_id=11)['donations']
+    other_pdf = processor.summarize_rows(rows, entity_id=7, pdf_id=12)['donations']
+
+    assert [d['donation_key'] for d in first_run] == [d['donation_key'] for d in second_run]
+    assert not {d['donation_key'] for d in first_run} & {d['donation_key'] for d in other_pdf}
+
+
+def test_donation_keys_need_a_pdf_id(processor):
+    donations = processor.summarize_rows([donation_row()], entity_id=7)['donations']
+
+    assert 'donation_key' not in donations[0]
+
+
+def test_rows_without_amount_or_date_are_not_donations(processor):
+    rows = [donation_row(amount='NA'), donation_row(date='')]
+
+    extracted = processor.summarize_rows(rows, entity_id=7, pdf_id=11)
+
+    assert extracted['donations'] == []
+    assert extracted['donation_count'] == 1  # The dateless row still has an amount
+
+
+def test_summarize_rows_keeps_the_parser_name(processor, step3):
+    extracted = processor.summarize_rows([], entity_id=7, pdf_id=11, parser_name=step3.NO_ACTIVITY_PARSER)
+
+    assert extracted['parser_name'] == step3.NO_ACTIVITY_PARSER
+    assert extracted['first_row'] is None
+
+
+def test_report_pdf_filters_selects_unconverted_pdfs(step3):
+    assert step3.report_pdf_filters() == {'pdf_url': 'not.is.null', 'csv_converted': 'eq.false'}
+    assert step3.report_pdf_filters(entity_id=42)['entity_id'] == 'eq.42'
+
+
+def test_report_pdf_filters_reprocess_older(step3):
+    filters = step3.report_pdf_filters(reprocess_older=True)
+
+    assert filters['csv_converted'] == 'eq.true'
+    assert filters['error_message'] == 'is.null'
+    assert filters['or'] == f"(parser_version.is.null,parser_version.lt.{step3.PARSER_VERSION})"
+    assert 'and' not in filters
+
+
+def test_report_pdf_filters_reprocess_older_by_page_type(step3):
+    filters = step3.report_pdf_filters(reprocess_older=True, page_type='Schedule C2')
+
+    assert 'or' not in filters
+    assert filters['and'] == (
+        f"(or(parser_version.is.null,parser_version.lt.{step3.PARSER_VERSION}),"
+        'or(page_types.is.null,page_types.cs.{"Schedule C2"}))'
+    )
+
+
+def test_r_setup_escapes_are_left_for_r(step3):
+    # "\\t" in the Python source must reach R as the two characters \t, not a literal tab
+    assert not {'\t', '\r', '\f'} & set(step3.R_SCRAPER_SETUP)
+    assert 'cat("STATUS\\t", pdf_id, "\\t", status, "\\n", sep = "")' in step3.R_SCRAPER_SETUP
+
+
+class Response:
+    def __init__(self, status_code, body=None):
+        self.status_code = status_code
+        self.body = body
+
+    def json(self):
+        return self.body
+
+
+def test_ingest_sends_report_donations_and_status_in_one_call(processor, step3, monkeypatch):
+    calls = []
+
+    def post(url, headers, json, timeout):
+        calls.append((url, json))
+        return Response(200, [{'pdf_id': 11, 'report_id': 99}])
+
+    monkeypatch.setattr(processor.supabase, 'post', post)
+    pdf_record = {'pdf_id': 11, 'entity_id': 7, 'report_name': 'Q1 Report'}
+    extracted = processor.summarize_rows([donation_row(), donation_row('Bob Brown')], entity_id=7, pdf_id=11)
+
+    result = processor.ingest_extracted(pdf_record, extracted, processor.new_result(pdf_record))
+
+    assert result['success'] and result['donations'] == 2
+    [(url, body)] = calls
+    assert url == f"{step3.SUPABASE_URL}/rest/v1/rpc/ingest_reports"
+    [payload] = body['p_reports']
+    assert payload['pdf_id'] == 11
+    assert payload['report']['pdf_id'] == 11 and payload['report']['entity_id'] == 7
+    assert payload['donations'] == extracted['donations']
+    assert payload['pdf_status']['parser_version'] == step3.PARSER_VERSION
+
+
+def test_failed_ingest_fails_the_pdf(processor, monkeypatch):
+    monkeypatch.setattr(processor.supabase, 'post', lambda url, headers, json, timeout: Response(500))
+    pdf_record = {'pdf_id': 11, 'entity_id': 7, 'report_name': 'Q1 Report'}
+    extracted = processor.summarize_rows([donation_row()], entity_id=7, pdf_id=11)
+
+    result = processor.ingest_extracted(pdf_record, extracted, processor.new_result(pdf_record))
+
+    assert not result['success']
+    assert result['error'] == 'Failed to ingest report'
+
+
+def test_missing_ingest_function_falls_back_to_legacy_upload(processor, monkeypatch, capsys):
+    missing = Response(404, {'code': 'PGRST202', 'message': 'Could not find the function public.ingest_reports'})
+    monkeypatch.setattr(processor.supabase, 'post', lambda url, headers, json, timeout: missing)
+    legacy = []
+    monkeypatch.setattr(processor, 'ingest_extracted_legacy',
+                        lambda pdf_record, extracted, result: legacy.append(pdf_record['pdf_id']) or result)
+    pdf_record = {'pdf_id': 11, 'entity_id': 7, 'report_name': 'Q1 Report'}
+    extracted = processor.summarize_rows([donation_row()], entity_id=7, pdf_id=11)
+
+    processor.ingest_extracted(pdf_record, extracted, processor.new_result(pdf_record))
+
+    assert legacy == [11]
+    assert not processor.settings.use_ingest_rpc
+    assert 'falling back to legacy upload' in capsys.readouterr().out
+
+
+def test_unbuffered_failures_write_the_buffered_fields(step3, monkeypatch):
+    buffered, unbuffered = step3.RunSettings(), step3.RunSettings()
+    buffered.status_buffer = step3.StatusBuffer('http://supabase.test', 'key', flush_items=1000, flush_seconds=3600)
+    flushed, sent = [], []
+    monkeypatch.setattr(buffered.status_buffer, '_patch', lambda pdf_ids, update: flushed.append(update) or True)
+    monkeypatch.setattr(step3.requests, 'patch', lambda url, headers, params, json, timeout: sent.append((params, json)))
+
+    step3.mark_pdf_failed(11, 'Download failed', buffered)
+    step3.mark_pdf_failed(11, 'Download failed', unbuffered)
+    buffered.status_buffer.close()
+
+    assert sent == [({'pdf_id': 'eq.11'}, flushed[0])]
+
+
+def test_legacy_retry_drops_the_report_a_failed_attempt_left(processor, monkeypatch):
+    report_ids = iter([98, 99])
+    uploads = iter([None, 1])  # The first attempt fails after creating its report
+    cleared = []
+    monkeypatch.setattr(processor, 'create_report_record', lambda *args: next(report_ids))
+    monkeypatch.setattr(processor, 'upload_donations_to_supabase', lambda donations, report_id: next(uploads))
+    monkeypatch.setattr(processor, 'clear_previous_reports', lambda pdf_id, keep: cleared.append((pdf_id, keep)))
+    monkeypatch.setattr(processor.supabase, 'patch', lambda *args, **kwargs: Response(204))
+    pdf_record = {'pdf_id': 11, 'entity_id': 7, 'report_name': 'Q1 Report', 'csv_converted': False}
+    extracted = processor.summarize_rows([donation_row()], entity_id=7, pdf_id=11)
+
+    first = processor.ingest_extracted_legacy(pdf_record, extracted, processor.new_result(pdf_record))
+    second = processor.ingest_extracted_legacy(pdf_record, extracted, processor.new_result(pdf_record))
+
+    assert not first['success'] and second['success']
+    assert cleared == [(11, 99)]
+
+
+class FakeClaimer:
+    """LeaseClaimer stand-in handing out the claimable PDFs once each"""
+
+    def __init__(self, claimable):
+        self.claimable = claimable
+        self.claims = []
+
+    def claim(self, limit, pdf_ids=None):
+        self.claims.append((limit, pdf_ids))
+        pdfs = [pdf for pdf in self.claimable if pdf_ids is None or pdf['pdf_id'] in pdf_ids][:limit]
+        for pdf in pdfs:
+            self.claimable.remove(pdf)
+        return pdfs
+
+    def release_failed(self):
+        return 0
+
+
+def test_claim_mode_leases_due_retries_first(step3, monkeypatch, tmp_path):
+    settings = step3.RunSettings()
+    settings.run_journal = step3.RunJournal(tmp_path / "journal.sqlite3", "r-1")
+    settings.run_journal.dead_letter(5, 'parse', 'R scraper failed', max_retries=3, base_seconds=0)
+    settings.run_journal.dead_letter(6, 'parse', 'R scraper failed', max_retries=3, base_seconds=0)
+    claimer = settings.lease_claimer = FakeClaimer([{'pdf_id': 1}, {'pdf_id': 5}])  # 6 was converted elsewhere
+    processed = []
+    monkeypatch.setattr(step3, 'process_pdfs', lambda pdfs, args, settings: processed.append(pdfs))
+    args = SimpleNamespace(claim_batch=10, limit=0, entity=None, reprocess_older=False, page_type=None)
+
+    step3.process_claimed(claimer, args, settings)
+
+    assert claimer.claims[0] == (2, [5, 6])
+    assert [[pdf['pdf_id'] for pdf in pdfs] for pdfs in processed] == [[5, 1]]
+    assert settings.run_journal.next_retry_at() is None  # 6 is not offered again this run
+    settings.run_journal.close()
+
+
+class ChunkPool:
+    """R pool stand-in writing one donation row per Schedule C2 page it is asked for"""
+
+    def __init__(self, page_count, honour_pages=True):
+        self.page_count = page_count
+        self.honour_pages = honour_pages
+        self.page_lists = []
+        self.text_cache_paths = []
+
+    def takes_pages(self):
+        return True
+
+    def run(self, pdf_path, output_csv, timeout, text_cache_path='', page_list=''):
+        self.page_lists.append(page_list)
+        self.text_cache_paths.append(text_cache_path)
+        pages = [int(p) for p in page_list.split(',')] if self.honour_pages else range(1, self.page_count + 1)
+        with open(output_csv, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(['Rpt_Name', 'PageNum', 'Donor_Name'])
+            writer.writerows(['Q1 Report', page, f"Donor {page}"] for page in pages if page > 1)
+        return 'ok'
+
+
+@pytest.fixture
+def big_pdf(processor, step3, monkeypatch, tmp_path):
+    """A 41-page PDF: cover page, then 40 Schedule C2 pages"""
+    page_types = {1: 'Cover Page', **{page: 'Schedule C2' for page in range(2, 42)}}
+    monkeypatch.setattr(step3.c2_extractor, 'find_page_types', lambda pdf_path: (41, page_types))
+    processor.settings.split_workers = 2
+    return tmp_path / "big.pdf"
+
+
+def test_big_pdf_is_parsed_as_page_chunks_in_page_order(processor, step3, big_pdf):
+    processor.settings.r_worker_pool = ChunkPool(41)
+
+    output_csv = processor.process_pdf_with_r_split(big_pdf)
+
+    # Every chunk gets the cover page and its own run of C2 pages
+    assert processor.settings.r_worker_pool.page_lists == [
+        ','.join(map(str, [1] + list(range(2, 22)))),
+        ','.join(map(str, [1] + list(range(22, 42)))),
+    ]
+    with open(output_csv, newline='') as f:
+        rows = list(csv.DictReader(f))
+    assert [row['PageNum'] for row in rows] == [str(page) for page in range(2, 42)]
+    assert not list(step3.PROCESSED_CSV_DIR.glob("big_part*"))
+
+
+def test_chunks_share_the_text_cache(processor, step3, big_pdf, tmp_path):
+    big_pdf.write_bytes(b'%PDF-1.4 big')
+    processor.settings.text_cache = step3.TextCache(tmp_path / "text_cache")
+    pool = processor.settings.r_worker_pool = ChunkPool(41)
+
+    processor.process_pdf_with_r_split(big_pdf)
+    # No text for the whole PDF yet: each chunk caches its own pages
+    first_run = pool.text_cache_paths
+    assert len(set(first_run)) == 2
+    assert all(f"{step3.R_TEXT_VERSION}{step3.R_CHUNK_TEXT_SUFFIX}" in path for path in first_run)
+
+    full_text = processor.settings.text_cache.path_for(step3.sha256_file(big_pdf), step3.R_TEXT_VERSION)
+    full_text.parent.mkdir(parents=True)
+    full_text.write_bytes(b'')
+    pool.text_cache_paths = []
+    processor.process_pdf_with_r_split(big_pdf)
+    assert pool.text_cache_paths == [str(full_text.resolve())] * 2
+
+
+def test_chunks_that_ignore_their_pages_are_not_merged(processor, big_pdf):
+    processor.settings.r_worker_pool = ChunkPool(41, honour_pages=False)
+
+    assert processor.process_pdf_with_r_split(big_pdf) is None
+
+
+def test_in_memory_rows_come_from_pdf_bytes_without_files(processor, step3, monkeypatch):
+    runs = []
+    cover = "Campaign Finance Report\nFriends of Jane Doe\n"
+    c2_page = "Schedule C2\nName:  Alice Jones  01/02/2024  $100.00  $250.00\nAddress:  12 Elm St  Individual  Cash\n"
+
+    def run(command, input=None, capture_output=False, timeout=None):
+        runs.append((command, input))
+        return subprocess.CompletedProcess(command, 0, stdout=f"{cover}\f{c2_page}\f".encode(), stderr=b"")
+
+    monkeypatch.setattr(step3.c2_extractor.subprocess, 'run', run)
+    pdf_path = step3.TEMP_PDF_DIR / "entity_7_pdf_11.pdf"
+
+    rows = processor.extract_rows(b'%PDF-1.4 fake', pdf_path)
+
+    assert [row['Donor_Name'] for row in rows] == ['Alice Jones']
+    assert rows[0]['META_FileName'] == pdf_path.name
+    assert runs == [(['pdftotext', '-layout', 'fd://0', '-'], b'%PDF-1.4 fake')]
+    assert not pdf_path.exists()
+    assert not list(step3.PROCESSED_CSV_DIR.glob("entity_7_pdf_11*"))